@@ -0,0 +1,72 @@
+// Gerado por software/exportar_firmware.py a partir de limites_*.json.
+// Não edite manualmente: execute `python -m software.exportar_firmware` novamente.
+#ifndef CEP_LIMITES_H
+#define CEP_LIMITES_H
+
+#include <math.h>
+#include <stdint.h>
+#include <string.h>
+
+#define CEP_NUM_PROCESSOS 1
+#define CEP_MAX_N 25
+
+typedef struct {
+    char nome[32];
+    uint16_t n;
+    uint16_t reservado;
+    float lm;
+    float lsc;
+    float lic;
+    float lsc_2s;
+    float lic_2s;
+    float lsc_1s;
+    float lic_1s;
+    float lse;
+    float lie;
+    float lsc_r;
+    float lic_r;
+} CepLimites;
+
+#ifdef __cplusplus
+static_assert(sizeof(CepLimites) == 80, "layout de CepLimites");
+#else
+_Static_assert(sizeof(CepLimites) == 80, "layout de CepLimites");
+#endif
+
+typedef enum { CEP_VERDE = 0, CEP_AMARELO = 1, CEP_VERMELHO = 2 } CepClasse;
+
+static const CepLimites CEP_LIMITES[] = {
+    {"dados_simulado_prova_1", 5, 0, 4.92086983f, 4.95589399f, 4.88584614f, 4.94421911f, 4.89752054f, 4.93254471f, 4.90919542f, 4.94000006f, 4.92000008f, 0.1283198f, 0.0f},
+};
+
+static inline const CepLimites* cep_buscar_limites(const char* nome) {
+    for (int i = 0; i < CEP_NUM_PROCESSOS; i++) {
+        if (strncmp(CEP_LIMITES[i].nome, nome, 32) == 0) return &CEP_LIMITES[i];
+    }
+    return NULL;
+}
+
+// Os limites valem para subgrupos de l->n leituras: X-barra contra LSC/LIC e as
+// zonas de 2 sigma, R contra LSC_R/LIC_R. Vermelho: fora dos limites de X-barra ou R.
+// Amarelo: X-barra além de 2 sigma.
+static inline CepClasse cep_classificar_subgrupo(const CepLimites* l, const float* valores) {
+    float soma = 0.0f, minimo = valores[0], maximo = valores[0];
+    for (int i = 0; i < l->n; i++) {
+        soma += valores[i];
+        if (valores[i] < minimo) minimo = valores[i];
+        if (valores[i] > maximo) maximo = valores[i];
+    }
+    float media = soma / l->n;
+    float amplitude = maximo - minimo;
+    if (media > l->lsc || media < l->lic || amplitude > l->lsc_r || amplitude < l->lic_r) return CEP_VERMELHO;
+    if (media > l->lsc_2s || media < l->lic_2s) return CEP_AMARELO;
+    return CEP_VERDE;
+}
+
+// A especificação vale para cada peça. Comparações com NAN são falsas, então
+// especificações ausentes são ignoradas.
+static inline int cep_fora_especificacao(const CepLimites* l, float valor) {
+    return valor > l->lse || valor < l->lie;
+}
+
+#endif
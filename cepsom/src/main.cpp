@@ -2,6 +2,7 @@
 #include <ArduinoJson.h>
 #include <WiFi.h>
 #include <WebServer.h>
+#include "cep_limites.h"
 
 
 const char* ssid     = "PEUGEOT 206"; 
@@ -10,6 +11,13 @@ const char* password = "password";
 const unsigned long INTERVALO_LEITURA = 1500; 
 WebServer server(80);
 
+// Processo cujos limites (gerados em cep_limites.h) classificam os subgrupos no sensor.
+const char* PROCESSO_FIRMWARE = "dados_simulado_prova_1";
+const CepLimites* limitesProcesso = NULL;
+float subgrupo[CEP_MAX_N];
+int leiturasSubgrupo = 0;
+int ultimaClasse = -1;
+
 const float MOCK_DB_DATA[] = {
   // Estável 
   35.5, 36.0, 35.8, 38.2, 40.1, 42.5, 45.0, 41.2, 39.5, 38.0,
@@ -328,11 +336,21 @@ void handleRoot() { server.send(200, "text/html", index_html); }
 void handleData() {
   JsonDocument doc;
   doc["valor"] = ultimoValorLido;
+  if (ultimaClasse >= 0) doc["classe"] = ultimaClasse;
   String json;
   serializeJson(doc, json);
   server.send(200, "application/json", json);
 }
 
+void registrarLeitura(float valor) {
+  ultimoValorLido = valor;
+  if (!limitesProcesso) return;
+  subgrupo[leiturasSubgrupo++] = valor;
+  if (leiturasSubgrupo < (int)limitesProcesso->n) return;
+  ultimaClasse = cep_classificar_subgrupo(limitesProcesso, subgrupo);
+  leiturasSubgrupo = 0;
+}
+
 void setup() {
   Serial.begin(115200);
   delay(1000);
@@ -340,6 +358,9 @@ void setup() {
   while (WiFi.status() != WL_CONNECTED) { delay(500); Serial.print("."); }
   Serial.println("\nIP: " + WiFi.localIP().toString());
   
+  limitesProcesso = cep_buscar_limites(PROCESSO_FIRMWARE);
+  if (!limitesProcesso) Serial.println("Aviso: limites do processo ausentes em cep_limites.h");
+
   server.on("/", handleRoot);
   server.on("/dados", handleData);
   server.begin();
@@ -349,6 +370,6 @@ void loop() {
   server.handleClient();
   if (millis() - lastTime >= INTERVALO_LEITURA) {
     lastTime = millis();
-    ultimoValorLido = lerSensorMock();
+    registrarLeitura(lerSensorMock());
   }
 }
\ No newline at end of file
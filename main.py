@@ -1,11 +1,23 @@
 import sys
 import os
 import json
+import argparse
+import functools
+import numpy as np
 import pandas as pd
 from software import leitura_dados
 from software import graficos_variaveis
 from software import graficos_atributos
 from software import analise_capacidade
+from software import constantes_cep
+from software import relatorio_html
+from software import sketch_quantis
+from software import monitoramento_continuo
+from software import deteccao_mudanca
+from software import fila_trabalho
+from software import ingestao_arquivos
+from software import motor_lote
+from software import agrupamento_racional
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -13,199 +25,1028 @@ PASTA_DADOS_ENTRADA = os.path.join(BASE_DIR, "dados_entrada")
 PASTA_CONFIG = os.path.join(BASE_DIR, "configuracao")
 PASTA_OUTPUT = os.path.join(BASE_DIR, "resultados")
 
-PASTA_GRAFICOS = os.path.join(PASTA_OUTPUT, "graficos")
-PASTA_LIMITES = os.path.join(PASTA_OUTPUT, "limites_calculados")
-PASTA_PROCESSADOS = os.path.join(PASTA_OUTPUT, "dados_processados")
-
-CAMINHO_CONSTANTES = os.path.join(PASTA_CONFIG, "constants_cep.json")
-CAMINHO_ESPECS = os.path.join(PASTA_CONFIG, "especificacoes.json")
+CALIBRACAO_ITERATIVA = False
+JANELA_TENDENCIA_CAPACIDADE = 10
 
 NOME_PROCESSO_XR = "dados_simulado_prova_1"
 NOME_PROCESSO_P = "grafico_p"
 NOME_PROCESSO_U = "grafico_u"
 
-CAMINHO_CALIB_XR = os.path.join(
-    PASTA_DADOS_ENTRADA, "calibracao", "dados_simulado_prova_1.json"
-)
-CAMINHO_CALIB_P = os.path.join(PASTA_DADOS_ENTRADA, "calibracao", "grafico_p.json")
-CAMINHO_CALIB_U = os.path.join(PASTA_DADOS_ENTRADA, "calibracao", "grafico_u.json")
-
-CAMINHO_MONIT_XR = os.path.join(
-    PASTA_DADOS_ENTRADA, "monitoramento", "novas_medicoes.json"
-)
-
-CAMINHO_LIMITES_XR_OUT = os.path.join(PASTA_LIMITES, f"limites_{NOME_PROCESSO_XR}.json")
-CAMINHO_GRAFICO_CALIB_XR_OUT = os.path.join(
-    PASTA_GRAFICOS, f"calibracao_{NOME_PROCESSO_XR}.png"
-)
-CAMINHO_GRAFICO_MONIT_XR_OUT = os.path.join(
-    PASTA_GRAFICOS, f"monitoramento_{NOME_PROCESSO_XR}.png"
-)
-CAMINHO_DADOS_PROC_XR_OUT = os.path.join(
-    PASTA_PROCESSADOS, f"calibracao_{NOME_PROCESSO_XR}.csv"
-)
-
-CAMINHO_LIMITES_P_OUT = os.path.join(PASTA_LIMITES, f"limites_{NOME_PROCESSO_P}.json")
-CAMINHO_GRAFICO_CALIB_P_OUT = os.path.join(
-    PASTA_GRAFICOS, f"calibracao_{NOME_PROCESSO_P}.png"
-)
-
-CAMINHO_LIMITES_U_OUT = os.path.join(PASTA_LIMITES, f"limites_{NOME_PROCESSO_U}.json")
-CAMINHO_GRAFICO_CALIB_U_OUT = os.path.join(
-    PASTA_GRAFICOS, f"calibracao_{NOME_PROCESSO_U}.png"
-)
-
-
-def verificar_pastas_output():
-    os.makedirs(PASTA_GRAFICOS, exist_ok=True)
-    os.makedirs(PASTA_LIMITES, exist_ok=True)
-    os.makedirs(PASTA_PROCESSADOS, exist_ok=True)
-
-
-def main():
-    print("--- INICIANDO SOFTWARE CEP ---")
+NOME_ARQUIVO_MONIT_XR = "novas_medicoes.json"
+EXTENSOES_LEITURAS = (".csv", ".parquet", ".json")
 
-    verificar_pastas_output()
-    print(f"Pastas de output verificadas/criadas em: {PASTA_OUTPUT}")
+PROCESSOS_PADRAO = [
+    ("xr", NOME_PROCESSO_XR),
+    ("p", NOME_PROCESSO_P),
+    ("u", NOME_PROCESSO_U),
+]
+TIPOS_GRAFICO = ("xr", "p", "u", "np", "c", "p_laney", "u_laney")
+# Tipos de atributos que leem os dados do Gráfico P (lotes) ou do Gráfico U (amostras).
+FAMILIA_ATRIBUTOS = {
+    "p": "p",
+    "np": "p",
+    "p_laney": "p",
+    "u": "u",
+    "c": "u",
+    "u_laney": "u",
+}
+COMANDOS = {
+    "all": "Executa todas as etapas (padrão).",
+    "calibrate": "Calcula e salva os limites de controle.",
+    "capacity": "Análise de capacidade a partir dos limites salvos.",
+    "monitor": "Verifica novas medições contra os limites salvos.",
+    "plot": "Gera os gráficos a partir dos limites salvos.",
+    "report": "Gera o relatório HTML a partir dos resultados salvos.",
+    "recalibrate": "Detecta mudanças de patamar no histórico X-R e recalibra por segmento.",
+    "watch": "Monitora continuamente a pasta de monitoramento (modo contínuo).",
+    "enqueue": "Enfileira as etapas de cada processo em uma fila compartilhada.",
+    "worker": "Consome tarefas da fila compartilhada (vários nós/processos).",
+    "coordinate": "Mescla limites e alertas produzidos pelos trabalhadores da fila.",
+}
+NUM_PONTOS_CONTEXTO_WECO = 7
 
-    print("\nEtapa 1: Carregando todos os dados e configurações...")
-    sucesso = True
 
-    constantes_cep = leitura_dados.carregar_constantes_cep(CAMINHO_CONSTANTES)
-    if constantes_cep is None:
-        sucesso = False
+def montar_configuracao(
+    pasta_entrada: str = PASTA_DADOS_ENTRADA,
+    pasta_config: str = PASTA_CONFIG,
+    pasta_saida: str = PASTA_OUTPUT,
+    caminho_monitoramento: str | None = None,
+    agrupamento: dict | None = None,
+    reconstruir_sketch: bool = False,
+    precisao_simples: bool = False,
+) -> dict:
+    return {
+        "pasta_entrada": pasta_entrada,
+        "pasta_saida": pasta_saida,
+        "pasta_graficos": os.path.join(pasta_saida, "graficos"),
+        "pasta_limites": os.path.join(pasta_saida, "limites_calculados"),
+        "pasta_processados": os.path.join(pasta_saida, "dados_processados"),
+        "pasta_relatorios": os.path.join(pasta_saida, "relatorios"),
+        "pasta_sketches": os.path.join(pasta_saida, "sketches"),
+        "caminho_constantes": os.path.join(pasta_config, "constants_cep.json"),
+        "caminho_especs": os.path.join(pasta_config, "especificacoes.json"),
+        "caminho_cache_constantes": os.path.join(
+            pasta_config, "constantes_cep_calculadas.json"
+        ),
+        "caminho_monitoramento": caminho_monitoramento
+        or os.path.join(pasta_entrada, "monitoramento", NOME_ARQUIVO_MONIT_XR),
+        "agrupamento": agrupamento,
+        "reconstruir_sketch": reconstruir_sketch,
+        "precisao_simples": precisao_simples,
+    }
 
-    especs_xr = leitura_dados.carregar_especificacoes(CAMINHO_ESPECS, NOME_PROCESSO_XR)
-    if especs_xr is None:
-        sucesso = False
 
-    df_xr, n_xr = leitura_dados.carregar_dados_calibracao_xr(CAMINHO_CALIB_XR)
-    if df_xr is None:
-        sucesso = False
+def rotulo_processo(tipo: str | None, nome: str) -> str:
+    # np, c e Laney leem os dados de outro gráfico; o tipo entra no nome dos
+    # arquivos gerados para não sobrescrever os do P/U com o mesmo processo.
+    if tipo is None or tipo == "xr" or FAMILIA_ATRIBUTOS.get(tipo) == tipo:
+        return nome
+    return f"{nome}_{tipo}"
 
-    df_p = leitura_dados.carregar_dados_calibracao_p(CAMINHO_CALIB_P)
-    if df_p is None:
-        sucesso = False
 
-    df_u = leitura_dados.carregar_dados_calibracao_u(CAMINHO_CALIB_U)
-    if df_u is None:
-        sucesso = False
+def caminhos_processo(cfg: dict, nome: str, tipo: str | None = None) -> dict:
+    # Uma pasta calibracao/<nome>/ (um JSON por lote) tem precedência sobre calibracao/<nome>.json.
+    calibracao = os.path.join(cfg["pasta_entrada"], "calibracao", nome)
+    if not os.path.isdir(calibracao):
+        calibracao = f"{calibracao}.json"
+    nome = rotulo_processo(tipo, nome)
 
-    df_monit_xr = leitura_dados.carregar_dados_monitoramento_xr(CAMINHO_MONIT_XR)
-    if df_monit_xr is None:
-        print("*Aviso: Não foi possível carregar dados de monitoramento X-R.")
+    return {
+        "calibracao": calibracao,
+        "limites": os.path.join(
+            cfg["pasta_limites"], f"{leitura_dados.PREFIXO_LIMITES}{nome}.json"
+        ),
+        "alertas": os.path.join(cfg["pasta_limites"], f"alertas_{nome}.json"),
+        "tendencia": os.path.join(
+            cfg["pasta_limites"], f"tendencia_capacidade_{nome}.csv"
+        ),
+        "grafico_tendencia": os.path.join(
+            cfg["pasta_limites"], f"tendencia_capacidade_{nome}.png"
+        ),
+        "versoes_limites": os.path.join(
+            cfg["pasta_limites"], f"versoes_limites_{nome}.json"
+        ),
+        "processados": os.path.join(cfg["pasta_processados"], f"calibracao_{nome}.csv"),
+        "sketch": os.path.join(cfg["pasta_sketches"], f"sketch_{nome}.json"),
+        "grafico_calibracao": os.path.join(cfg["pasta_graficos"], f"calibracao_{nome}.png"),
+        "grafico_monitoramento": os.path.join(
+            cfg["pasta_graficos"], f"monitoramento_{nome}.png"
+        ),
+    }
 
-    if not sucesso:
-        print("\nERRO FATAL: Falha ao carregar arquivos de calibração ou configuração.")
-        sys.exit(1)
 
-    print("\n--- Etapa 1 Concluída: Todos os arquivos essenciais foram carregados. ---")
+def verificar_pastas_output(cfg: dict):
+    for chave in (
+        "pasta_graficos",
+        "pasta_limites",
+        "pasta_processados",
+        "pasta_relatorios",
+        "pasta_sketches",
+    ):
+        os.makedirs(cfg[chave], exist_ok=True)
 
-    print("\nEtapa 2: Iniciando calibração dos gráficos X-R...")
 
-    info_limites_xr = graficos_variaveis.calibrar_limites_xr(
-        df_xr, n_xr, constantes_cep
-    )
+def _salvar_json(dados, caminho: str, descricao: str) -> bool:
+    try:
+        with open(caminho, "w") as f:
+            json.dump(dados, f, indent=4, ensure_ascii=False)
+        print(f"{descricao} salvos em: {caminho}")
+        return True
+    except Exception as e:
+        print(f"ERRO ao salvar {descricao}: {e}")
+        return False
 
-    if info_limites_xr is None:
-        print("ERRO FATAL: Falha ao calibrar limites X-R.")
-        sys.exit(1)
 
+def _carregar_limites(caminho: str) -> dict | None:
     try:
-        with open(CAMINHO_LIMITES_XR_OUT, "w") as f:
-            json.dump(info_limites_xr, f, indent=4)
-        print(f"Limites X-R (base) salvos em: {CAMINHO_LIMITES_XR_OUT}")
-    except Exception as e:
-        print(f"ERRO ao salvar arquivo de limites JSON: {e}")
-        sys.exit(1)
+        with open(caminho, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"ERRO: Limites não encontrados em {caminho}. Execute 'calibrate' antes.")
+        return None
+    except json.JSONDecodeError:
+        print(f"ERRO: O arquivo de limites {caminho} não é um JSON válido.")
+        return None
+
+
+def _obter_constantes(cfg: dict, cache: dict) -> dict:
+    if "constantes" not in cache:
+        constantes_cep.configurar_cache_disco(cfg["caminho_cache_constantes"])
+        constantes_db = leitura_dados.carregar_constantes_cep(cfg["caminho_constantes"])
+        if constantes_db is None:
+            print("*Aviso: Constantes serão calculadas analiticamente (sem override JSON).")
+            constantes_db = {}
+        cache["constantes"] = constantes_db
+    return cache["constantes"]
+
+
+def _caminho_leituras_xr(cfg: dict, nome: str) -> str:
+    base = os.path.join(cfg["pasta_entrada"], "calibracao", nome)
+    for extensao in EXTENSOES_LEITURAS:
+        if os.path.exists(base + extensao):
+            return base + extensao
+    return base + EXTENSOES_LEITURAS[0]
+
+
+def _obter_historico_xr(
+    cfg: dict, nome: str, cache: dict, incluir_monitoramento: bool
+) -> tuple | None:
+    # O histórico com monitoramento também serve a quem só precisa da calibração.
+    for incluido in (incluir_monitoramento, True):
+        chave = ("historico_xr", nome, incluido)
+        if chave in cache:
+            return cache[chave]
+    chave = ("historico_xr", nome, incluir_monitoramento)
+
+    caminho_calibracao = caminhos_processo(cfg, nome)["calibracao"]
+    leitor_calibracao = None
+    if cfg["agrupamento"]:
+        # Leituras individuais com data/hora viram subgrupos racionais antes do histórico.
+        caminho_calibracao = _caminho_leituras_xr(cfg, nome)
+        leitor_calibracao = functools.partial(
+            agrupamento_racional.ler_subgrupos_leituras, **cfg["agrupamento"]
+        )
+
+    # Fontes com a mesma assinatura (tamanho/mtime) do sketch persistido já estão
+    # nele: só as novas ou alteradas geram um t-digest, salvo com reconstruir_sketch.
+    assinaturas = {}
+    if not cfg["reconstruir_sketch"]:
+        assinaturas = sketch_quantis.carregar_assinaturas(caminhos_processo(cfg, nome)["sketch"])
+    fontes = {}
+
+    def consumir_valores(fonte: str, valores: np.ndarray):
+        fonte = os.path.abspath(fonte)
+        assinatura = sketch_quantis.assinatura_arquivos(
+            ingestao_arquivos.expandir_caminhos(fonte)
+        )
+        sketch = None
+        if assinaturas.get(fonte) != assinatura:
+            sketch = sketch_quantis.TDigest().adicionar(valores)
+        fontes[fonte] = (assinatura, sketch)
+
+    df_total, n_amostra, indice_inicio_novos = leitura_dados.carregar_historico_xr(
+        caminho_calibracao,
+        cfg["caminho_monitoramento"] if incluir_monitoramento else None,
+        precisao_simples=cfg["precisao_simples"],
+        consumidor_valores=consumir_valores,
+        leitor_calibracao=leitor_calibracao,
+    )
+    if df_total is None:
+        return None
+
+    cache[chave] = (df_total, n_amostra, indice_inicio_novos, fontes)
+    return cache[chave]
+
+
+def _atualizar_sketch_historico(caminho_sketch: str, fontes: dict):
+    novas = {fonte: sketch for fonte, (_, sketch) in fontes.items() if sketch is not None}
+    if not novas:
+        print(f"Sketch de quantis sem fontes novas; usando {caminho_sketch}.")
+        return sketch_quantis.carregar_sketch(caminho_sketch)
+
+    # O sketch persistido também recebe as leituras do modo 'watch', arquivo a
+    # arquivo; uma fonte relida substitui essas leituras em vez de somá-las de novo.
+    relidos = [caminho for fonte in novas for caminho, _, _ in fontes[fonte][0]]
+    print(f"Mesclando {len(novas)} fonte(s) nova(s) ao sketch de quantis.")
+    return sketch_quantis.substituir_fontes(
+        caminho_sketch,
+        novas,
+        remover=relidos,
+        assinaturas={fonte: fontes[fonte][0] for fonte in novas},
+    )
+
+
+def _carregar_dados_atributos(tipo: str, caminho: str) -> pd.DataFrame | None:
+    if FAMILIA_ATRIBUTOS[tipo] == "p":
+        return leitura_dados.carregar_dados_calibracao_p(caminho)
+    return leitura_dados.carregar_dados_calibracao_u(caminho)
+
+
+def _calibrador_atributos(tipo: str, iterativo: bool):
+    if tipo == "p":
+        if iterativo:
+            return graficos_atributos.calibrar_limites_p_iterativo
+        return graficos_atributos.calibrar_limites_p
+    if tipo == "u":
+        if iterativo:
+            return graficos_atributos.calibrar_limites_u_iterativo
+        return graficos_atributos.calibrar_limites_u
+
+    if iterativo:
+        print("*Aviso: Fase I iterativa disponível apenas para P e U; usando calibração direta.")
+    return {
+        "np": graficos_atributos.calibrar_limites_np,
+        "c": graficos_atributos.calibrar_limites_c,
+        "p_laney": graficos_atributos.calibrar_limites_p_laney,
+        "u_laney": graficos_atributos.calibrar_limites_u_laney,
+    }[tipo]
+
+
+def calibrar_processo(
+    cfg: dict, tipo: str, nome: str, cache: dict, iterativo: bool
+) -> bool:
+    caminhos = caminhos_processo(cfg, nome, tipo)
+
+    if tipo == "xr":
+        constantes_db = _obter_constantes(cfg, cache)
+        historico = _obter_historico_xr(cfg, nome, cache, incluir_monitoramento=False)
+        if historico is None:
+            return False
+        df_total, n_amostra, indice_inicio_novos, _ = historico
+        df_calibracao = df_total.iloc[:indice_inicio_novos]
+
+        if iterativo:
+            info_limites = graficos_variaveis.calibrar_limites_xr_iterativo(
+                df_calibracao, n_amostra, constantes_db
+            )
+        elif ("limites_lote", nome) in cache:
+            info_limites = cache[("limites_lote", nome)]
+        else:
+            info_limites = graficos_variaveis.calibrar_limites_xr(
+                df_calibracao, n_amostra, constantes_db
+            )
+        if info_limites is None:
+            print(f"ERRO: Falha ao calibrar limites X-R de '{nome}'.")
+            return False
+
+        try:
+            df_calibracao.to_csv(caminhos["processados"], index=False)
+            print(f"Dados X-R processados salvos em: {caminhos['processados']}")
+        except Exception as e:
+            print(f"ERRO ao salvar dados processados CSV: {e}")
+
+        cache[("limites", nome)] = info_limites
+        return _salvar_json(info_limites, caminhos["limites"], "Limites X-R (base)")
+
+    df = _carregar_dados_atributos(tipo, caminhos["calibracao"])
+    if df is None:
+        return False
+    rotulo = rotulo_processo(tipo, nome)
+    cache[("dados", rotulo)] = df
+    info_limites = _calibrador_atributos(tipo, iterativo)(df)
+
+    if not info_limites:
+        print(f"ERRO: Falha ao calibrar Gráfico {tipo.upper()} de '{nome}'.")
+        return False
+
+    cache[("limites", rotulo)] = info_limites
+    return _salvar_json(
+        info_limites, caminhos["limites"], f"Limites Gráfico {tipo.upper()}"
+    )
+
+
+def analisar_capacidade_processo(
+    cfg: dict, tipo: str, nome: str, cache: dict, janela: int | None
+) -> bool:
+    if tipo != "xr":
+        print(f"Análise de capacidade não se aplica ao Gráfico {tipo.upper()} ('{nome}').")
+        return True
 
-    graficos_variaveis.plotar_grafico_calibracao_xr(
-        df_xr, info_limites_xr, CAMINHO_GRAFICO_CALIB_XR_OUT
+    caminhos = caminhos_processo(cfg, nome, tipo)
+    info_limites = cache.get(("limites", nome)) or _carregar_limites(caminhos["limites"])
+    if info_limites is None:
+        return False
+
+    especificacoes = leitura_dados.carregar_especificacoes(cfg["caminho_especs"], nome)
+    if especificacoes is None:
+        return False
+
+    constantes_db = _obter_constantes(cfg, cache)
+    historico = _obter_historico_xr(cfg, nome, cache, incluir_monitoramento=True)
+    if historico is None:
+        return False
+    df_total, n_amostra, _, fontes = historico
+
+    sketch = _atualizar_sketch_historico(caminhos["sketch"], fontes)
+
+    info_capacidade = analise_capacidade.executar_analise_completa(
+        info_limites, constantes_db, especificacoes, sketch=sketch
+    )
+    if not info_capacidade:
+        print("ERRO: Falha ao executar análise de capacidade.")
+        return False
+
+    info_limites["analise_capacidade"] = info_capacidade
+    info_limites.pop("analise_capacidade_desatualizada", None)
+    cache[("limites", nome)] = info_limites
+    sucesso = _salvar_json(
+        info_limites, caminhos["limites"], "Limites X-R com análise de capacidade"
+    )
+
+    df_tendencia = analise_capacidade.calcular_tendencia_capacidade(
+        df_total, n_amostra, especificacoes, constantes_db, janela=janela
+    )
+    if df_tendencia is not None:
+        try:
+            df_tendencia.to_csv(caminhos["tendencia"], index=False)
+            print(f"Tendência de capacidade salva em: {caminhos['tendencia']}")
+        except Exception as e:
+            print(f"ERRO ao salvar tendência de capacidade: {e}")
+        analise_capacidade.plotar_tendencia_capacidade(
+            df_tendencia, caminhos["grafico_tendencia"]
+        )
+
+    return sucesso
+
+
+def recalibrar_mudancas_processo(
+    cfg: dict,
+    tipo: str,
+    nome: str,
+    cache: dict,
+    iterativo: bool,
+    penalidade: float | None,
+    tamanho_minimo: int,
+) -> bool:
+    if tipo != "xr":
+        print(f"Detecção de mudanças não se aplica ao Gráfico {tipo.upper()} ('{nome}').")
+        return True
+
+    caminhos = caminhos_processo(cfg, nome, tipo)
+    constantes_db = _obter_constantes(cfg, cache)
+    historico = _obter_historico_xr(cfg, nome, cache, incluir_monitoramento=True)
+    if historico is None:
+        return False
+    df_total, n_amostra, _, _ = historico
+
+    pontos = deteccao_mudanca.detectar_mudancas_xr(df_total, penalidade, tamanho_minimo)
+    versoes = deteccao_mudanca.recalibrar_por_segmento(
+        df_total, n_amostra, constantes_db, pontos, iterativo
     )
+    if not versoes:
+        print(f"ERRO: Nenhum segmento de '{nome}' pôde ser recalibrado.")
+        return False
+
+    sucesso = deteccao_mudanca.salvar_versoes_limites(versoes, caminhos["versoes_limites"])
+    if not pontos:
+        return sucesso
+
+    # Os limites vigentes passam a ser os do último segmento detectado. A análise de
+    # capacidade salva foi feita com os limites antigos: fica marcada para refazer.
+    vigente = versoes[-1]
+    info_limites = dict(vigente["limites"])
+    info_limites["versao_limites"] = vigente["versao"]
+    info_limites["Amostra_inicio_versao"] = vigente["Amostra_inicio"]
+    if os.path.exists(caminhos["limites"]):
+        existentes = _carregar_limites(caminhos["limites"]) or {}
+        if "analise_capacidade" in existentes:
+            info_limites["analise_capacidade_desatualizada"] = True
 
     try:
-        df_xr.to_csv(CAMINHO_DADOS_PROC_XR_OUT, index=False)
-        print(f"Dados X-R processados salvos em: {CAMINHO_DADOS_PROC_XR_OUT}")
+        df_total.iloc[vigente["indice_inicio"] :].to_csv(caminhos["processados"], index=False)
+        print(f"Dados X-R do segmento vigente salvos em: {caminhos['processados']}")
     except Exception as e:
         print(f"ERRO ao salvar dados processados CSV: {e}")
 
-    print("\n--- Etapa 2 Concluída: Calibração X-R finalizada. ---")
+    cache[("limites", nome)] = info_limites
+    return (
+        _salvar_json(info_limites, caminhos["limites"], "Limites X-R (segmento vigente)")
+        and sucesso
+    )
+
+
+def _montar_serie_monitoramento(
+    cfg: dict, nome: str, cache: dict
+) -> tuple[pd.DataFrame, int] | None:
+    chave = ("historico_xr", nome, True)
+    if chave in cache:
+        df_total, _, indice_inicio_novos, _ = cache[chave]
+        return df_total, indice_inicio_novos
+
+    chave = ("serie_monitoramento", nome)
+    if chave not in cache:
+        cache[chave] = _carregar_serie_monitoramento(cfg, nome)
+    return cache[chave]
 
-    print("\nEtapa 3: Iniciando calibração dos gráficos de atributos (P e U)...")
 
-    info_limites_p = graficos_atributos.calibrar_limites_p(df_p)
-    if info_limites_p:
+def _carregar_serie_monitoramento(
+    cfg: dict, nome: str
+) -> tuple[pd.DataFrame, int] | None:
+    df_monitoramento = leitura_dados.carregar_dados_monitoramento_xr(
+        cfg["caminho_monitoramento"]
+    )
+    if df_monitoramento is None:
+        return None
+
+    # O contexto das regras WECO vem do CSV processado, sem reprocessar a calibração.
+    caminho_processados = caminhos_processo(cfg, nome)["processados"]
+    contexto = None
+    if os.path.exists(caminho_processados):
         try:
-            with open(CAMINHO_LIMITES_P_OUT, "w") as f:
-                json.dump(info_limites_p, f, indent=4)
-            print(f"Limites Gráfico P salvos em: {CAMINHO_LIMITES_P_OUT}")
-            graficos_atributos.plotar_grafico_calibracao_p(
-                df_p, info_limites_p, CAMINHO_GRAFICO_CALIB_P_OUT
-            )
+            contexto = pd.read_csv(caminho_processados).tail(NUM_PONTOS_CONTEXTO_WECO)
         except Exception as e:
-            print(f"ERRO ao salvar resultados do Gráfico P: {e}")
+            print(f"*Aviso: Contexto de calibração indisponível ({e}).")
+
+    if contexto is None or len(contexto) == 0:
+        return df_monitoramento.reset_index(drop=True), 0
+
+    df_total = pd.concat([contexto, df_monitoramento], ignore_index=True)
+    return df_total, len(contexto)
+
+
+def monitorar_processo(cfg: dict, tipo: str, nome: str, cache: dict) -> bool:
+    if tipo != "xr":
+        print(f"Monitoramento não disponível para o Gráfico {tipo.upper()} ('{nome}').")
+        return True
+
+    caminhos = caminhos_processo(cfg, nome, tipo)
+    info_limites = cache.get(("limites", nome)) or _carregar_limites(caminhos["limites"])
+    if info_limites is None:
+        return False
+
+    serie = _montar_serie_monitoramento(cfg, nome, cache)
+    if serie is None:
+        print("*Aviso: Não foi possível carregar dados de monitoramento X-R.")
+        return True
+
+    df_total, indice_inicio_novos = serie
+    if indice_inicio_novos >= len(df_total):
+        print("Nenhum dado de monitoramento X-R encontrado.")
+        return True
+
+    if ("alertas_lote", nome) in cache:
+        alertas = cache[("alertas_lote", nome)]
+        for msg in alertas:
+            print(msg)
+        if not alertas:
+            print("Nenhum alerta (WECO) detectado nas novas medições.")
     else:
-        print("ERRO: Falha ao calibrar Gráfico P.")
+        alertas = graficos_variaveis.analisar_regras_weco(
+            df_total, info_limites, indice_inicio_novos
+        )
+    return _salvar_json(alertas, caminhos["alertas"], "Alertas X-R")
 
-    info_limites_u = graficos_atributos.calibrar_limites_u(df_u)
-    if info_limites_u:
-        try:
-            with open(CAMINHO_LIMITES_U_OUT, "w") as f:
-                json.dump(info_limites_u, f, indent=4)
-            print(f"Limites Gráfico U salvos em: {CAMINHO_LIMITES_U_OUT}")
-            graficos_atributos.plotar_grafico_calibracao_u(
-                df_u, info_limites_u, CAMINHO_GRAFICO_CALIB_U_OUT
+
+def avaliar_lote_processos_xr(
+    cfg: dict, processos: list, cache: dict, calibrar: bool, monitorar: bool
+) -> bool:
+    # Processos X-R passam juntos pelo motor em lote; a calibração de n variável
+    # (e os processos que falham aqui) segue pelo caminho por processo.
+    nomes, series, limites = [], [], []
+    for tipo, nome in processos:
+        if tipo != "xr":
+            continue
+        if calibrar:
+            historico = _obter_historico_xr(cfg, nome, cache, incluir_monitoramento=False)
+            if historico is None:
+                continue
+            df_total, _, indice_inicio_novos, _ = historico
+            if df_total["n"].iloc[:indice_inicio_novos].nunique() > 1:
+                continue
+        else:
+            caminho_limites = caminhos_processo(cfg, nome)["limites"]
+            if not os.path.exists(caminho_limites):
+                continue
+            info_limites = _carregar_limites(caminho_limites)
+            if info_limites is None:
+                continue
+            cache[("limites", nome)] = info_limites
+            serie = _montar_serie_monitoramento(cfg, nome, cache)
+            if serie is None or serie[1] >= len(serie[0]):
+                continue
+            df_total, indice_inicio_novos = serie
+            limites.append(info_limites)
+        nomes.append(nome)
+        series.append((df_total, indice_inicio_novos))
+
+    if not nomes:
+        return True
+
+    print(f"\nEtapa: Motor em lote X-R ({len(nomes)} processo(s))...")
+    K = max(len(df) for df, _ in series)
+    x_barra = np.full((len(nomes), K), np.nan)
+    amplitude = np.full((len(nomes), K), np.nan)
+    tamanhos = np.zeros((len(nomes), K), dtype=np.int64)
+    amostras = np.empty((len(nomes), K), dtype=object)
+    for i, (df, _) in enumerate(series):
+        x_barra[i, : len(df)] = df["X_barra"].to_numpy(dtype=np.float64)
+        amplitude[i, : len(df)] = df["R"].to_numpy(dtype=np.float64)
+        # CSVs antigos não trazem n: esses subgrupos contam como de n de referência.
+        n_colunas = df["n"] if "n" in df.columns else pd.Series(np.nan, index=df.index)
+        n_ref = limites[i]["n_amostra"] if limites else 2
+        tamanhos[i, : len(df)] = n_colunas.fillna(n_ref).to_numpy(dtype=np.int64)
+        # Mesmo formato de analisar_regras_weco, que lê a Amostra da linha do DataFrame.
+        amostras[i, : len(df)] = df.to_numpy()[:, df.columns.get_loc("Amostra")]
+
+    resultado = motor_lote.avaliar_lote_xr(
+        x_barra,
+        amplitude,
+        tamanhos,
+        _obter_constantes(cfg, cache),
+        np.array([inicio for _, inicio in series]),
+        nomes,
+        amostras,
+        limites=limites or None,
+    )
+    if resultado is None:
+        return False
+
+    for nome in nomes:
+        if calibrar:
+            cache[("limites_lote", nome)] = resultado["limites"][nome]
+        if monitorar:
+            cache[("alertas_lote", nome)] = resultado["alertas"][nome]
+    return True
+
+
+def plotar_processo(cfg: dict, tipo: str, nome: str, cache: dict) -> bool:
+    caminhos = caminhos_processo(cfg, nome, tipo)
+    rotulo = rotulo_processo(tipo, nome)
+    info_limites = cache.get(("limites", rotulo)) or _carregar_limites(caminhos["limites"])
+    if info_limites is None:
+        return False
+
+    if tipo != "xr":
+        df = cache.get(("dados", rotulo))
+        if df is None:
+            df = _carregar_dados_atributos(tipo, caminhos["calibracao"])
+        if df is None:
+            return False
+        if tipo == "p":
+            plotar = graficos_atributos.plotar_grafico_calibracao_p
+        elif tipo == "u":
+            plotar = graficos_atributos.plotar_grafico_calibracao_u
+        else:
+            plotar = graficos_atributos.plotar_grafico_calibracao_atributos
+        return plotar(df, info_limites, caminhos["grafico_calibracao"])
+
+    historico = _obter_historico_xr(cfg, nome, cache, incluir_monitoramento=True)
+    if historico is None:
+        return False
+    df_total, _, indice_inicio_novos, _ = historico
+
+    sucesso = graficos_variaveis.plotar_grafico_calibracao_xr(
+        df_total.iloc[:indice_inicio_novos], info_limites, caminhos["grafico_calibracao"]
+    )
+    if indice_inicio_novos < len(df_total):
+        sucesso = (
+            graficos_variaveis.plotar_grafico_monitoramento_xr(
+                df_total, info_limites, indice_inicio_novos, caminhos["grafico_monitoramento"]
             )
-        except Exception as e:
-            print(f"ERRO ao salvar resultados do Gráfico U: {e}")
-    else:
-        print("ERRO: Falha ao calibrar Gráfico U.")
+            and sucesso
+        )
+        print("Gráfico de monitoramento salvo.")
+    return sucesso
+
+
+def gerar_relatorio(cfg: dict, processos: list) -> bool:
+    processos_relatorio = []
+    for tipo, nome in processos:
+        caminhos = caminhos_processo(cfg, nome, tipo)
+        processo = relatorio_html.carregar_processo(
+            rotulo_processo(tipo, nome),
+            caminhos["limites"],
+            caminhos["alertas"],
+            [
+                caminhos["grafico_calibracao"],
+                caminhos["grafico_monitoramento"],
+                caminhos["grafico_tendencia"],
+            ],
+        )
+        if processo is not None:
+            processos_relatorio.append(processo)
+    return (
+        relatorio_html.gerar_relatorio(processos_relatorio, cfg["pasta_relatorios"])
+        is not None
+    )
+
 
-    print("\n--- Etapa 3 Concluída: Calibração de Atributos finalizada. ---")
+def observar_monitoramento(cfg: dict, args) -> bool:
+    pasta_monitoramento = cfg["caminho_monitoramento"]
+    if not os.path.isdir(pasta_monitoramento):
+        pasta_monitoramento = os.path.dirname(pasta_monitoramento)
+    if not os.path.isdir(pasta_monitoramento):
+        print(f"ERRO: Pasta de monitoramento não encontrada: {pasta_monitoramento}")
+        return False
 
-    print("\nEtapa 4: Iniciando análise de capacidade e probabilidade (para X-R)...")
+    processos_xr = [
+        nome for tipo, nome in selecionar_processos(args.tipo, args.processo) if tipo == "xr"
+    ]
+    if not processos_xr:
+        print("ERRO: O modo 'watch' exige um processo X-R selecionado.")
+        return False
+    if len(processos_xr) > 1:
+        print(
+            f"*Aviso: Arquivos na raiz de {pasta_monitoramento} serão atribuídos a "
+            f"'{processos_xr[0]}'; use subpastas para os demais processos."
+        )
+
+    estado_painel = None
+    if args.painel:
+        import threading
+        from software import painel_ao_vivo
+
+        servidor, estado_painel = painel_ao_vivo.criar_servidor(
+            cfg["pasta_limites"], porta=args.porta
+        )
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        print(f"Painel CEP ao vivo em http://127.0.0.1:{args.porta}/")
 
-    info_capacidade_completa = analise_capacidade.executar_analise_completa(
-        info_limites_xr, constantes_cep, especs_xr
+    monitor = monitoramento_continuo.MonitorPasta(
+        pasta_monitoramento,
+        cfg["pasta_limites"],
+        cfg["pasta_processados"],
+        processos_xr[0],
+        os.path.join(cfg["pasta_saida"], "estado_monitoramento.json"),
+        pasta_sketches=cfg["pasta_sketches"],
+        estado_painel=estado_painel,
     )
+    monitor.executar(intervalo=args.intervalo, duracao=args.duracao)
+    return True
+
+
+def _pasta_fila(args) -> str:
+    return args.fila or os.path.join(args.saida, "fila")
+
+
+def _configuracao_agrupamento(args) -> dict | None:
+    if not args.agrupamento:
+        return None
+    return {
+        "modo": args.agrupamento,
+        "tamanho": args.tamanho_subgrupo,
+        "janela": args.janela_subgrupo,
+        "inicios_turno": args.inicios_turno,
+    }
+
+
+def _argumentos_agrupamento(args) -> list[str]:
+    if not args.agrupamento:
+        return []
+    argumentos = ["--agrupamento", args.agrupamento]
+    if args.tamanho_subgrupo is not None:
+        argumentos += ["--tamanho-subgrupo", str(args.tamanho_subgrupo)]
+    if args.janela_subgrupo:
+        argumentos += ["--janela-subgrupo", args.janela_subgrupo]
+    if args.inicios_turno:
+        argumentos += ["--inicios-turno", *args.inicios_turno]
+    return argumentos
+
+
+def enfileirar_processos(processos: list, args) -> bool:
+    # Caminhos absolutos: os trabalhadores podem rodar em outros nós e diretórios.
+    argumentos = [
+        "--entrada",
+        os.path.abspath(args.entrada),
+        "--config",
+        os.path.abspath(args.config),
+        "--janela-tendencia",
+        str(args.janela_tendencia),
+    ]
+    if args.monitoramento:
+        argumentos += ["--monitoramento", os.path.abspath(args.monitoramento)]
+    if args.iterativo:
+        argumentos.append("--iterativo")
+    if args.precisao_simples:
+        argumentos.append("--precisao-simples")
+    argumentos += _argumentos_agrupamento(args)
 
-    if info_capacidade_completa:
-        info_limites_xr["analise_capacidade"] = info_capacidade_completa
+    tarefas = fila_trabalho.montar_tarefas(processos, argumentos, args.max_tentativas)
+    fila_trabalho.enfileirar_tarefas(_pasta_fila(args), tarefas)
+    return True
+
+
+def coordenar_fila(cfg: dict, processos: list, args) -> bool:
+    sucesso = fila_trabalho.coordenar(
+        _pasta_fila(args), cfg["pasta_saida"], args.aguardar, args.timeout_batimento
+    )
+    print("\nEtapa: Gerando relatório HTML...")
+    return gerar_relatorio(cfg, processos) and sucesso
+
+
+def _executar_etapa(titulo: str, processos: list, funcao) -> bool:
+    print(f"\n{titulo}")
+    sucesso = True
+    for tipo, nome in processos:
+        print(f"\n[{tipo.upper()}] {nome}")
         try:
-            with open(CAMINHO_LIMITES_XR_OUT, "w") as f:
-                json.dump(info_limites_xr, f, indent=4)
-            print(f"Limites X-R atualizados com análise de capacidade.")
+            if not funcao(tipo, nome):
+                print(f"ERRO: Etapa falhou para '{nome}'; seguindo com os demais processos.")
+                sucesso = False
         except Exception as e:
-            print(f"ERRO ao salvar limites X-R atualizados: {e}")
-    else:
-        print("ERRO: Falha ao executar análise de capacidade.")
+            print(f"ERRO inesperado em '{nome}': {e}")
+            sucesso = False
+    return sucesso
+
 
-    print("\n--- Etapa 4 Concluída: Análise de capacidade finalizada. ---")
+def selecionar_processos(
+    tipos: list[str] | None, nomes: list[str] | None
+) -> list[tuple[str, str]]:
+    processos = list(PROCESSOS_PADRAO)
 
-    print("\nEtapa 5: Iniciando monitoramento (para X-R)...")
+    if nomes:
+        conhecidos = {nome: tipo for tipo, nome in PROCESSOS_PADRAO}
+        processos = []
+        for item in nomes:
+            if ":" in item:
+                tipo, nome = item.split(":", 1)
+            else:
+                tipo, nome = conhecidos.get(item, "xr"), item
+            processos.append((tipo, nome))
 
-    if df_monit_xr is not None:
-        df_total_xr = pd.concat([df_xr, df_monit_xr], ignore_index=True)
-        indice_inicio_novos = len(df_xr)
+    if tipos:
+        processos = [(tipo, nome) for tipo, nome in processos if tipo in tipos]
 
-        graficos_variaveis.analisar_regras_weco(
-            df_total_xr, info_limites_xr, indice_inicio_novos
+    return processos
+
+
+def executar(args) -> int:
+    cfg = montar_configuracao(
+        args.entrada,
+        args.config,
+        args.saida,
+        args.monitoramento,
+        _configuracao_agrupamento(args),
+        getattr(args, "reconstruir_sketch", False),
+        args.precisao_simples,
+    )
+    processos = selecionar_processos(args.tipo, args.processo)
+    if not processos:
+        print("ERRO: Nenhum processo selecionado pelos filtros informados.")
+        return 1
+
+    verificar_pastas_output(cfg)
+    print(f"Pastas de output verificadas/criadas em: {cfg['pasta_saida']}")
+
+    cache = {}
+    comando = args.comando
+    sucesso = True
+
+    if comando == "all":
+        for tipo, nome in processos:
+            if tipo == "xr":
+                _obter_historico_xr(cfg, nome, cache, incluir_monitoramento=True)
+
+    if comando in ("calibrate", "all") and not args.iterativo:
+        sucesso &= avaliar_lote_processos_xr(
+            cfg, processos, cache, calibrar=True, monitorar=comando == "all"
+        )
+    elif comando == "monitor":
+        sucesso &= avaliar_lote_processos_xr(
+            cfg, processos, cache, calibrar=False, monitorar=True
         )
 
-        graficos_variaveis.plotar_grafico_monitoramento_xr(
-            df_total_xr,
-            info_limites_xr,
-            indice_inicio_novos,
-            CAMINHO_GRAFICO_MONIT_XR_OUT,
+    if comando in ("calibrate", "all"):
+        sucesso &= _executar_etapa(
+            "Etapa: Calibração dos limites de controle...",
+            processos,
+            lambda tipo, nome: calibrar_processo(cfg, tipo, nome, cache, args.iterativo),
         )
 
-        print("Gráfico de monitoramento salvo.")
-    else:
-        print("Nenhum dado de monitoramento X-R encontrado, pulando Etapa 5.")
+    if comando in ("capacity", "all"):
+        sucesso &= _executar_etapa(
+            "Etapa: Análise de capacidade e probabilidade...",
+            processos,
+            lambda tipo, nome: analisar_capacidade_processo(
+                cfg, tipo, nome, cache, args.janela_tendencia or None
+            ),
+        )
+
+    if comando in ("monitor", "all"):
+        sucesso &= _executar_etapa(
+            "Etapa: Monitoramento (regras WECO)...",
+            processos,
+            lambda tipo, nome: monitorar_processo(cfg, tipo, nome, cache),
+        )
+
+    if comando in ("plot", "all"):
+        sucesso &= _executar_etapa(
+            "Etapa: Geração de gráficos...",
+            processos,
+            lambda tipo, nome: plotar_processo(cfg, tipo, nome, cache),
+        )
+
+    if comando in ("report", "all"):
+        print("\nEtapa: Gerando relatório HTML...")
+        sucesso &= gerar_relatorio(cfg, processos)
+
+    if comando == "recalibrate":
+        sucesso &= _executar_etapa(
+            "Etapa: Detecção de mudanças e recalibração por segmento...",
+            processos,
+            lambda tipo, nome: recalibrar_mudancas_processo(
+                cfg,
+                tipo,
+                nome,
+                cache,
+                args.iterativo,
+                args.penalidade,
+                args.tamanho_minimo_segmento,
+            ),
+        )
+
+    if comando == "watch":
+        sucesso &= observar_monitoramento(cfg, args)
+
+    if comando == "enqueue":
+        sucesso &= enfileirar_processos(processos, args)
+
+    if comando == "worker":
+        contagem = fila_trabalho.executar_trabalhador(
+            _pasta_fila(args),
+            args.intervalo_batimento,
+            args.timeout_batimento,
+            args.aguardar,
+            args.max_tarefas,
+        )
+        sucesso &= contagem["falhas"] == 0
+
+    if comando == "coordinate":
+        sucesso &= coordenar_fila(cfg, processos, args)
+
+    return 0 if sucesso else 1
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Software CEP: calibração, capacidade, monitoramento e gráficos."
+    )
+
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument(
+        "--tipo", nargs="+", choices=TIPOS_GRAFICO, help="Filtra por tipo de gráfico."
+    )
+    comum.add_argument(
+        "--processo",
+        nargs="+",
+        help="Processos a executar (nome ou tipo:nome, ex.: p:linha_3).",
+    )
+    comum.add_argument("--entrada", default=PASTA_DADOS_ENTRADA, help="Pasta de dados de entrada.")
+    comum.add_argument("--config", default=PASTA_CONFIG, help="Pasta de configuração.")
+    comum.add_argument("--saida", default=PASTA_OUTPUT, help="Pasta de resultados.")
+    comum.add_argument(
+        "--monitoramento",
+        default=None,
+        help="Arquivo, pasta ou padrão glob de novas medições X-R.",
+    )
+    comum.add_argument(
+        "--iterativo",
+        action="store_true",
+        default=CALIBRACAO_ITERATIVA,
+        help="Calibração iterativa (Fase I).",
+    )
+    comum.add_argument(
+        "--janela-tendencia",
+        type=int,
+        default=JANELA_TENDENCIA_CAPACIDADE,
+        help="Janela (em subgrupos) da tendência de capacidade; 0 = expansiva.",
+    )
+    comum.add_argument(
+        "--precisao-simples",
+        action="store_true",
+        help="Guarda X-barra, R e S do histórico X-R em float32 (metade da memória).",
+    )
+    comum.add_argument(
+        "--agrupamento",
+        choices=agrupamento_racional.MODOS_AGRUPAMENTO,
+        default=None,
+        help="Lê a calibração X-R como leituras individuais (timestamp, valor) "
+        "e forma subgrupos por contagem, janela de tempo ou turno.",
+    )
+    comum.add_argument(
+        "--tamanho-subgrupo", type=int, default=None, help="Leituras por subgrupo (contagem)."
+    )
+    comum.add_argument(
+        "--janela-subgrupo", default=None, help="Duração de cada subgrupo (janela), ex.: 15min."
+    )
+    comum.add_argument(
+        "--inicios-turno",
+        nargs="+",
+        default=None,
+        help="Horários de início dos turnos (turno), ex.: 06:00 14:00 22:00.",
+    )
+
+    subparsers = parser.add_subparsers(dest="comando")
+    for comando, ajuda in COMANDOS.items():
+        subparsers.add_parser(comando, parents=[comum], help=ajuda)
+
+    subparser = subparsers.choices["recalibrate"]
+    subparser.add_argument(
+        "--penalidade",
+        type=float,
+        default=None,
+        help="Penalidade por mudança (padrão: critério BIC).",
+    )
+    subparser.add_argument(
+        "--tamanho-minimo-segmento",
+        type=int,
+        default=deteccao_mudanca.TAMANHO_MINIMO_SEGMENTO,
+        help="Número mínimo de subgrupos por segmento.",
+    )
+
+    for comando in ("capacity", "all"):
+        subparsers.choices[comando].add_argument(
+            "--reconstruir-sketch",
+            action="store_true",
+            help="Reconstrói o sketch de quantis a partir de todo o histórico.",
+        )
+
+    subparser = subparsers.choices["watch"]
+    subparser.add_argument(
+        "--intervalo",
+        type=float,
+        default=monitoramento_continuo.INTERVALO_POLLING_S,
+        help="Intervalo de polling em segundos (quando inotify não está disponível).",
+    )
+    subparser.add_argument(
+        "--duracao", type=float, default=None, help="Encerra após N segundos."
+    )
+    subparser.add_argument(
+        "--painel", action="store_true", help="Publica pontos e alertas no painel ao vivo."
+    )
+    subparser.add_argument("--porta", type=int, default=8050, help="Porta do painel ao vivo.")
+
+    for comando in ("enqueue", "worker", "coordinate"):
+        subparsers.choices[comando].add_argument(
+            "--fila",
+            default=None,
+            help="Pasta compartilhada da fila (padrão: <saida>/fila).",
+        )
+    subparsers.choices["enqueue"].add_argument(
+        "--max-tentativas",
+        type=int,
+        default=fila_trabalho.MAX_TENTATIVAS_PADRAO,
+        help="Tentativas por tarefa antes de marcá-la como falha.",
+    )
+    for comando in ("worker", "coordinate"):
+        subparser = subparsers.choices[comando]
+        subparser.add_argument(
+            "--aguardar",
+            action="store_true",
+            help="Aguarda novas tarefas (worker) ou o esvaziamento da fila (coordinate).",
+        )
+        subparser.add_argument(
+            "--timeout-batimento",
+            type=float,
+            default=fila_trabalho.TIMEOUT_BATIMENTO_S,
+            help="Segundos sem batimento até uma tarefa voltar à fila.",
+        )
+    subparser = subparsers.choices["worker"]
+    subparser.add_argument(
+        "--intervalo-batimento",
+        type=float,
+        default=fila_trabalho.INTERVALO_BATIMENTO_S,
+        help="Intervalo, em segundos, entre batimentos da tarefa em execução.",
+    )
+    subparser.add_argument(
+        "--max-tarefas", type=int, default=None, help="Encerra após N tarefas."
+    )
+
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    print("--- INICIANDO SOFTWARE CEP ---")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMANDOS and argv[0] not in ("-h", "--help")):
+        argv = ["all"] + argv
+    args = criar_parser().parse_args(argv)
 
-    print("\n--- Etapa 5 Concluída: Monitoramento finalizado. ---")
+    codigo = executar(args)
 
     print("\n--- SOFTWARE CEP CONCLUÍDO ---")
+    sys.exit(codigo)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+import os
+import pandas as pd
+import numpy as np
+from software import leitura_dados
+
+MODOS_AGRUPAMENTO = ("contagem", "janela", "turno")
+
+_NS_POR_DIA = 86_400 * 1_000_000_000
+
+
+def carregar_leituras_brutas(
+    caminho_arquivo: str, coluna_tempo: str = "timestamp", coluna_valor: str = "valor"
+) -> pd.DataFrame | None:
+    print(f"Lendo leituras individuais de: {caminho_arquivo}")
+    try:
+        extensao = os.path.splitext(caminho_arquivo)[1].lower()
+        if extensao == ".csv":
+            df = pd.read_csv(caminho_arquivo, usecols=[coluna_tempo, coluna_valor])
+        elif extensao == ".parquet":
+            df = pd.read_parquet(caminho_arquivo, columns=[coluna_tempo, coluna_valor])
+        else:
+            df = pd.read_json(caminho_arquivo)
+
+        if coluna_tempo not in df.columns or coluna_valor not in df.columns:
+            print(
+                f"ERRO: As leituras devem conter as colunas '{coluna_tempo}' e '{coluna_valor}'."
+            )
+            return None
+
+        return df[[coluna_tempo, coluna_valor]]
+
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo de leituras não encontrado em {caminho_arquivo}")
+        return None
+    except Exception as e:
+        print(f"ERRO ao ler leituras individuais: {e}")
+        return None
+
+
+def _converter_tempo_ns(serie_tempo: pd.Series) -> np.ndarray:
+    tempos = pd.to_datetime(serie_tempo)
+    if getattr(tempos.dt, "tz", None) is not None:
+        # Turnos seguem o horário de parede da planta, não o UTC.
+        tempos = tempos.dt.tz_localize(None)
+    return tempos.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _converter_horario_ns(horario: str) -> int:
+    horas, minutos = horario.split(":")
+    return (int(horas) * 60 + int(minutos)) * 60 * 1_000_000_000
+
+
+def _ids_por_turno(tempos_ns: np.ndarray, inicios_turno: list[str]) -> np.ndarray:
+    inicios_ns = np.sort([_converter_horario_ns(h) for h in inicios_turno])
+    num_turnos = len(inicios_ns)
+
+    dia = tempos_ns // _NS_POR_DIA
+    hora_do_dia = tempos_ns - dia * _NS_POR_DIA
+
+    turno = np.searchsorted(inicios_ns, hora_do_dia, side="right") - 1
+    antes_primeiro = turno < 0
+    turno[antes_primeiro] = num_turnos - 1
+    dia[antes_primeiro] -= 1
+
+    return dia * num_turnos + turno
+
+
+def _agrupar_leituras(
+    df_leituras: pd.DataFrame,
+    modo: str,
+    tamanho: int | None,
+    janela: str | None,
+    inicios_turno: list[str] | None,
+    coluna_tempo: str,
+    coluna_valor: str,
+) -> tuple[np.ndarray, np.ndarray] | None:
+    if modo not in MODOS_AGRUPAMENTO:
+        print(f"ERRO: Modo de agrupamento '{modo}' inválido. Use {MODOS_AGRUPAMENTO}.")
+        return None
+
+    valores = pd.to_numeric(df_leituras[coluna_valor], errors="coerce").to_numpy(
+        dtype=np.float64
+    )
+    tempos_ns = _converter_tempo_ns(df_leituras[coluna_tempo])
+
+    validos = ~np.isnan(valores) & (tempos_ns != np.iinfo(np.int64).min)
+    if not validos.all():
+        print(f"Aviso: {int((~validos).sum())} leitura(s) inválida(s) ignorada(s).")
+        valores = valores[validos]
+        tempos_ns = tempos_ns[validos]
+
+    if len(valores) == 0:
+        print("ERRO: Nenhuma leitura válida para formar subgrupos.")
+        return None
+
+    ordem = np.argsort(tempos_ns, kind="stable")
+    tempos_ns = tempos_ns[ordem]
+    valores = valores[ordem]
+
+    if modo == "contagem":
+        if not tamanho or tamanho < 2:
+            print("ERRO: O modo 'contagem' exige tamanho >= 2.")
+            return None
+        ids = np.arange(len(valores)) // tamanho
+    elif modo == "janela":
+        if not janela:
+            print("ERRO: O modo 'janela' exige a duração da janela (ex.: '15min').")
+            return None
+        janela_ns = pd.Timedelta(janela).value
+        ids = tempos_ns // janela_ns
+    else:
+        if not inicios_turno:
+            print("ERRO: O modo 'turno' exige os horários de início dos turnos.")
+            return None
+        ids = _ids_por_turno(tempos_ns, inicios_turno)
+
+    fronteiras = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    offsets = np.concatenate(([0], fronteiras, [len(valores)])).astype(np.int64)
+    return valores, offsets
+
+
+def formar_subgrupos(
+    df_leituras: pd.DataFrame,
+    modo: str,
+    tamanho: int | None = None,
+    janela: str | None = None,
+    inicios_turno: list[str] | None = None,
+    coluna_tempo: str = "timestamp",
+    coluna_valor: str = "valor",
+) -> pd.DataFrame | None:
+    print(f"Formando subgrupos racionais (modo '{modo}')...")
+
+    try:
+        agrupadas = _agrupar_leituras(
+            df_leituras, modo, tamanho, janela, inicios_turno, coluna_tempo, coluna_valor
+        )
+        if agrupadas is None:
+            return None
+        valores, offsets = agrupadas
+
+        estatisticas = leitura_dados.calcular_estatisticas_subgrupos(valores, offsets)
+        amostras = np.arange(1, len(offsets), dtype=np.int64)
+
+        df_processado = leitura_dados.montar_frame_subgrupos(amostras, estatisticas)
+        print(
+            f"{len(valores)} leituras agrupadas em {len(df_processado)} subgrupos válidos."
+        )
+        return df_processado
+
+    except Exception as e:
+        print(f"ERRO ao formar subgrupos racionais: {e}")
+        return None
+
+
+def ler_subgrupos_leituras(
+    caminho_arquivo: str,
+    modo: str,
+    tamanho: int | None = None,
+    janela: str | None = None,
+    inicios_turno: list[str] | None = None,
+    coluna_tempo: str = "timestamp",
+    coluna_valor: str = "valor",
+) -> tuple[np.ndarray, np.ndarray] | None:
+    # Mesmo formato de leitura_dados._ler_subgrupos_brutos (Amostra, Dados), para
+    # que carregar_historico_xr receba as leituras já agrupadas.
+    df_leituras = carregar_leituras_brutas(caminho_arquivo, coluna_tempo, coluna_valor)
+    if df_leituras is None:
+        return None
+
+    print(f"Formando subgrupos racionais (modo '{modo}')...")
+    try:
+        agrupadas = _agrupar_leituras(
+            df_leituras, modo, tamanho, janela, inicios_turno, coluna_tempo, coluna_valor
+        )
+    except Exception as e:
+        print(f"ERRO ao formar subgrupos racionais: {e}")
+        return None
+    if agrupadas is None:
+        return None
+    valores, offsets = agrupadas
+
+    dados = np.empty(len(offsets) - 1, dtype=object)
+    for i in range(len(dados)):
+        dados[i] = valores[offsets[i] : offsets[i + 1]]
+    print(f"{len(valores)} leituras agrupadas em {len(dados)} subgrupos.")
+    return np.arange(1, len(offsets), dtype=np.int64), dados
+
+
+def carregar_dados_leituras_xr(
+    caminho_arquivo: str,
+    modo: str,
+    tamanho: int | None = None,
+    janela: str | None = None,
+    inicios_turno: list[str] | None = None,
+    coluna_tempo: str = "timestamp",
+    coluna_valor: str = "valor",
+) -> tuple[pd.DataFrame | None, int | None]:
+    df_leituras = carregar_leituras_brutas(caminho_arquivo, coluna_tempo, coluna_valor)
+    if df_leituras is None:
+        return None, None
+
+    df_processado = formar_subgrupos(
+        df_leituras,
+        modo,
+        tamanho=tamanho,
+        janela=janela,
+        inicios_turno=inicios_turno,
+        coluna_tempo=coluna_tempo,
+        coluna_valor=coluna_valor,
+    )
+    if df_processado is None or len(df_processado) == 0:
+        return None, None
+
+    n_amostra = int(df_processado["n"].mode().iloc[0])
+    print(f"Tamanho da amostra (n) de referência: {n_amostra}")
+    return df_processado, n_amostra
@@ -1,6 +1,9 @@
 import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
 import json
 from scipy.stats import norm
+from software import constantes_cep
 
 
 def calcular_sigma_estimado(
@@ -8,12 +11,12 @@ def calcular_sigma_estimado(
 ) -> float | None:
     print(f"Calculando Sigma (Desvio Padrão) para n={n_amostra}...")
 
-    n_str = str(n_amostra)
-    if n_str not in constantes_db:
+    constantes = constantes_cep.obter_constantes(n_amostra, constantes_db)
+    if constantes is None:
         print(f"ERRO: Constantes para n={n_amostra} não encontradas.")
         return None
 
-    d2 = constantes_db[n_str].get("d2")
+    d2 = constantes.get("d2")
     if d2 is None:
         print(f"ERRO: Constante 'd2' não encontrada para n={n_amostra}.")
         return None
@@ -116,8 +119,49 @@ def calcular_probabilidade_lt(
     }
 
 
+def calcular_capacidade_percentil(sketch, LSE: float, LIE: float) -> dict | None:
+    print("Calculando Pp/Ppk pelo método dos percentis (sketch de quantis)...")
+
+    if sketch.total == 0:
+        print("ERRO: Sketch de quantis vazio, impossível calcular Pp/Ppk percentil.")
+        return None
+
+    x_inferior, mediana, x_superior = sketch.quantil([0.00135, 0.5, 0.99865])
+    largura_processo = x_superior - x_inferior
+
+    Pp = Ppu = Ppl = 0.0
+    if largura_processo > 0:
+        Pp = (LSE - LIE) / largura_processo
+    if x_superior > mediana:
+        Ppu = (LSE - mediana) / (x_superior - mediana)
+    if mediana > x_inferior:
+        Ppl = (mediana - LIE) / (mediana - x_inferior)
+    Ppk = min(Ppu, Ppl)
+
+    prob_abaixo = float(sketch.cdf(LIE))
+    prob_acima = 1.0 - float(sketch.cdf(LSE))
+    prob_defeito_total = prob_abaixo + prob_acima
+
+    print(f"Capacidade Percentil: Pp={Pp:.3f}, Ppk={Ppk:.3f}")
+
+    return {
+        "metodo": "percentil (t-digest)",
+        "num_medicoes": int(round(sketch.total)),
+        "quantil_0_135": float(x_inferior),
+        "mediana": float(mediana),
+        "quantil_99_865": float(x_superior),
+        "Pp": float(Pp),
+        "Ppk": float(Ppk),
+        "Ppu": float(Ppu),
+        "Ppl": float(Ppl),
+        "prob_defeito_abaixo_LIE": prob_abaixo,
+        "prob_defeito_acima_LSE": prob_acima,
+        "ppm_empirico": prob_defeito_total * 1_000_000,
+    }
+
+
 def executar_analise_completa(
-    info_limites_xr: dict, constantes_db: dict, especificacoes: dict
+    info_limites_xr: dict, constantes_db: dict, especificacoes: dict, sketch=None
 ) -> dict | None:
     print("\nIniciando análise completa de capacidade e probabilidade...")
     try:
@@ -182,6 +226,11 @@ def executar_analise_completa(
         if prob_arbitraria_info:
             resultados_finais["probabilidade_arbitraria_q2_3"] = prob_arbitraria_info
 
+        if sketch is not None:
+            info_percentil = calcular_capacidade_percentil(sketch, LSE, LIE)
+            if info_percentil:
+                resultados_finais["capacidade_percentil_lt"] = info_percentil
+
         print("Análise de capacidade e probabilidade concluída.")
         return resultados_finais
 
@@ -191,3 +240,147 @@ def executar_analise_completa(
     except Exception as e:
         print(f"ERRO inesperado na análise de capacidade: {e}")
         return None
+
+
+def _somas_acumuladas(valores: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0.0], np.cumsum(valores, dtype=np.float64)))
+
+
+def calcular_tendencia_capacidade(
+    df_subgrupos: pd.DataFrame,
+    n_amostra: int,
+    especificacoes: dict,
+    constantes_db: dict,
+    janela: int | None = None,
+    minimo_subgrupos: int = 2,
+) -> pd.DataFrame | None:
+    tipo = f"móvel de {janela} subgrupos" if janela else "expansiva"
+    print(f"Calculando tendência de capacidade (janela {tipo})...")
+    try:
+        LSE = especificacoes["LSE"]
+        LIE = especificacoes["LIE"]
+
+        K = len(df_subgrupos)
+        if "n" in df_subgrupos.columns:
+            tamanhos = df_subgrupos["n"].to_numpy(dtype=np.float64)
+        else:
+            tamanhos = np.full(K, float(n_amostra))
+
+        n_unicos, inverso = np.unique(tamanhos.astype(np.int64), return_inverse=True)
+        d2_unicos = np.array(
+            [constantes_cep.obter_constantes(int(n), constantes_db)["d2"] for n in n_unicos]
+        )
+        d2 = d2_unicos[inverso]
+
+        # Centraliza antes de acumular quadrados para evitar cancelamento numérico.
+        x_barra = df_subgrupos["X_barra"].to_numpy(dtype=np.float64)
+        referencia = float(np.average(x_barra, weights=tamanhos))
+        desvio_media = x_barra - referencia
+
+        cs_n = _somas_acumuladas(tamanhos)
+        cs_soma = _somas_acumuladas(tamanhos * desvio_media)
+        cs_sigma_r = _somas_acumuladas(df_subgrupos["R"].to_numpy(dtype=np.float64) / d2)
+
+        tem_s = "S" in df_subgrupos.columns
+        if tem_s:
+            s = df_subgrupos["S"].to_numpy(dtype=np.float64)
+            soma_quadrados = (tamanhos - 1) * s * s + tamanhos * desvio_media**2
+            cs_quadrados = _somas_acumuladas(soma_quadrados)
+
+        fim = np.arange(1, K + 1)
+        if janela:
+            inicio = np.maximum(fim - janela, 0)
+            completas = (fim - inicio) == janela
+        else:
+            inicio = np.zeros(K, dtype=np.int64)
+            completas = fim >= minimo_subgrupos
+        fim = fim[completas]
+        inicio = inicio[completas]
+
+        if len(fim) == 0:
+            print("AVISO: Subgrupos insuficientes para a janela de capacidade.")
+            return None
+
+        num_subgrupos = fim - inicio
+        total_n = cs_n[fim] - cs_n[inicio]
+        desvio_mu = (cs_soma[fim] - cs_soma[inicio]) / total_n
+        mu = referencia + desvio_mu
+        sigma = (cs_sigma_r[fim] - cs_sigma_r[inicio]) / num_subgrupos
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            Cp = (LSE - LIE) / (6 * sigma)
+            Cpk = np.minimum(LSE - mu, mu - LIE) / (3 * sigma)
+            ppm = (norm.cdf(LIE, loc=mu, scale=sigma) + norm.sf(LSE, loc=mu, scale=sigma)) * 1_000_000
+
+        amostras = df_subgrupos["Amostra"].to_numpy()
+        df_tendencia = pd.DataFrame(
+            {
+                "Amostra_inicio": amostras[inicio],
+                "Amostra_fim": amostras[fim - 1],
+                "num_subgrupos": num_subgrupos,
+                "media": mu,
+                "sigma_estimado": sigma,
+                "Cp": Cp,
+                "Cpk": Cpk,
+                "ppm_st": ppm,
+            }
+        )
+
+        if tem_s:
+            soma_q = cs_quadrados[fim] - cs_quadrados[inicio]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sigma_total = np.sqrt(
+                    np.maximum(soma_q - total_n * desvio_mu**2, 0.0) / (total_n - 1)
+                )
+                df_tendencia["sigma_total"] = sigma_total
+                df_tendencia["Pp"] = (LSE - LIE) / (6 * sigma_total)
+                df_tendencia["Ppk"] = np.minimum(LSE - mu, mu - LIE) / (3 * sigma_total)
+
+        print(f"Tendência de capacidade calculada para {len(df_tendencia)} janelas.")
+        return df_tendencia
+
+    except KeyError as e:
+        print(f"ERRO: Chave faltando para tendência de capacidade: {e}")
+        return None
+    except Exception as e:
+        print(f"ERRO inesperado na tendência de capacidade: {e}")
+        return None
+
+
+def plotar_tendencia_capacidade(
+    df_tendencia: pd.DataFrame, caminho_saida_grafico: str
+) -> bool:
+    print(f"Gerando gráfico de tendência de capacidade em: {caminho_saida_grafico}")
+    try:
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 9), sharex=True)
+        fig.suptitle("Tendência de Capacidade do Processo", fontsize=16)
+
+        eixo_x = df_tendencia["Amostra_fim"].astype(str)
+
+        ax1.plot(eixo_x, df_tendencia["Cp"], marker="o", color="b", label="Cp")
+        ax1.plot(eixo_x, df_tendencia["Cpk"], marker="s", color="c", label="Cpk")
+        if "Ppk" in df_tendencia.columns:
+            ax1.plot(
+                eixo_x, df_tendencia["Ppk"], marker="^", color="m", linestyle=":", label="Ppk"
+            )
+        ax1.axhline(y=1.33, color="g", linestyle="--", label="Referência 1.33")
+        ax1.axhline(y=1.0, color="r", linestyle="--", label="Referência 1.00")
+        ax1.set_ylabel("Índice")
+        ax1.legend(loc="best")
+        ax1.grid(True, linestyle=":", alpha=0.6)
+
+        ax2.plot(eixo_x, df_tendencia["ppm_st"], marker="o", color="orange", label="PPM (ST)")
+        ax2.set_xlabel("Amostra final da janela")
+        ax2.set_ylabel("PPM")
+        ax2.legend(loc="best")
+        ax2.grid(True, linestyle=":", alpha=0.6)
+
+        plt.xticks(rotation=90, fontsize=8)
+        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+        plt.savefig(caminho_saida_grafico)
+        plt.close(fig)
+        return True
+
+    except Exception as e:
+        print(f"ERRO ao gerar gráfico de tendência de capacidade: {e}")
+        return False
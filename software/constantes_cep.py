@@ -0,0 +1,141 @@
+import os
+import json
+import math
+from functools import lru_cache
+
+import numpy as np
+from scipy.special import gammaln
+from scipy.stats import norm
+
+NOMES_CONSTANTES = ("d2", "d3", "c4", "A2", "A3", "D3", "D4", "B3", "B4")
+
+_PASSOS_INTEGRACAO_X = 4001
+_PASSOS_INTEGRACAO_W = 2001
+_LIMITE_INTEGRACAO_X = 9.0
+
+# np.trapezoid existe a partir do numpy 2.0; versões anteriores só têm np.trapz.
+_integrar_trapezio = getattr(np, "trapezoid", None) or np.trapz
+
+_caminho_cache_disco = None
+_tabela_disco = None
+
+
+def configurar_cache_disco(caminho_arquivo: str | None) -> None:
+    global _caminho_cache_disco, _tabela_disco
+    _caminho_cache_disco = caminho_arquivo
+    _tabela_disco = None
+
+
+def _calcular_momentos_amplitude(n_amostra: int) -> tuple[float, float]:
+    # Distribuição da amplitude relativa W = R / sigma para amostras normais:
+    # P(W <= w) = n * integral phi(x) * [Phi(x + w) - Phi(x)]^(n-1) dx
+    # d2 = E[W] = integral (1 - F(w)) dw ; E[W^2] = 2 * integral w (1 - F(w)) dw
+    x = np.linspace(-_LIMITE_INTEGRACAO_X, _LIMITE_INTEGRACAO_X, _PASSOS_INTEGRACAO_X)
+    w_max = 2.0 * _LIMITE_INTEGRACAO_X
+    w = np.linspace(0.0, w_max, _PASSOS_INTEGRACAO_W)
+
+    pdf_x = norm.pdf(x)
+    cdf_x = norm.cdf(x)
+
+    F_w = np.empty_like(w)
+    for inicio in range(0, len(w), 256):
+        bloco = w[inicio : inicio + 256]
+        diferenca = norm.cdf(x[None, :] + bloco[:, None]) - cdf_x[None, :]
+        integrando = pdf_x[None, :] * np.power(diferenca, n_amostra - 1)
+        F_w[inicio : inicio + 256] = n_amostra * _integrar_trapezio(integrando, x, axis=1)
+
+    sobrevivencia = np.clip(1.0 - F_w, 0.0, 1.0)
+    d2 = _integrar_trapezio(sobrevivencia, w)
+    momento_2 = 2.0 * _integrar_trapezio(w * sobrevivencia, w)
+    d3 = math.sqrt(max(momento_2 - d2 * d2, 0.0))
+    return float(d2), float(d3)
+
+
+def calcular_c4(n_amostra: int) -> float:
+    log_razao = gammaln(n_amostra / 2.0) - gammaln((n_amostra - 1) / 2.0)
+    return float(math.sqrt(2.0 / (n_amostra - 1)) * math.exp(log_razao))
+
+
+@lru_cache(maxsize=512)
+def _gerar_constantes_memoizado(n_amostra: int) -> tuple[float, ...]:
+    d2, d3 = _calcular_momentos_amplitude(n_amostra)
+    c4 = calcular_c4(n_amostra)
+    raiz_n = math.sqrt(n_amostra)
+    fator_s = 3.0 * math.sqrt(max(1.0 - c4 * c4, 0.0)) / c4
+
+    valores = {
+        "d2": d2,
+        "d3": d3,
+        "c4": c4,
+        "A2": 3.0 / (d2 * raiz_n),
+        "A3": 3.0 / (c4 * raiz_n),
+        "D3": max(0.0, 1.0 - 3.0 * d3 / d2),
+        "D4": 1.0 + 3.0 * d3 / d2,
+        "B3": max(0.0, 1.0 - fator_s),
+        "B4": 1.0 + fator_s,
+    }
+    return tuple(valores[nome] for nome in NOMES_CONSTANTES)
+
+
+def gerar_constantes(n_amostra: int) -> dict:
+    if n_amostra < 2:
+        raise ValueError(f"Constantes CEP exigem n >= 2 (recebido n={n_amostra}).")
+    return dict(zip(NOMES_CONSTANTES, _gerar_constantes_memoizado(int(n_amostra))))
+
+
+def _carregar_tabela_disco() -> dict:
+    global _tabela_disco
+    if _tabela_disco is not None:
+        return _tabela_disco
+
+    _tabela_disco = {}
+    if _caminho_cache_disco and os.path.exists(_caminho_cache_disco):
+        try:
+            with open(_caminho_cache_disco, "r") as f:
+                _tabela_disco = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"AVISO: Cache de constantes ignorado ({e}).")
+            _tabela_disco = {}
+    return _tabela_disco
+
+
+def _salvar_tabela_disco(tabela: dict) -> None:
+    if not _caminho_cache_disco:
+        return
+    try:
+        pasta = os.path.dirname(_caminho_cache_disco)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        caminho_tmp = f"{_caminho_cache_disco}.{os.getpid()}.tmp"
+        with open(caminho_tmp, "w") as f:
+            json.dump(tabela, f, indent=4, sort_keys=True)
+        os.replace(caminho_tmp, _caminho_cache_disco)
+    except OSError as e:
+        print(f"AVISO: Não foi possível gravar cache de constantes: {e}")
+
+
+def obter_constantes(n_amostra: int, constantes_db: dict | None = None) -> dict | None:
+    n_amostra = int(n_amostra)
+    n_str = str(n_amostra)
+
+    if n_amostra < 2:
+        print(f"ERRO: Constantes CEP exigem n >= 2 (recebido n={n_amostra}).")
+        return None
+
+    tabela = _carregar_tabela_disco()
+    calculadas = tabela.get(n_str)
+
+    if calculadas is None or any(nome not in calculadas for nome in NOMES_CONSTANTES):
+        calculadas = gerar_constantes(n_amostra)
+        if _caminho_cache_disco:
+            tabela[n_str] = calculadas
+            _salvar_tabela_disco(tabela)
+
+    constantes = dict(calculadas)
+
+    if constantes_db and n_str in constantes_db:
+        constantes.update(
+            {k: v for k, v in constantes_db[n_str].items() if v is not None}
+        )
+
+    return constantes
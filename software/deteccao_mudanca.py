@@ -0,0 +1,141 @@
+import os
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from software import graficos_variaveis
+
+TAMANHO_MINIMO_SEGMENTO = 15
+COLUNAS_MUDANCA_XR = ("X_barra", "R")
+# Mediana de |X_t - X_{t-1}| para X ~ N(0, 1): sqrt(2) * 0.6745.
+_MEDIANA_AMPLITUDE_MOVEL = 0.9539
+
+
+def _escala_robusta(serie: np.ndarray) -> float:
+    amplitudes_moveis = np.abs(np.diff(serie))
+    escala = float(np.median(amplitudes_moveis)) / _MEDIANA_AMPLITUDE_MOVEL
+    if escala <= 0 or not np.isfinite(escala):
+        escala = float(np.std(serie)) or 1.0
+    return escala
+
+
+def detectar_pontos_mudanca(
+    series: np.ndarray,
+    penalidade: float | None = None,
+    tamanho_minimo: int = TAMANHO_MINIMO_SEGMENTO,
+) -> list[int]:
+    series = np.asarray(series, dtype=np.float64)
+    if series.ndim == 1:
+        series = series[:, None]
+    n, dimensoes = series.shape
+    if n < 2 * tamanho_minimo:
+        return []
+    if penalidade is None:
+        # BIC: uma média por dimensão e a posição da mudança, com variância unitária.
+        penalidade = (dimensoes + 1) * math.log(n)
+
+    # Custo de um segmento [s, t) com média própria = SQ - S^2 / L (O(1) via somas acumuladas).
+    somas = np.vstack([np.zeros(dimensoes), np.cumsum(series, axis=0)])
+    somas_quad = np.vstack([np.zeros(dimensoes), np.cumsum(series**2, axis=0)])
+
+    def _custo(inicios, fins) -> np.ndarray:
+        comprimento = np.asarray(fins - inicios, dtype=np.float64)[..., None]
+        soma = somas[fins] - somas[inicios]
+        soma_quad = somas_quad[fins] - somas_quad[inicios]
+        return (soma_quad - soma**2 / comprimento).sum(axis=-1)
+
+    # Segmentação binária: cada segmento avalia todos os cortes de uma vez (O(L) por nível).
+    pontos = []
+    pendentes = [(0, n)]
+    while pendentes:
+        inicio, fim = pendentes.pop()
+        cortes = np.arange(inicio + tamanho_minimo, fim - tamanho_minimo + 1)
+        if len(cortes) == 0:
+            continue
+        ganhos = _custo(inicio, fim) - _custo(inicio, cortes) - _custo(cortes, fim)
+        melhor = int(np.argmax(ganhos))
+        if ganhos[melhor] <= penalidade:
+            continue
+        corte = int(cortes[melhor])
+        pontos.append(corte)
+        pendentes.extend([(inicio, corte), (corte, fim)])
+
+    return sorted(pontos)
+
+
+def detectar_mudancas_xr(
+    df: pd.DataFrame,
+    penalidade: float | None = None,
+    tamanho_minimo: int = TAMANHO_MINIMO_SEGMENTO,
+) -> list[int]:
+    print(f"Detectando mudanças de patamar em {len(df)} subgrupos (X-barra e log R)...")
+    colunas = []
+    for nome in COLUNAS_MUDANCA_XR:
+        serie = df[nome].to_numpy(dtype=np.float64)
+        if nome == "R":
+            # log(R) estabiliza a variância, que cresce com o próprio sigma do processo.
+            serie = np.log(serie + 0.01 * max(float(np.median(serie)), 1e-12))
+        colunas.append((serie - np.median(serie)) / _escala_robusta(serie))
+
+    pontos = detectar_pontos_mudanca(np.column_stack(colunas), penalidade, tamanho_minimo)
+    if pontos:
+        amostras = df["Amostra"].to_numpy()[pontos].tolist()
+        print(f"{len(pontos)} mudança(s) detectada(s) a partir das amostras: {amostras}")
+    else:
+        print("Nenhuma mudança de patamar detectada.")
+    return pontos
+
+
+def recalibrar_por_segmento(
+    df: pd.DataFrame,
+    n_amostra: int,
+    constantes_db: dict,
+    pontos_mudanca: list[int],
+    iterativo: bool = False,
+) -> list[dict]:
+    calibrar = (
+        graficos_variaveis.calibrar_limites_xr_iterativo
+        if iterativo
+        else graficos_variaveis.calibrar_limites_xr
+    )
+    fronteiras = [0] + list(pontos_mudanca) + [len(df)]
+    amostras = df["Amostra"].to_numpy()
+
+    versoes = []
+    for versao, (inicio, fim) in enumerate(zip(fronteiras[:-1], fronteiras[1:]), start=1):
+        segmento = df.iloc[inicio:fim]
+        tamanhos = segmento["n"] if "n" in segmento.columns else None
+        n_segmento = int(tamanhos.mode().iloc[0]) if tamanhos is not None else n_amostra
+
+        info_limites = calibrar(segmento, n_segmento, constantes_db)
+        if info_limites is None:
+            print(f"ERRO: Falha ao recalibrar o segmento {versao} ({inicio}-{fim - 1}).")
+            continue
+
+        versoes.append(
+            {
+                "versao": versao,
+                "indice_inicio": int(inicio),
+                "indice_fim": int(fim - 1),
+                "Amostra_inicio": str(amostras[inicio]),
+                "Amostra_fim": str(amostras[fim - 1]),
+                "num_subgrupos": int(fim - inicio),
+                "limites": info_limites,
+            }
+        )
+    return versoes
+
+
+def salvar_versoes_limites(versoes: list[dict], caminho_arquivo: str) -> bool:
+    try:
+        caminho_tmp = f"{caminho_arquivo}.tmp"
+        with open(caminho_tmp, "w") as f:
+            json.dump(versoes, f, indent=4, ensure_ascii=False)
+        os.replace(caminho_tmp, caminho_arquivo)
+        print(f"{len(versoes)} versão(ões) de limites salvas em: {caminho_arquivo}")
+        return True
+    except Exception as e:
+        print(f"ERRO ao salvar versões de limites: {e}")
+        return False
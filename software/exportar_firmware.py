@@ -0,0 +1,328 @@
+import os
+import sys
+import glob
+import json
+import math
+import zlib
+import struct
+import argparse
+
+import numpy as np
+
+from software import graficos_variaveis
+from software.leitura_dados import PREFIXO_LIMITES
+
+MAGICO_BLOB = b"CEPL"
+VERSAO_BLOB = 1
+TAMANHO_NOME = 32
+CAMPOS_LIMITES = (
+    "LM",
+    "LSC",
+    "LIC",
+    "LSC_2S",
+    "LIC_2S",
+    "LSC_1S",
+    "LIC_1S",
+    "LSE",
+    "LIE",
+    "LSC_R",
+    "LIC_R",
+)
+# Mesmo layout do struct CepLimites do cabeçalho gerado (little-endian, 80 bytes).
+FORMATO_CABECALHO_BLOB = "<4sHH"
+FORMATO_REGISTRO_BLOB = f"<{TAMANHO_NOME}sHH{len(CAMPOS_LIMITES)}f"
+FORMATO_CRC_BLOB = "<I"
+
+CLASSE_VERDE = 0
+CLASSE_AMARELO = 1
+CLASSE_VERMELHO = 2
+MAX_N_FIRMWARE = 25
+
+# Processos classificados pelo firmware cepsom (PROCESSO_FIRMWARE em src/main.cpp).
+PROCESSOS_FIRMWARE = ("dados_simulado_prova_1",)
+
+
+def montar_limites_firmware(info_limites: dict, especificacoes: dict | None) -> dict | None:
+    # O firmware agrupa n leituras por subgrupo: limites por subgrupo (n variável) não cabem.
+    if "limites_X_barra" not in info_limites or "limites_variaveis" in info_limites:
+        return None
+
+    zonas = graficos_variaveis.calcular_zonas_weco(info_limites["limites_X_barra"])
+    limites_r = info_limites.get("limites_R", {})
+    especificacoes = especificacoes or {}
+
+    limites = {campo: zonas[campo] for campo in CAMPOS_LIMITES if campo in zonas}
+    limites["LSE"] = especificacoes.get("LSE", math.nan)
+    limites["LIE"] = especificacoes.get("LIE", math.nan)
+    limites["LSC_R"] = limites_r.get("LSC", math.nan)
+    limites["LIC_R"] = limites_r.get("LIC", math.nan)
+    limites["n"] = int(info_limites.get("n_amostra", 0))
+    return limites
+
+
+def coletar_limites(
+    pasta_limites: str,
+    caminho_especs: str | None = None,
+    processos: list[str] | None = None,
+) -> dict:
+    todas_especs = {}
+    if caminho_especs and os.path.exists(caminho_especs):
+        with open(caminho_especs, "r") as f:
+            todas_especs = json.load(f)
+
+    # Sem lista explícita, exporta todos os limites_*.json da pasta.
+    if processos is None:
+        padrao = os.path.join(pasta_limites, f"{PREFIXO_LIMITES}*.json")
+        processos = [
+            os.path.basename(caminho)[len(PREFIXO_LIMITES) : -len(".json")]
+            for caminho in sorted(glob.glob(padrao))
+        ]
+
+    limites_por_processo = {}
+    for nome in processos:
+        caminho = os.path.join(pasta_limites, f"{PREFIXO_LIMITES}{nome}.json")
+        try:
+            with open(caminho, "r") as f:
+                info_limites = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"AVISO: Limites de '{nome}' não puderam ser lidos: {e}")
+            continue
+
+        limites = montar_limites_firmware(info_limites, todas_especs.get(nome))
+        if limites is None:
+            print(f"*Aviso: '{nome}' não é um gráfico X-R de n fixo; ignorado na exportação.")
+            continue
+        if not 2 <= limites["n"] <= MAX_N_FIRMWARE:
+            print(f"*Aviso: n={limites['n']} de '{nome}' fora de 2..{MAX_N_FIRMWARE}; ignorado.")
+            continue
+        if len(nome.encode("utf-8")) >= TAMANHO_NOME:
+            print(f"*Aviso: Nome '{nome}' truncado para {TAMANHO_NOME - 1} bytes.")
+        limites_por_processo[nome] = limites
+
+    return limites_por_processo
+
+
+def _literal_c_nome(nome: str) -> str:
+    dados = nome.encode("utf-8")[: TAMANHO_NOME - 1]
+    caracteres = []
+    for byte in dados:
+        if 32 <= byte < 127 and chr(byte) not in '"\\?':
+            caracteres.append(chr(byte))
+        else:
+            caracteres.append(f"\\{byte:03o}")
+    return '"' + "".join(caracteres) + '"'
+
+
+def _literal_c_float(valor: float) -> str:
+    if math.isnan(valor):
+        return "NAN"
+    texto = f"{float(np.float32(valor)):.9g}"
+    if "." not in texto and "e" not in texto:
+        texto += ".0"
+    return f"{texto}f"
+
+
+def gerar_cabecalho_c(limites_por_processo: dict) -> str:
+    campos_struct = "\n".join(f"    float {campo.lower()};" for campo in CAMPOS_LIMITES)
+    registros = []
+    for nome, limites in limites_por_processo.items():
+        valores = ", ".join(_literal_c_float(limites[campo]) for campo in CAMPOS_LIMITES)
+        registros.append(f"    {{{_literal_c_nome(nome)}, {limites['n']}, 0, {valores}}},")
+
+    return f"""// Gerado por software/exportar_firmware.py a partir de limites_*.json.
+// Não edite manualmente: execute `python -m software.exportar_firmware` novamente.
+#ifndef CEP_LIMITES_H
+#define CEP_LIMITES_H
+
+#include <math.h>
+#include <stdint.h>
+#include <string.h>
+
+#define CEP_NUM_PROCESSOS {len(limites_por_processo)}
+#define CEP_MAX_N {MAX_N_FIRMWARE}
+
+typedef struct {{
+    char nome[{TAMANHO_NOME}];
+    uint16_t n;
+    uint16_t reservado;
+{campos_struct}
+}} CepLimites;
+
+#ifdef __cplusplus
+static_assert(sizeof(CepLimites) == {struct.calcsize(FORMATO_REGISTRO_BLOB)}, "layout de CepLimites");
+#else
+_Static_assert(sizeof(CepLimites) == {struct.calcsize(FORMATO_REGISTRO_BLOB)}, "layout de CepLimites");
+#endif
+
+typedef enum {{ CEP_VERDE = {CLASSE_VERDE}, CEP_AMARELO = {CLASSE_AMARELO}, CEP_VERMELHO = {CLASSE_VERMELHO} }} CepClasse;
+
+static const CepLimites CEP_LIMITES[] = {{
+{chr(10).join(registros)}
+}};
+
+static inline const CepLimites* cep_buscar_limites(const char* nome) {{
+    for (int i = 0; i < CEP_NUM_PROCESSOS; i++) {{
+        if (strncmp(CEP_LIMITES[i].nome, nome, {TAMANHO_NOME}) == 0) return &CEP_LIMITES[i];
+    }}
+    return NULL;
+}}
+
+// Os limites valem para subgrupos de l->n leituras: X-barra contra LSC/LIC e as
+// zonas de 2 sigma, R contra LSC_R/LIC_R. Vermelho: fora dos limites de X-barra ou R.
+// Amarelo: X-barra além de 2 sigma.
+static inline CepClasse cep_classificar_subgrupo(const CepLimites* l, const float* valores) {{
+    float soma = 0.0f, minimo = valores[0], maximo = valores[0];
+    for (int i = 0; i < l->n; i++) {{
+        soma += valores[i];
+        if (valores[i] < minimo) minimo = valores[i];
+        if (valores[i] > maximo) maximo = valores[i];
+    }}
+    float media = soma / l->n;
+    float amplitude = maximo - minimo;
+    if (media > l->lsc || media < l->lic || amplitude > l->lsc_r || amplitude < l->lic_r) return CEP_VERMELHO;
+    if (media > l->lsc_2s || media < l->lic_2s) return CEP_AMARELO;
+    return CEP_VERDE;
+}}
+
+// A especificação vale para cada peça. Comparações com NAN são falsas, então
+// especificações ausentes são ignoradas.
+static inline int cep_fora_especificacao(const CepLimites* l, float valor) {{
+    return valor > l->lse || valor < l->lie;
+}}
+
+#endif
+"""
+
+
+def gerar_blob(limites_por_processo: dict) -> bytes:
+    partes = [
+        struct.pack(
+            FORMATO_CABECALHO_BLOB, MAGICO_BLOB, VERSAO_BLOB, len(limites_por_processo)
+        )
+    ]
+    for nome, limites in limites_por_processo.items():
+        partes.append(
+            struct.pack(
+                FORMATO_REGISTRO_BLOB,
+                nome.encode("utf-8")[: TAMANHO_NOME - 1],
+                limites["n"],
+                0,
+                *(limites[campo] for campo in CAMPOS_LIMITES),
+            )
+        )
+    corpo = b"".join(partes)
+    return corpo + struct.pack(FORMATO_CRC_BLOB, zlib.crc32(corpo))
+
+
+def ler_blob(dados: bytes) -> dict:
+    tamanho_cabecalho = struct.calcsize(FORMATO_CABECALHO_BLOB)
+    tamanho_registro = struct.calcsize(FORMATO_REGISTRO_BLOB)
+    tamanho_crc = struct.calcsize(FORMATO_CRC_BLOB)
+
+    if len(dados) < tamanho_cabecalho + tamanho_crc:
+        raise ValueError("Blob de limites truncado.")
+    magico, versao, num_processos = struct.unpack_from(FORMATO_CABECALHO_BLOB, dados)
+    if magico != MAGICO_BLOB or versao != VERSAO_BLOB:
+        raise ValueError(f"Blob de limites inválido (mágico {magico!r}, versão {versao}).")
+    if len(dados) != tamanho_cabecalho + num_processos * tamanho_registro + tamanho_crc:
+        raise ValueError("Tamanho do blob incompatível com o número de processos.")
+    (crc,) = struct.unpack_from(FORMATO_CRC_BLOB, dados, len(dados) - tamanho_crc)
+    if crc != zlib.crc32(dados[:-tamanho_crc]):
+        raise ValueError("CRC do blob de limites não confere.")
+
+    limites_por_processo = {}
+    for i in range(num_processos):
+        nome, n, _, *valores = struct.unpack_from(
+            FORMATO_REGISTRO_BLOB, dados, tamanho_cabecalho + i * tamanho_registro
+        )
+        limites = dict(zip(CAMPOS_LIMITES, valores))
+        limites["n"] = n
+        limites_por_processo[nome.rstrip(b"\0").decode("utf-8")] = limites
+    return limites_por_processo
+
+
+def classificar_subgrupo(limites: dict, valores) -> int:
+    # Réplica de cep_classificar_subgrupo em float32, para conferir o firmware no host.
+    v = np.asarray(valores, dtype=np.float32)
+    l = {campo: np.float32(limites[campo]) for campo in CAMPOS_LIMITES}
+    soma = np.float32(0.0)
+    for valor in v:
+        soma = np.float32(soma + valor)
+    media = np.float32(soma / np.float32(len(v)))
+    amplitude = np.float32(v.max() - v.min())
+    if media > l["LSC"] or media < l["LIC"] or amplitude > l["LSC_R"] or amplitude < l["LIC_R"]:
+        return CLASSE_VERMELHO
+    if media > l["LSC_2S"] or media < l["LIC_2S"]:
+        return CLASSE_AMARELO
+    return CLASSE_VERDE
+
+
+def fora_especificacao(limites: dict, valor: float) -> bool:
+    v = np.float32(valor)
+    return bool(v > np.float32(limites["LSE"]) or v < np.float32(limites["LIE"]))
+
+
+def verificar_blob(dados: bytes, limites_por_processo: dict) -> bool:
+    lidos = ler_blob(dados)
+    if len(lidos) != len(limites_por_processo):
+        return False
+    for originais, convertidos in zip(limites_por_processo.values(), lidos.values()):
+        esperado = np.array([originais[c] for c in CAMPOS_LIMITES], dtype=np.float32)
+        obtido = np.array([convertidos[c] for c in CAMPOS_LIMITES], dtype=np.float32)
+        if originais["n"] != convertidos["n"] or not np.array_equal(
+            esperado, obtido, equal_nan=True
+        ):
+            return False
+    return True
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Exporta limites X-R para o firmware ESP32 (cabeçalho C e/ou blob binário)."
+    )
+    parser.add_argument(
+        "--limites",
+        default=os.path.join("resultados", "limites_calculados"),
+        help="Pasta com os arquivos limites_*.json.",
+    )
+    parser.add_argument(
+        "--especs",
+        default=os.path.join("configuracao", "especificacoes.json"),
+        help="Arquivo de especificações (LSE/LIE).",
+    )
+    parser.add_argument(
+        "--cabecalho",
+        default=os.path.join("cepsom", "include", "cep_limites.h"),
+        help="Caminho do cabeçalho C gerado.",
+    )
+    parser.add_argument(
+        "--processo",
+        nargs="+",
+        default=list(PROCESSOS_FIRMWARE),
+        help="Processos exportados (padrão: os classificados pelo firmware cepsom).",
+    )
+    parser.add_argument("--blob", default=None, help="Caminho opcional do blob binário.")
+    args = parser.parse_args(argv)
+
+    limites_por_processo = coletar_limites(args.limites, args.especs, args.processo)
+    if not limites_por_processo:
+        print("ERRO: Nenhum limite X-R encontrado para exportar.")
+        return 1
+
+    with open(args.cabecalho, "w", encoding="utf-8") as f:
+        f.write(gerar_cabecalho_c(limites_por_processo))
+    print(f"Cabeçalho C com {len(limites_por_processo)} processo(s) salvo em: {args.cabecalho}")
+
+    if args.blob:
+        blob = gerar_blob(limites_por_processo)
+        if not verificar_blob(blob, limites_por_processo):
+            print("ERRO: Verificação do blob de limites falhou.")
+            return 1
+        with open(args.blob, "wb") as f:
+            f.write(blob)
+        print(f"Blob de limites ({len(blob)} bytes) verificado e salvo em: {args.blob}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
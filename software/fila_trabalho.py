@@ -0,0 +1,503 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import subprocess
+import threading
+
+CAMINHO_MAIN = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py"
+)
+
+PASTA_PENDENTES = "pendentes"
+PASTA_EM_EXECUCAO = "em_execucao"
+PASTA_CONCLUIDOS = "concluidos"
+PASTA_FALHOS = "falhos"
+PASTA_RESULTADOS = "resultados"
+PASTA_LOGS = "logs"
+SUBPASTAS_FILA = (
+    PASTA_PENDENTES,
+    PASTA_EM_EXECUCAO,
+    PASTA_CONCLUIDOS,
+    PASTA_FALHOS,
+    PASTA_RESULTADOS,
+    PASTA_LOGS,
+)
+# Etapas de um mesmo processo rodam em sequência: capacity regrava limites_*.json,
+# que monitor e plot leem em seguida.
+ETAPAS_FILA = ("calibrate", "capacity", "monitor", "plot")
+ETAPAS_ATRIBUTOS = ("calibrate", "plot")
+PASTAS_MESCLADAS = ("limites_calculados", "graficos", "dados_processados", "sketches")
+
+MAX_TENTATIVAS_PADRAO = 3
+INTERVALO_BATIMENTO_S = 5.0
+TIMEOUT_BATIMENTO_S = 30.0
+INTERVALO_ESPERA_S = 1.0
+ESPERA_RETENTATIVA_S = 2.0
+SEPARADOR_TRABALHADOR = "__"
+SUFIXO_EXPIRADO = ".expirado-"
+SUFIXO_BATIMENTO = ".batimento"
+
+# Último conteúdo visto de cada batimento e o instante (relógio local) em que mudou.
+_batimentos_observados = {}
+
+
+def identificador_trabalhador() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def preparar_fila(pasta_fila: str) -> None:
+    for subpasta in SUBPASTAS_FILA:
+        os.makedirs(os.path.join(pasta_fila, subpasta), exist_ok=True)
+
+
+def _escrever_json_atomico(dados, caminho: str) -> None:
+    caminho_tmp = f"{caminho}.tmp-{identificador_trabalhador()}"
+    with open(caminho_tmp, "w") as f:
+        json.dump(dados, f, indent=4, ensure_ascii=False)
+    os.replace(caminho_tmp, caminho)
+
+
+def _ler_json(caminho: str):
+    with open(caminho, "r") as f:
+        return json.load(f)
+
+
+def _listar_tarefas(pasta: str) -> list[str]:
+    try:
+        return sorted(nome for nome in os.listdir(pasta) if nome.endswith(".json"))
+    except FileNotFoundError:
+        return []
+
+
+def montar_tarefas(
+    processos: list[tuple[str, str]],
+    argumentos: list[str],
+    max_tentativas: int = MAX_TENTATIVAS_PADRAO,
+) -> list[dict]:
+    tarefas = []
+    # Processos com o mesmo nome (ex.: p:linha e np:linha) compartilham a pasta de resultados.
+    ultima_por_nome = {}
+    for ordem, (tipo, nome) in enumerate(processos):
+        etapas = ETAPAS_FILA if tipo == "xr" else ETAPAS_ATRIBUTOS
+        anterior = ultima_por_nome.get(nome)
+        for etapa in etapas:
+            id_tarefa = f"{ordem:04d}_{nome}_{etapa}"
+            tarefas.append(
+                {
+                    "id": id_tarefa,
+                    "tipo": tipo,
+                    "processo": nome,
+                    "etapa": etapa,
+                    "argumentos": list(argumentos),
+                    "depende_de": anterior,
+                    "tentativas": 0,
+                    "max_tentativas": max_tentativas,
+                    "disponivel_em": 0.0,
+                    "erros": [],
+                }
+            )
+            anterior = id_tarefa
+        ultima_por_nome[nome] = anterior
+    return tarefas
+
+
+def enfileirar_tarefas(pasta_fila: str, tarefas: list[dict]) -> int:
+    preparar_fila(pasta_fila)
+    existentes = {
+        nome
+        for subpasta in (PASTA_PENDENTES, PASTA_CONCLUIDOS, PASTA_FALHOS)
+        for nome in _listar_tarefas(os.path.join(pasta_fila, subpasta))
+    }
+    existentes |= {
+        nome.rsplit(SEPARADOR_TRABALHADOR, 1)[0] + ".json"
+        for nome in os.listdir(os.path.join(pasta_fila, PASTA_EM_EXECUCAO))
+    }
+
+    novas = 0
+    for tarefa in tarefas:
+        nome_arquivo = f"{tarefa['id']}.json"
+        if nome_arquivo in existentes:
+            print(f"*Aviso: Tarefa '{tarefa['id']}' já está na fila; ignorada.")
+            continue
+        _escrever_json_atomico(tarefa, os.path.join(pasta_fila, PASTA_PENDENTES, nome_arquivo))
+        novas += 1
+    print(f"{novas} tarefa(s) enfileirada(s) em: {pasta_fila}")
+    return novas
+
+
+def _devolver_para_fila(pasta_fila: str, caminho_privado: str, erro: str) -> None:
+    # caminho_privado já foi renomeado por quem devolve: nenhum outro trabalhador o disputa.
+    tarefa = _ler_json(caminho_privado)
+    tarefa["tentativas"] += 1
+    tarefa["erros"].append(erro)
+    if tarefa["tentativas"] >= tarefa["max_tentativas"]:
+        destino = os.path.join(pasta_fila, PASTA_FALHOS, f"{tarefa['id']}.json")
+        print(f"ERRO: Tarefa '{tarefa['id']}' falhou {tarefa['tentativas']} vez(es): {erro}")
+    else:
+        destino = os.path.join(pasta_fila, PASTA_PENDENTES, f"{tarefa['id']}.json")
+        tarefa["disponivel_em"] = time.time() + ESPERA_RETENTATIVA_S * 2 ** (
+            tarefa["tentativas"] - 1
+        )
+        print(
+            f"AVISO: Tarefa '{tarefa['id']}' devolvida à fila "
+            f"(tentativa {tarefa['tentativas']}/{tarefa['max_tentativas']}): {erro}"
+        )
+    _escrever_json_atomico(tarefa, destino)
+    os.remove(caminho_privado)
+
+
+def escrever_batimento(caminho_reivindicado: str, sequencia: int) -> None:
+    _escrever_json_atomico(
+        {
+            "trabalhador": identificador_trabalhador(),
+            "sequencia": sequencia,
+            "enviado_em": time.time(),
+        },
+        f"{caminho_reivindicado}{SUFIXO_BATIMENTO}",
+    )
+
+
+def _remover_batimento(caminho_reivindicado: str) -> None:
+    try:
+        os.remove(f"{caminho_reivindicado}{SUFIXO_BATIMENTO}")
+    except FileNotFoundError:
+        pass
+
+
+def _batimento_expirado(caminho: str, timeout: float) -> bool:
+    # O prazo é medido no relógio de quem observa, desde a última mudança do
+    # conteúdo: a diferença entre os relógios dos nós não importa.
+    try:
+        with open(f"{caminho}{SUFIXO_BATIMENTO}", "r") as f:
+            conteudo = f.read()
+    except FileNotFoundError:
+        conteudo = None
+    agora = time.monotonic()
+    anterior = _batimentos_observados.get(caminho)
+    if anterior is None or anterior[0] != conteudo:
+        _batimentos_observados[caminho] = (conteudo, agora)
+        return False
+    return agora - anterior[1] > timeout
+
+
+def recuperar_expiradas(pasta_fila: str, timeout: float = TIMEOUT_BATIMENTO_S) -> int:
+    pasta_execucao = os.path.join(pasta_fila, PASTA_EM_EXECUCAO)
+    em_execucao = {
+        os.path.join(pasta_execucao, nome) for nome in _listar_tarefas(pasta_execucao)
+    }
+    for caminho in [c for c in _batimentos_observados if c.startswith(pasta_execucao)]:
+        if caminho not in em_execucao:
+            del _batimentos_observados[caminho]
+    for nome in os.listdir(pasta_execucao):
+        # Batimento órfão: a tarefa já foi concluída, devolvida ou reatribuída.
+        if nome.endswith(SUFIXO_BATIMENTO):
+            caminho = os.path.join(pasta_execucao, nome[: -len(SUFIXO_BATIMENTO)])
+            if caminho not in em_execucao:
+                _remover_batimento(caminho)
+
+    recuperadas = 0
+    for caminho in sorted(em_execucao):
+        if not _batimento_expirado(caminho, timeout):
+            continue
+        caminho_privado = f"{caminho}{SUFIXO_EXPIRADO}{identificador_trabalhador()}"
+        try:
+            os.rename(caminho, caminho_privado)
+        except FileNotFoundError:
+            continue
+        del _batimentos_observados[caminho]
+        _remover_batimento(caminho)
+        nome = os.path.basename(caminho)
+        trabalhador = nome[: -len(".json")].rsplit(SEPARADOR_TRABALHADOR, 1)[-1]
+        _devolver_para_fila(
+            pasta_fila, caminho_privado, f"batimento expirado (trabalhador {trabalhador})"
+        )
+        recuperadas += 1
+    return recuperadas
+
+
+def _propagar_falhas(pasta_fila: str) -> None:
+    falhas = set(_listar_tarefas(os.path.join(pasta_fila, PASTA_FALHOS)))
+    if not falhas:
+        return
+    pasta_pendentes = os.path.join(pasta_fila, PASTA_PENDENTES)
+    for nome in _listar_tarefas(pasta_pendentes):
+        caminho = os.path.join(pasta_pendentes, nome)
+        try:
+            tarefa = _ler_json(caminho)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        if tarefa.get("depende_de") and f"{tarefa['depende_de']}.json" in falhas:
+            try:
+                os.rename(caminho, os.path.join(pasta_fila, PASTA_FALHOS, nome))
+                print(f"*Aviso: Tarefa '{tarefa['id']}' cancelada: dependência falhou.")
+            except FileNotFoundError:
+                continue
+
+
+def reivindicar_tarefa(pasta_fila: str, trabalhador: str) -> tuple[dict, str] | None:
+    pasta_pendentes = os.path.join(pasta_fila, PASTA_PENDENTES)
+    concluidas = set(_listar_tarefas(os.path.join(pasta_fila, PASTA_CONCLUIDOS)))
+    agora = time.time()
+
+    for nome in _listar_tarefas(pasta_pendentes):
+        caminho = os.path.join(pasta_pendentes, nome)
+        try:
+            tarefa = _ler_json(caminho)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        if tarefa.get("depende_de") and f"{tarefa['depende_de']}.json" not in concluidas:
+            continue
+        if tarefa.get("disponivel_em", 0.0) > agora:
+            continue
+
+        caminho_reivindicado = os.path.join(
+            pasta_fila,
+            PASTA_EM_EXECUCAO,
+            f"{tarefa['id']}{SEPARADOR_TRABALHADOR}{trabalhador}.json",
+        )
+        try:
+            # rename é atômico no mesmo sistema de arquivos: só um trabalhador vence.
+            os.rename(caminho, caminho_reivindicado)
+        except FileNotFoundError:
+            continue
+        escrever_batimento(caminho_reivindicado, 0)
+        return _ler_json(caminho_reivindicado), caminho_reivindicado
+    return None
+
+
+class _Batimento:
+    def __init__(self, caminho: str, intervalo: float):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.perdida = threading.Event()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._parar.set()
+        self._thread.join()
+
+    def _executar(self):
+        sequencia = 0
+        while not self._parar.wait(self.intervalo):
+            if not os.path.exists(self.caminho):
+                self.perdida.set()
+                return
+            sequencia += 1
+            escrever_batimento(self.caminho, sequencia)
+
+
+def comando_tarefa(tarefa: dict, pasta_saida: str) -> list[str]:
+    return [
+        sys.executable,
+        CAMINHO_MAIN,
+        tarefa["etapa"],
+        "--processo",
+        f"{tarefa['tipo']}:{tarefa['processo']}",
+        "--saida",
+        pasta_saida,
+        *tarefa["argumentos"],
+    ]
+
+
+def executar_tarefa(
+    pasta_fila: str,
+    tarefa: dict,
+    caminho_reivindicado: str,
+    intervalo_batimento: float = INTERVALO_BATIMENTO_S,
+) -> bool:
+    pasta_saida = os.path.join(pasta_fila, PASTA_RESULTADOS, tarefa["processo"])
+    caminho_log = os.path.join(
+        pasta_fila, PASTA_LOGS, f"{tarefa['id']}.tentativa{tarefa['tentativas'] + 1}.log"
+    )
+    print(f"Executando tarefa '{tarefa['id']}' (log: {caminho_log})")
+
+    inicio = time.time()
+    batimento = _Batimento(caminho_reivindicado, intervalo_batimento)
+    with open(caminho_log, "w") as log, batimento:
+        processo = subprocess.Popen(
+            comando_tarefa(tarefa, pasta_saida),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "MPLBACKEND": os.environ.get("MPLBACKEND", "Agg")},
+        )
+        while processo.poll() is None:
+            if batimento.perdida.wait(intervalo_batimento):
+                processo.kill()
+                processo.wait()
+                print(f"AVISO: Tarefa '{tarefa['id']}' foi reatribuída; execução abandonada.")
+                return False
+    codigo = processo.returncode
+    _remover_batimento(caminho_reivindicado)
+
+    if codigo == 0:
+        try:
+            os.rename(
+                caminho_reivindicado,
+                os.path.join(pasta_fila, PASTA_CONCLUIDOS, f"{tarefa['id']}.json"),
+            )
+        except FileNotFoundError:
+            print(f"AVISO: Tarefa '{tarefa['id']}' foi reatribuída antes da conclusão.")
+            return False
+        print(f"Tarefa '{tarefa['id']}' concluída em {time.time() - inicio:.1f}s.")
+        return True
+
+    caminho_privado = f"{caminho_reivindicado}{SUFIXO_EXPIRADO}{identificador_trabalhador()}"
+    try:
+        os.rename(caminho_reivindicado, caminho_privado)
+    except FileNotFoundError:
+        return False
+    _devolver_para_fila(
+        pasta_fila, caminho_privado, f"código de saída {codigo} (log: {caminho_log})"
+    )
+    return False
+
+
+def resumo_fila(pasta_fila: str) -> dict:
+    return {
+        subpasta: len(_listar_tarefas(os.path.join(pasta_fila, subpasta)))
+        for subpasta in (PASTA_PENDENTES, PASTA_EM_EXECUCAO, PASTA_CONCLUIDOS, PASTA_FALHOS)
+    }
+
+
+def fila_esgotada(pasta_fila: str) -> bool:
+    resumo = resumo_fila(pasta_fila)
+    return resumo[PASTA_PENDENTES] == 0 and resumo[PASTA_EM_EXECUCAO] == 0
+
+
+def executar_trabalhador(
+    pasta_fila: str,
+    intervalo_batimento: float = INTERVALO_BATIMENTO_S,
+    timeout_batimento: float = TIMEOUT_BATIMENTO_S,
+    aguardar_novas: bool = False,
+    max_tarefas: int | None = None,
+) -> dict:
+    preparar_fila(pasta_fila)
+    trabalhador = identificador_trabalhador()
+    if intervalo_batimento >= timeout_batimento:
+        intervalo_batimento = timeout_batimento / 3
+        print(
+            f"*Aviso: Intervalo de batimento ajustado para {intervalo_batimento:.2f}s "
+            "(deve ser menor que o timeout)."
+        )
+    print(f"Trabalhador '{trabalhador}' consumindo a fila: {pasta_fila}")
+
+    executadas = set()
+    tentativas = 0
+    while max_tarefas is None or tentativas < max_tarefas:
+        recuperar_expiradas(pasta_fila, timeout_batimento)
+        _propagar_falhas(pasta_fila)
+
+        reivindicada = reivindicar_tarefa(pasta_fila, trabalhador)
+        if reivindicada is None:
+            if fila_esgotada(pasta_fila) and not aguardar_novas:
+                break
+            time.sleep(INTERVALO_ESPERA_S)
+            continue
+
+        tarefa, caminho_reivindicado = reivindicada
+        executar_tarefa(pasta_fila, tarefa, caminho_reivindicado, intervalo_batimento)
+        executadas.add(f"{tarefa['id']}.json")
+        tentativas += 1
+
+    # Uma tentativa que falhou e foi repetida com sucesso (aqui ou em outro nó)
+    # não conta: vale o estado final de cada tarefa.
+    concluidas = set(_listar_tarefas(os.path.join(pasta_fila, PASTA_CONCLUIDOS)))
+    falhas = set(_listar_tarefas(os.path.join(pasta_fila, PASTA_FALHOS)))
+    contagem = {
+        "concluidas": len(executadas & concluidas),
+        "falhas": len(executadas & falhas),
+        "tentativas": tentativas,
+    }
+    print(
+        f"Trabalhador '{trabalhador}' encerrado: {contagem['concluidas']} concluída(s), "
+        f"{contagem['falhas']} com falha, em {tentativas} tentativa(s)."
+    )
+    return contagem
+
+
+def _copiar_atomico(origem: str, destino: str) -> None:
+    caminho_tmp = f"{destino}.tmp-{identificador_trabalhador()}"
+    shutil.copy2(origem, caminho_tmp)
+    os.replace(caminho_tmp, destino)
+
+
+def mesclar_resultados(pasta_fila: str, pasta_saida: str) -> dict:
+    pasta_resultados = os.path.join(pasta_fila, PASTA_RESULTADOS)
+    processos = []
+    if os.path.isdir(pasta_resultados):
+        processos = sorted(
+            nome
+            for nome in os.listdir(pasta_resultados)
+            if os.path.isdir(os.path.join(pasta_resultados, nome))
+        )
+
+    alertas_consolidados = {}
+    num_arquivos = 0
+    for processo in processos:
+        for subpasta in PASTAS_MESCLADAS:
+            origem = os.path.join(pasta_resultados, processo, subpasta)
+            if not os.path.isdir(origem):
+                continue
+            destino = os.path.join(pasta_saida, subpasta)
+            os.makedirs(destino, exist_ok=True)
+            for nome in sorted(os.listdir(origem)):
+                caminho = os.path.join(origem, nome)
+                if os.path.isfile(caminho):
+                    _copiar_atomico(caminho, os.path.join(destino, nome))
+                    num_arquivos += 1
+
+        caminho_alertas = os.path.join(
+            pasta_resultados, processo, "limites_calculados", f"alertas_{processo}.json"
+        )
+        if os.path.exists(caminho_alertas):
+            try:
+                alertas_consolidados[processo] = _ler_json(caminho_alertas)
+            except json.JSONDecodeError as e:
+                print(f"AVISO: Alertas de '{processo}' ignorados na consolidação: {e}")
+
+    caminho_consolidado = os.path.join(pasta_saida, "alertas_consolidados.json")
+    _escrever_json_atomico(alertas_consolidados, caminho_consolidado)
+    print(
+        f"{num_arquivos} arquivo(s) de {len(processos)} processo(s) mesclados em: {pasta_saida}"
+    )
+    print(f"Alertas consolidados salvos em: {caminho_consolidado}")
+    return {"processos": processos, "arquivos": num_arquivos, "alertas": alertas_consolidados}
+
+
+def coordenar(
+    pasta_fila: str,
+    pasta_saida: str,
+    aguardar: bool = False,
+    timeout_batimento: float = TIMEOUT_BATIMENTO_S,
+) -> bool:
+    preparar_fila(pasta_fila)
+    while aguardar and not fila_esgotada(pasta_fila):
+        recuperar_expiradas(pasta_fila, timeout_batimento)
+        _propagar_falhas(pasta_fila)
+        time.sleep(INTERVALO_ESPERA_S)
+
+    resumo = resumo_fila(pasta_fila)
+    print(
+        "Fila: "
+        + ", ".join(f"{quantidade} {subpasta}" for subpasta, quantidade in resumo.items())
+    )
+    if resumo[PASTA_PENDENTES] or resumo[PASTA_EM_EXECUCAO]:
+        print("*Aviso: A fila ainda tem tarefas em aberto; mesclando resultados parciais.")
+
+    mesclar_resultados(pasta_fila, pasta_saida)
+    if resumo[PASTA_FALHOS]:
+        for nome in _listar_tarefas(os.path.join(pasta_fila, PASTA_FALHOS)):
+            erros = _ler_json(os.path.join(pasta_fila, PASTA_FALHOS, nome)).get("erros") or [
+                "dependência falhou"
+            ]
+            print(f"ERRO: Tarefa '{nome[: -len('.json')]}' falhou: {erros[-1]}")
+        return False
+    return True
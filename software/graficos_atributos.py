@@ -2,6 +2,69 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import json
+from software import constantes_cep
+
+TIPOS_BINOMIAIS = ("P", "NP", "P'")
+TIPOS_POISSON = ("U", "C", "U'")
+
+
+def _media_atributos(info_limites: dict) -> float:
+    for chave in ("p_barra", "u_barra", "c_barra"):
+        if chave in info_limites:
+            return info_limites[chave]
+    raise KeyError("Linha média (p_barra/u_barra/c_barra) ausente nos limites.")
+
+
+def calcular_limites_atributos(
+    info_limites: dict, contagens, tamanhos
+) -> dict[str, np.ndarray]:
+    tipo = info_limites["tipo_grafico"]
+    contagens = np.asarray(contagens, dtype=np.float64)
+    if tipo == "C":
+        tamanhos = np.ones(len(contagens))
+    tamanhos = np.asarray(tamanhos, dtype=np.float64)
+
+    media = _media_atributos(info_limites)
+    variancia_base = media * (1 - media) if tipo in TIPOS_BINOMIAIS else media
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxas = np.divide(
+            contagens, tamanhos, out=np.zeros(len(contagens)), where=tamanhos > 0
+        )
+        sigma = np.sqrt(variancia_base / tamanhos)
+    # Laney: sigma_z > 1 incorpora a variação entre lotes (sobredispersão).
+    sigma = sigma * info_limites.get("sigma_z", 1.0)
+
+    if tipo == "NP":
+        estatistica = contagens
+        lm = media * tamanhos
+        sigma = sigma * tamanhos
+    else:
+        estatistica = taxas
+        lm = np.full(len(contagens), media)
+
+    return {
+        "estatistica": estatistica,
+        "LM": lm,
+        "LSC": lm + 3 * sigma,
+        "LIC": np.maximum(lm - 3 * sigma, 0),
+    }
+
+
+def calcular_sigma_z(contagens, tamanhos, media: float, binomial: bool) -> float:
+    contagens = np.asarray(contagens, dtype=np.float64)
+    tamanhos = np.asarray(tamanhos, dtype=np.float64)
+    # Lotes sem inspeção (n = 0) não têm escore z: ficam fora das amplitudes móveis.
+    validos = tamanhos > 0
+    contagens = contagens[validos]
+    tamanhos = tamanhos[validos]
+    variancia_base = media * (1 - media) if binomial else media
+    if len(contagens) < 2 or variancia_base <= 0:
+        return 1.0
+
+    z = (contagens / tamanhos - media) / np.sqrt(variancia_base / tamanhos)
+    d2 = constantes_cep.obter_constantes(2)["d2"]
+    return float(np.mean(np.abs(np.diff(z))) / d2)
 
 
 def calibrar_limites_p(df_calibracao_p: pd.DataFrame) -> dict | None:
@@ -31,6 +94,79 @@ def calibrar_limites_p(df_calibracao_p: pd.DataFrame) -> dict | None:
         return None
 
 
+def _iterar_fase_1_atributos(
+    contagens: np.ndarray, tamanhos: np.ndarray, tipo_grafico: str, max_iteracoes: int
+) -> tuple[np.ndarray, int]:
+    chave_media = "p_barra" if tipo_grafico in TIPOS_BINOMIAIS else "u_barra"
+    incluidos = np.ones(len(contagens), dtype=bool)
+    soma_contagens = float(np.sum(contagens))
+    soma_tamanhos = float(np.sum(tamanhos))
+    iteracao = 0
+
+    while iteracao < max_iteracoes:
+        if soma_tamanhos <= 0:
+            break
+        iteracao += 1
+        limites = calcular_limites_atributos(
+            {"tipo_grafico": tipo_grafico, chave_media: soma_contagens / soma_tamanhos},
+            contagens,
+            tamanhos,
+        )
+
+        fora = incluidos & (
+            (limites["estatistica"] > limites["LSC"]) | (limites["estatistica"] < limites["LIC"])
+        )
+        num_fora = int(np.count_nonzero(fora))
+        if num_fora == 0:
+            break
+        if num_fora >= np.count_nonzero(incluidos) - 1:
+            print("AVISO: Fase I removeria quase todos os pontos; iteração interrompida.")
+            break
+
+        print(f"Iteração {iteracao}: {num_fora} ponto(s) fora de controle removido(s).")
+        incluidos &= ~fora
+        soma_contagens -= float(np.sum(contagens[fora]))
+        soma_tamanhos -= float(np.sum(tamanhos[fora]))
+    else:
+        print(
+            f"AVISO: Fase I atingiu o máximo de {max_iteracoes} iterações "
+            "sem estabilizar os limites."
+        )
+
+    return incluidos, iteracao
+
+
+def _registrar_fase_1(
+    info_limites: dict, rotulos: pd.Series, incluidos: np.ndarray, iteracao: int
+) -> dict:
+    excluidos = rotulos.to_numpy()[~incluidos]
+    info_limites["fase_1"] = {
+        "iteracoes": iteracao,
+        "pontos_usados": int(np.count_nonzero(incluidos)),
+        "amostras_excluidas": [a.item() if hasattr(a, "item") else a for a in excluidos],
+    }
+    print(
+        f"Fase I concluída em {iteracao} iteração(ões); {len(excluidos)} ponto(s) excluído(s)."
+    )
+    return info_limites
+
+
+def calibrar_limites_p_iterativo(
+    df_calibracao_p: pd.DataFrame, max_iteracoes: int = 20
+) -> dict | None:
+    print("Iniciando calibração P iterativa (Fase I)...")
+    incluidos, iteracao = _iterar_fase_1_atributos(
+        df_calibracao_p["np"].to_numpy(dtype=np.float64),
+        df_calibracao_p["n"].to_numpy(dtype=np.float64),
+        "P",
+        max_iteracoes,
+    )
+    info_limites_p = calibrar_limites_p(df_calibracao_p[incluidos])
+    if info_limites_p is None:
+        return None
+    return _registrar_fase_1(info_limites_p, df_calibracao_p["lote"], incluidos, iteracao)
+
+
 def plotar_grafico_calibracao_p(
     df_calibracao: pd.DataFrame, info_limites_p: dict, caminho_saida_grafico: str
 ) -> bool:
@@ -40,11 +176,9 @@ def plotar_grafico_calibracao_p(
 
         df = df_calibracao.copy()
 
-        variacao_base = np.sqrt(p_barra * (1 - p_barra))
-
-        df["LSC_p"] = p_barra + 3 * (variacao_base / np.sqrt(df["n"]))
-        df["LIC_p"] = p_barra - 3 * (variacao_base / np.sqrt(df["n"]))
-        df["LIC_p"] = df["LIC_p"].apply(lambda x: max(x, 0))
+        limites = calcular_limites_atributos(info_limites_p, df["np"], df["n"])
+        df["LSC_p"] = limites["LSC"]
+        df["LIC_p"] = limites["LIC"]
 
         df["fora_limite"] = (df["p"] > df["LSC_p"]) | (df["p"] < df["LIC_p"])
         pontos_fora = df[df["fora_limite"] == True]
@@ -140,6 +274,24 @@ def calibrar_limites_u(df_calibracao_u: pd.DataFrame) -> dict | None:
         return None
 
 
+def calibrar_limites_u_iterativo(
+    df_calibracao_u: pd.DataFrame, max_iteracoes: int = 20
+) -> dict | None:
+    print("Iniciando calibração U iterativa (Fase I)...")
+    incluidos, iteracao = _iterar_fase_1_atributos(
+        df_calibracao_u["c"].to_numpy(dtype=np.float64),
+        df_calibracao_u["n"].to_numpy(dtype=np.float64),
+        "U",
+        max_iteracoes,
+    )
+    info_limites_u = calibrar_limites_u(df_calibracao_u[incluidos])
+    if info_limites_u is None:
+        return None
+    return _registrar_fase_1(
+        info_limites_u, df_calibracao_u["amostra"], incluidos, iteracao
+    )
+
+
 def plotar_grafico_calibracao_u(
     df_calibracao: pd.DataFrame, info_limites_u: dict, caminho_saida_grafico: str
 ) -> bool:
@@ -149,11 +301,9 @@ def plotar_grafico_calibracao_u(
 
         df = df_calibracao.copy()
 
-        variacao_base = np.sqrt(u_barra)
-
-        df["LSC_u"] = u_barra + 3 * (variacao_base / np.sqrt(df["n"]))
-        df["LIC_u"] = u_barra - 3 * (variacao_base / np.sqrt(df["n"]))
-        df["LIC_u"] = df["LIC_u"].apply(lambda x: max(x, 0))
+        limites = calcular_limites_atributos(info_limites_u, df["c"], df["n"])
+        df["LSC_u"] = limites["LSC"]
+        df["LIC_u"] = limites["LIC"]
 
         df["fora_limite"] = (df["u"] > df["LSC_u"]) | (df["u"] < df["LIC_u"])
         pontos_fora = df[df["fora_limite"] == True]
@@ -220,3 +370,159 @@ def plotar_grafico_calibracao_u(
     except Exception as e:
         print(f"ERRO ao gerar gráfico de calibração U: {e}")
         return False
+
+
+def _calibrar_atributos(
+    contagens: pd.Series, tamanhos: pd.Series, tipo: str
+) -> dict | None:
+    total_contagens = float(contagens.sum())
+    total_tamanhos = float(tamanhos.sum())
+    binomial = tipo in TIPOS_BINOMIAIS
+
+    if tipo == "C":
+        if len(contagens) == 0:
+            print("ERRO: Nenhuma amostra para calibrar o Gráfico C.")
+            return None
+        c_barra = total_contagens / len(contagens)
+        print(f"Linha Média (c-barra) calculada: {c_barra:.4f}")
+        return {
+            "tipo_grafico": "C",
+            "c_barra": c_barra,
+            "total_defeitos": int(total_contagens),
+        }
+
+    if total_tamanhos == 0:
+        print(f"ERRO: Total inspecionado é zero, impossível calibrar o Gráfico {tipo}.")
+        return None
+
+    media = total_contagens / total_tamanhos
+    chave_media = "p_barra" if binomial else "u_barra"
+    info_limites = {"tipo_grafico": tipo, chave_media: media}
+
+    if tipo == "NP":
+        info_limites["np_barra"] = total_contagens / len(contagens)
+    if tipo in ("P'", "U'"):
+        info_limites["sigma_z"] = calcular_sigma_z(contagens, tamanhos, media, binomial)
+        print(f"Sigma entre lotes (Laney, sigma_z) calculado: {info_limites['sigma_z']:.4f}")
+
+    if binomial:
+        info_limites["total_defeituosos"] = int(total_contagens)
+        info_limites["total_inspecionados"] = int(total_tamanhos)
+    else:
+        info_limites["total_defeitos"] = int(total_contagens)
+        info_limites["total_unidades"] = int(total_tamanhos)
+
+    print(f"Linha Média ({chave_media.replace('_', '-')}) calculada: {media:.6f}")
+    return info_limites
+
+
+def calibrar_limites_p_laney(df_calibracao_p: pd.DataFrame) -> dict | None:
+    print("Calculando limites do Gráfico P' (Laney)...")
+    try:
+        return _calibrar_atributos(df_calibracao_p["np"], df_calibracao_p["n"], "P'")
+    except Exception as e:
+        print(f"ERRO ao calibrar Gráfico P': {e}")
+        return None
+
+
+def calibrar_limites_u_laney(df_calibracao_u: pd.DataFrame) -> dict | None:
+    print("Calculando limites do Gráfico U' (Laney)...")
+    try:
+        return _calibrar_atributos(df_calibracao_u["c"], df_calibracao_u["n"], "U'")
+    except Exception as e:
+        print(f"ERRO ao calibrar Gráfico U': {e}")
+        return None
+
+
+def calibrar_limites_np(df_calibracao_p: pd.DataFrame) -> dict | None:
+    print("Calculando limites do Gráfico NP...")
+    try:
+        if df_calibracao_p["n"].nunique() > 1:
+            print("*Aviso: Tamanho de lote variável; o Gráfico NP terá limites variáveis.")
+        return _calibrar_atributos(df_calibracao_p["np"], df_calibracao_p["n"], "NP")
+    except Exception as e:
+        print(f"ERRO ao calibrar Gráfico NP: {e}")
+        return None
+
+
+def calibrar_limites_c(df_calibracao_u: pd.DataFrame) -> dict | None:
+    print("Calculando limites do Gráfico C...")
+    try:
+        if df_calibracao_u["n"].nunique() > 1:
+            print("*Aviso: Área de oportunidade variável; prefira o Gráfico U.")
+        return _calibrar_atributos(df_calibracao_u["c"], df_calibracao_u["n"], "C")
+    except Exception as e:
+        print(f"ERRO ao calibrar Gráfico C: {e}")
+        return None
+
+
+_ROTULOS_ATRIBUTOS = {
+    "P'": ("Proporção de Defeituosos (p)", "Gráfico P' de Laney"),
+    "NP": ("Número de Defeituosos (np)", "Gráfico NP"),
+    "U'": ("Defeitos por Unidade (u)", "Gráfico U' de Laney"),
+    "C": ("Número de Defeitos (c)", "Gráfico C"),
+}
+
+
+def plotar_grafico_calibracao_atributos(
+    df_calibracao: pd.DataFrame,
+    info_limites: dict,
+    caminho_saida_grafico: str,
+) -> bool:
+    tipo = info_limites["tipo_grafico"]
+    print(f"Gerando gráfico de calibração {tipo} em: {caminho_saida_grafico}")
+    try:
+        binomial = tipo in TIPOS_BINOMIAIS
+        coluna_rotulo = "lote" if binomial else "amostra"
+        coluna_contagem = "np" if binomial else "c"
+        rotulo_y, titulo = _ROTULOS_ATRIBUTOS.get(tipo, (tipo, f"Gráfico {tipo}"))
+
+        limites = calcular_limites_atributos(
+            info_limites, df_calibracao[coluna_contagem], df_calibracao["n"]
+        )
+        rotulos = df_calibracao[coluna_rotulo]
+        fora_limite = (limites["estatistica"] > limites["LSC"]) | (
+            limites["estatistica"] < limites["LIC"]
+        )
+        if fora_limite.any():
+            print(
+                f"Aviso de Calibração {tipo}: Pontos encontrados fora dos limites de controle."
+            )
+
+        fig, ax = plt.subplots(figsize=(12, 7))
+        ax.plot(
+            rotulos,
+            limites["estatistica"],
+            marker="o",
+            linestyle="-",
+            color="b",
+            label=rotulo_y,
+        )
+        ax.step(rotulos, limites["LM"], color="g", where="mid", label="Linha Média")
+        ax.step(rotulos, limites["LSC"], color="r", linestyle="--", where="mid", label="LSC")
+        ax.step(rotulos, limites["LIC"], color="r", linestyle="--", where="mid", label="LIC")
+
+        if fora_limite.any():
+            ax.scatter(
+                rotulos[fora_limite],
+                limites["estatistica"][fora_limite],
+                s=100,
+                facecolors="none",
+                edgecolors="r",
+                label="Fora de Controle",
+            )
+
+        ax.set_title(f"{titulo} de Controle (Calibração)")
+        ax.set_xlabel("Lote de Inspeção" if binomial else "Amostra de Inspeção")
+        ax.set_ylabel(rotulo_y)
+        ax.legend(loc="best")
+        ax.grid(True, linestyle=":", alpha=0.6)
+
+        plt.tight_layout()
+        plt.savefig(caminho_saida_grafico)
+        plt.close(fig)
+        return True
+
+    except Exception as e:
+        print(f"ERRO ao gerar gráfico de calibração {tipo}: {e}")
+        return False
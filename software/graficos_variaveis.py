@@ -2,41 +2,51 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import json
+from software import constantes_cep
 
 
 def calibrar_limites_xr(
-    df_calibracao: pd.DataFrame, n_amostra: int, constantes_db: dict
+    df_calibracao: pd.DataFrame,
+    n_amostra: int,
+    constantes_db: dict,
+    tamanho_variavel: bool | None = None,
 ) -> dict | None:
     print(f"Calculando limites de controle X-R para n={n_amostra}...")
 
-    n_str = str(n_amostra)
-
-    if n_str not in constantes_db:
-        print(f"ERRO: Constantes para n={n_amostra} não encontradas no banco de dados.")
+    constantes = constantes_cep.obter_constantes(n_amostra, constantes_db)
+    if constantes is None:
+        print(f"ERRO: Constantes para n={n_amostra} não puderam ser obtidas.")
         return None
 
-    constantes = constantes_db[n_str]
     A2 = constantes.get("A2")
     D3 = constantes.get("D3")
     D4 = constantes.get("D4")
 
     if A2 is None or D3 is None or D4 is None:
-        print(f"ERRO: Faltando constantes A2, D3 ou D4 para n={n_amostra} no JSON.")
+        print(f"ERRO: Faltando constantes A2, D3 ou D4 para n={n_amostra}.")
         return None
 
     print(f"Constantes usadas: A2={A2}, D3={D3}, D4={D4}")
 
-    X_barra_barra = df_calibracao["X_barra"].mean()
-    R_barra = df_calibracao["R"].mean()
-
-    LM_X = X_barra_barra
-    fator_X = A2 * R_barra
-    LSC_X = LM_X + fator_X
-    LIC_X = LM_X - fator_X
+    if tamanho_variavel is None:
+        tamanho_variavel = _tem_tamanho_variavel(df_calibracao)
 
-    LM_R = R_barra
-    LSC_R = D4 * R_barra
-    LIC_R = D3 * R_barra
+    info_variavel = None
+    if tamanho_variavel:
+        info_variavel = _calibrar_tamanho_variavel(
+            df_calibracao, n_amostra, constantes_db
+        )
+        if info_variavel is None:
+            return None
+        X_barra_barra = info_variavel["X_barra_barra"]
+        R_barra = info_variavel["R_barra"]
+    else:
+        X_barra_barra = float(df_calibracao["X_barra"].mean())
+        R_barra = float(df_calibracao["R"].mean())
+
+    limites = _calcular_limites_xr(
+        X_barra_barra, R_barra, {"fator_X": A2, "fator_LSC_R": D4, "fator_LIC_R": D3}
+    )
 
     info_limites = {
         "tipo_grafico": "X-R",
@@ -44,14 +54,281 @@ def calibrar_limites_xr(
         "X_barra_barra": X_barra_barra,
         "R_barra": R_barra,
         "constantes_usadas": {"A2": A2, "D3": D3, "D4": D4},
-        "limites_X_barra": {"LSC": LSC_X, "LM": LM_X, "LIC": LIC_X},
-        "limites_R": {"LSC": LSC_R, "LM": LM_R, "LIC": LIC_R},
+        "limites_X_barra": {
+            "LSC": limites["LSC_X"],
+            "LM": X_barra_barra,
+            "LIC": limites["LIC_X"],
+        },
+        "limites_R": {"LSC": limites["LSC_R"], "LM": R_barra, "LIC": limites["LIC_R"]},
     }
 
+    if info_variavel is not None:
+        info_limites.update(info_variavel)
+
     print("Limites X-R calibrados com sucesso.")
     return info_limites
 
 
+def _tem_tamanho_variavel(df_calibracao: pd.DataFrame) -> bool:
+    return "n" in df_calibracao.columns and df_calibracao["n"].nunique() > 1
+
+
+def _calcular_limites_xr(centro, escala, fatores: dict) -> dict:
+    # Fórmula única dos limites X-R. Com n fixo, escala = R_barra e fatores A2/D4/D3;
+    # com n variável, escala = sigma_R e fatores por subgrupo 3/sqrt(n), d2 +- 3*d3.
+    fator_X = fatores["fator_X"] * escala
+    return {
+        "LSC_X": centro + fator_X,
+        "LIC_X": centro - fator_X,
+        "LSC_R": fatores["fator_LSC_R"] * escala,
+        "LIC_R": fatores["fator_LIC_R"] * escala,
+    }
+
+
+def _fatores_por_subgrupo(tamanhos: np.ndarray, constantes: dict) -> dict:
+    return {
+        "fator_X": 3.0 / np.sqrt(tamanhos),
+        "fator_LSC_R": constantes["d2"] + 3.0 * constantes["d3"],
+        "fator_LIC_R": np.maximum(constantes["d2"] - 3.0 * constantes["d3"], 0.0),
+    }
+
+
+def _constantes_por_subgrupo(
+    tamanhos: np.ndarray, constantes_db: dict
+) -> dict[str, np.ndarray] | None:
+    n_unicos, inverso = np.unique(np.asarray(tamanhos, dtype=np.int64), return_inverse=True)
+    tabela = {}
+    for nome in ("d2", "d3", "c4", "B3", "B4"):
+        tabela[nome] = np.empty(len(n_unicos))
+
+    for i, n in enumerate(n_unicos):
+        constantes = constantes_cep.obter_constantes(int(n), constantes_db)
+        if constantes is None:
+            return None
+        for nome in tabela:
+            tabela[nome][i] = constantes[nome]
+
+    return {nome: valores[inverso] for nome, valores in tabela.items()}
+
+
+def _calibrar_tamanho_variavel(
+    df_calibracao: pd.DataFrame, n_amostra: int, constantes_db: dict
+) -> dict | None:
+    print("Calculando limites variáveis por subgrupo (n variável)...")
+    tamanhos = df_calibracao["n"].to_numpy()
+    constantes = _constantes_por_subgrupo(tamanhos, constantes_db)
+    if constantes is None:
+        print("ERRO: Constantes por subgrupo não puderam ser obtidas.")
+        return None
+
+    X_barra_barra = float(
+        np.sum(df_calibracao["X_barra"].to_numpy() * tamanhos) / np.sum(tamanhos)
+    )
+    sigma_R = float(np.mean(df_calibracao["R"].to_numpy() / constantes["d2"]))
+    sigma_S = float(np.mean(df_calibracao["S"].to_numpy() / constantes["c4"]))
+
+    d2_ref = constantes_cep.obter_constantes(n_amostra, constantes_db)["d2"]
+
+    limites = calcular_limites_por_subgrupo(
+        tamanhos,
+        {"X_barra_barra": X_barra_barra, "sigma_R": sigma_R, "sigma_S": sigma_S},
+        constantes_db,
+    )
+
+    return {
+        "X_barra_barra": X_barra_barra,
+        "R_barra": sigma_R * d2_ref,
+        "sigma_R": sigma_R,
+        "sigma_S": sigma_S,
+        "limites_variaveis": {
+            chave: valores.tolist() for chave, valores in limites.items()
+        },
+    }
+
+
+def calcular_limites_por_subgrupo(
+    tamanhos: np.ndarray, info_limites: dict, constantes_db: dict
+) -> dict[str, np.ndarray]:
+    tamanhos = np.asarray(tamanhos, dtype=np.int64)
+    constantes = _constantes_por_subgrupo(tamanhos, constantes_db)
+
+    mu = info_limites["X_barra_barra"]
+    sigma_R = info_limites["sigma_R"]
+    sigma_S = info_limites.get("sigma_S", sigma_R)
+
+    limites = _calcular_limites_xr(
+        mu, sigma_R, _fatores_por_subgrupo(tamanhos, constantes)
+    )
+    LM_S = constantes["c4"] * sigma_S
+
+    return {
+        "n": tamanhos,
+        "LSC_X": limites["LSC_X"],
+        "LIC_X": limites["LIC_X"],
+        "LSC_R": limites["LSC_R"],
+        "LM_R": constantes["d2"] * sigma_R,
+        "LIC_R": limites["LIC_R"],
+        "LSC_S": constantes["B4"] * LM_S,
+        "LM_S": LM_S,
+        "LIC_S": constantes["B3"] * LM_S,
+    }
+
+
+def limites_xr_por_subgrupo(
+    tamanhos, info_limites: dict, constantes_db: dict | None = None
+) -> dict[str, np.ndarray]:
+    # Subgrupos com o n de referência (ou sem n conhecido) usam os limites salvos;
+    # os demais, os fatores do próprio n com o sigma estimado na calibração.
+    n_ref = int(info_limites["n_amostra"])
+    tamanhos = np.asarray(tamanhos, dtype=np.float64)
+    tamanhos = np.where(np.isnan(tamanhos) | (tamanhos < 2), n_ref, tamanhos).astype(np.int64)
+
+    limites_x = info_limites["limites_X_barra"]
+    limites_r = info_limites["limites_R"]
+    limites = {
+        "LM": np.full(len(tamanhos), float(limites_x["LM"])),
+        "LSC": np.full(len(tamanhos), float(limites_x["LSC"])),
+        "LIC": np.full(len(tamanhos), float(limites_x["LIC"])),
+        "LSC_R": np.full(len(tamanhos), float(limites_r["LSC"])),
+        "LM_R": np.full(len(tamanhos), float(limites_r["LM"])),
+        "LIC_R": np.full(len(tamanhos), float(limites_r["LIC"])),
+    }
+
+    outros = tamanhos != n_ref
+    if outros.any():
+        sigma_R = info_limites.get("sigma_R")
+        if sigma_R is None:
+            d2_ref = constantes_cep.obter_constantes(n_ref, constantes_db)["d2"]
+            sigma_R = limites_r["LM"] / d2_ref
+        por_n = calcular_limites_por_subgrupo(
+            tamanhos[outros],
+            {"X_barra_barra": float(limites_x["LM"]), "sigma_R": sigma_R},
+            constantes_db,
+        )
+        for chave, origem in (
+            ("LSC", "LSC_X"),
+            ("LIC", "LIC_X"),
+            ("LSC_R", "LSC_R"),
+            ("LM_R", "LM_R"),
+            ("LIC_R", "LIC_R"),
+        ):
+            limites[chave][outros] = por_n[origem]
+    return limites
+
+
+def calibrar_limites_xr_iterativo(
+    df_calibracao: pd.DataFrame,
+    n_amostra: int,
+    constantes_db: dict,
+    max_iteracoes: int = 20,
+) -> dict | None:
+    print("Iniciando calibração X-R iterativa (Fase I)...")
+
+    x_barra = df_calibracao["X_barra"].to_numpy(dtype=np.float64)
+    amplitudes = df_calibracao["R"].to_numpy(dtype=np.float64)
+    incluidos = np.ones(len(df_calibracao), dtype=bool)
+
+    variavel = _tem_tamanho_variavel(df_calibracao)
+    if variavel:
+        tamanhos = df_calibracao["n"].to_numpy(dtype=np.float64)
+        constantes = _constantes_por_subgrupo(tamanhos, constantes_db)
+        if constantes is None:
+            print("ERRO: Constantes por subgrupo não puderam ser obtidas.")
+            return None
+        contrib_sigma = amplitudes / constantes["d2"]
+        fatores = _fatores_por_subgrupo(tamanhos, constantes)
+
+        soma_xn = float(np.sum(x_barra * tamanhos))
+        soma_n = float(np.sum(tamanhos))
+        soma_sigma = float(np.sum(contrib_sigma))
+    else:
+        constantes = constantes_cep.obter_constantes(n_amostra, constantes_db)
+        if constantes is None:
+            print(f"ERRO: Constantes para n={n_amostra} não puderam ser obtidas.")
+            return None
+        fatores = {
+            "fator_X": constantes["A2"],
+            "fator_LSC_R": constantes["D4"],
+            "fator_LIC_R": constantes["D3"],
+        }
+        soma_x = float(np.sum(x_barra))
+        soma_r = float(np.sum(amplitudes))
+
+    num_incluidos = len(df_calibracao)
+    iteracao = 0
+
+    while iteracao < max_iteracoes:
+        iteracao += 1
+
+        if variavel:
+            limites = _calcular_limites_xr(
+                soma_xn / soma_n, soma_sigma / num_incluidos, fatores
+            )
+        else:
+            limites = _calcular_limites_xr(
+                soma_x / num_incluidos, soma_r / num_incluidos, fatores
+            )
+
+        fora = incluidos & (
+            (x_barra > limites["LSC_X"])
+            | (x_barra < limites["LIC_X"])
+            | (amplitudes > limites["LSC_R"])
+            | (amplitudes < limites["LIC_R"])
+        )
+        num_fora = int(np.count_nonzero(fora))
+        if num_fora == 0:
+            break
+
+        if num_fora >= num_incluidos - 1:
+            print("AVISO: Fase I removeria quase todos os subgrupos; iteração interrompida.")
+            break
+
+        print(f"Iteração {iteracao}: {num_fora} subgrupo(s) fora de controle removido(s).")
+        incluidos &= ~fora
+        num_incluidos -= num_fora
+
+        if variavel:
+            soma_xn -= float(np.sum(x_barra[fora] * tamanhos[fora]))
+            soma_n -= float(np.sum(tamanhos[fora]))
+            soma_sigma -= float(np.sum(contrib_sigma[fora]))
+        else:
+            soma_x -= float(np.sum(x_barra[fora]))
+            soma_r -= float(np.sum(amplitudes[fora]))
+    else:
+        print(
+            f"AVISO: Fase I atingiu o máximo de {max_iteracoes} iterações "
+            "sem estabilizar os limites."
+        )
+
+    # Mantém a saída de n variável mesmo que os subgrupos restantes tenham um único n.
+    info_limites = calibrar_limites_xr(
+        df_calibracao[incluidos], n_amostra, constantes_db, tamanho_variavel=variavel
+    )
+    if info_limites is None:
+        return None
+
+    if variavel:
+        limites = calcular_limites_por_subgrupo(
+            df_calibracao["n"].to_numpy(), info_limites, constantes_db
+        )
+        info_limites["limites_variaveis"] = {
+            chave: valores.tolist() for chave, valores in limites.items()
+        }
+
+    excluidas = df_calibracao["Amostra"].to_numpy()[~incluidos]
+    info_limites["fase_1"] = {
+        "iteracoes": iteracao,
+        "subgrupos_usados": num_incluidos,
+        "amostras_excluidas": [
+            a.item() if hasattr(a, "item") else a for a in excluidas
+        ],
+    }
+    print(
+        f"Fase I concluída em {iteracao} iteração(ões); {len(excluidas)} amostra(s) excluída(s)."
+    )
+    return info_limites
+
+
 def plotar_grafico_calibracao_xr(
     df_calibracao: pd.DataFrame, info_limites: dict, caminho_saida_grafico: str
 ) -> bool:
@@ -64,6 +341,7 @@ def plotar_grafico_calibracao_xr(
         fig.suptitle("Gráficos de Controle X-R (Calibração)", fontsize=16)
 
         amostras = df_calibracao["Amostra"]
+        limites_variaveis = info_limites.get("limites_variaveis")
 
         ax1.plot(
             amostras,
@@ -74,24 +352,42 @@ def plotar_grafico_calibracao_xr(
             label="Média da Amostra (X-barra)",
         )
 
-        ax1.axhline(
-            y=limites_x["LSC"],
-            color="r",
-            linestyle="--",
-            label=f"LSC={limites_x['LSC']:.4f}",
-        )
+        if limites_variaveis:
+            ax1.step(
+                amostras,
+                limites_variaveis["LSC_X"],
+                color="r",
+                linestyle="--",
+                where="mid",
+                label="LSC (Variável)",
+            )
+            ax1.step(
+                amostras,
+                limites_variaveis["LIC_X"],
+                color="r",
+                linestyle="--",
+                where="mid",
+                label="LIC (Variável)",
+            )
+        else:
+            ax1.axhline(
+                y=limites_x["LSC"],
+                color="r",
+                linestyle="--",
+                label=f"LSC={limites_x['LSC']:.4f}",
+            )
+            ax1.axhline(
+                y=limites_x["LIC"],
+                color="r",
+                linestyle="--",
+                label=f"LIC={limites_x['LIC']:.4f}",
+            )
         ax1.axhline(
             y=limites_x["LM"],
             color="g",
             linestyle="-",
             label=f"LM={limites_x['LM']:.4f}",
         )
-        ax1.axhline(
-            y=limites_x["LIC"],
-            color="r",
-            linestyle="--",
-            label=f"LIC={limites_x['LIC']:.4f}",
-        )
 
         ax1.set_title("Gráfico X-barra (Médias)")
         ax1.set_xlabel("Amostra")
@@ -109,24 +405,39 @@ def plotar_grafico_calibracao_xr(
             label="Amplitude da Amostra (R)",
         )
 
-        ax2.axhline(
-            y=limites_r["LSC"],
-            color="r",
-            linestyle="--",
-            label=f"LSC={limites_r['LSC']:.4f}",
-        )
-        ax2.axhline(
-            y=limites_r["LM"],
-            color="g",
-            linestyle="-",
-            label=f"LM={limites_r['LM']:.4f}",
-        )
-        ax2.axhline(
-            y=limites_r["LIC"],
-            color="r",
-            linestyle="--",
-            label=f"LIC={limites_r['LIC']:.4f}",
-        )
+        if limites_variaveis:
+            for chave, cor, estilo, rotulo in (
+                ("LSC_R", "r", "--", "LSC (Variável)"),
+                ("LM_R", "g", "-", "LM (Variável)"),
+                ("LIC_R", "r", "--", "LIC (Variável)"),
+            ):
+                ax2.step(
+                    amostras,
+                    limites_variaveis[chave],
+                    color=cor,
+                    linestyle=estilo,
+                    where="mid",
+                    label=rotulo,
+                )
+        else:
+            ax2.axhline(
+                y=limites_r["LSC"],
+                color="r",
+                linestyle="--",
+                label=f"LSC={limites_r['LSC']:.4f}",
+            )
+            ax2.axhline(
+                y=limites_r["LM"],
+                color="g",
+                linestyle="-",
+                label=f"LM={limites_r['LM']:.4f}",
+            )
+            ax2.axhline(
+                y=limites_r["LIC"],
+                color="r",
+                linestyle="--",
+                label=f"LIC={limites_r['LIC']:.4f}",
+            )
 
         ax2.set_title("Gráfico R (Amplitudes)")
         ax2.set_xlabel("Amostra")
@@ -145,7 +456,7 @@ def plotar_grafico_calibracao_xr(
         return False
 
 
-def _calcular_zonas_weco(limites_x: dict) -> dict:
+def calcular_zonas_weco(limites_x: dict) -> dict:
     lm = limites_x["LM"]
     lsc = limites_x["LSC"]
     dist_3sigma = lsc - lm
@@ -164,36 +475,43 @@ def _calcular_zonas_weco(limites_x: dict) -> dict:
 
 
 def analisar_regras_weco(
-    df_total: pd.DataFrame, info_limites: dict, indice_inicio_novos: int
+    df_total: pd.DataFrame,
+    info_limites: dict,
+    indice_inicio_novos: int,
+    constantes_db: dict | None = None,
 ) -> list[str]:
     print("Analisando regras WECO para novos dados...")
-    zonas = _calcular_zonas_weco(info_limites["limites_X_barra"])
+    tamanhos = df_total["n"] if "n" in df_total.columns else np.full(len(df_total), np.nan)
+    zonas = calcular_zonas_weco(
+        limites_xr_por_subgrupo(
+            pd.to_numeric(tamanhos, errors="coerce"), info_limites, constantes_db
+        )
+    )
     alertas = []
 
-    pontos_x_barra = df_total["X_barra"].values
+    pontos_x_barra = df_total["X_barra"].to_numpy(dtype=np.float64)
 
     for i in range(indice_inicio_novos, len(df_total)):
         amostra_atual = df_total.iloc[i]["Amostra"]
         ponto_atual = pontos_x_barra[i]
 
-        if ponto_atual > zonas["LSC"] or ponto_atual < zonas["LIC"]:
+        if ponto_atual > zonas["LSC"][i] or ponto_atual < zonas["LIC"][i]:
             msg = f"ALERTA (Amostra {amostra_atual}): Regra 1 - Ponto fora do limite ({ponto_atual:.5f})"
             alertas.append(msg)
             print(msg)
 
         if i >= 7:
             ultimos_8 = pontos_x_barra[i - 7 : i + 1]
-            if all(p > zonas["LM"] for p in ultimos_8) or all(
-                p < zonas["LM"] for p in ultimos_8
-            ):
+            lm = zonas["LM"][i - 7 : i + 1]
+            if np.all(ultimos_8 > lm) or np.all(ultimos_8 < lm):
                 msg = f"ALERTA (Amostra {amostra_atual}): Regra 4 - 8 pontos no mesmo lado da média."
                 alertas.append(msg)
                 print(msg)
 
         if i >= 4:
             ultimos_5 = pontos_x_barra[i - 4 : i + 1]
-            acima_1s = sum(1 for p in ultimos_5 if p > zonas["LSC_1S"])
-            abaixo_1s = sum(1 for p in ultimos_5 if p < zonas["LIC_1S"])
+            acima_1s = np.count_nonzero(ultimos_5 > zonas["LSC_1S"][i - 4 : i + 1])
+            abaixo_1s = np.count_nonzero(ultimos_5 < zonas["LIC_1S"][i - 4 : i + 1])
             if acima_1s >= 4 or abaixo_1s >= 4:
                 msg = f"ALERTA (Amostra {amostra_atual}): Regra 3 - 4 de 5 pontos além de 1-sigma."
                 alertas.append(msg)
@@ -201,8 +519,8 @@ def analisar_regras_weco(
 
         if i >= 2:
             ultimos_3 = pontos_x_barra[i - 2 : i + 1]
-            acima_2s = sum(1 for p in ultimos_3 if p > zonas["LSC_2S"])
-            abaixo_2s = sum(1 for p in ultimos_3 if p < zonas["LIC_2S"])
+            acima_2s = np.count_nonzero(ultimos_3 > zonas["LSC_2S"][i - 2 : i + 1])
+            abaixo_2s = np.count_nonzero(ultimos_3 < zonas["LIC_2S"][i - 2 : i + 1])
             if acima_2s >= 2 or abaixo_2s >= 2:
                 msg = f"ALERTA (Amostra {amostra_atual}): Regra 2 - 2 de 3 pontos além de 2-sigma."
                 alertas.append(msg)
@@ -222,7 +540,7 @@ def plotar_grafico_monitoramento_xr(
 ) -> bool:
     print(f"Gerando gráfico de monitoramento X-R em: {caminho_saida_grafico}")
     try:
-        zonas = _calcular_zonas_weco(info_limites["limites_X_barra"])
+        zonas = calcular_zonas_weco(info_limites["limites_X_barra"])
         limites_r = info_limites["limites_R"]
 
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 12))
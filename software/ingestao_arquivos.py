@@ -0,0 +1,125 @@
+import os
+import glob
+import json
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+
+    _decodificar_json = orjson.loads
+except ImportError:
+    _decodificar_json = json.loads
+
+EXTENSOES_SUBGRUPOS = (".json", ".jsonl")
+_CARACTERES_GLOB = "*?["
+
+
+def e_fonte_multipla(caminho: str) -> bool:
+    return os.path.isdir(caminho) or any(c in caminho for c in _CARACTERES_GLOB)
+
+
+def expandir_caminhos(caminho_ou_padrao: str) -> list[str]:
+    if os.path.isdir(caminho_ou_padrao):
+        caminhos = [
+            os.path.join(raiz, nome)
+            for raiz, _, nomes in os.walk(caminho_ou_padrao)
+            for nome in nomes
+            if nome.endswith(EXTENSOES_SUBGRUPOS)
+        ]
+    elif any(c in caminho_ou_padrao for c in _CARACTERES_GLOB):
+        caminhos = glob.glob(caminho_ou_padrao, recursive=True)
+    else:
+        caminhos = [caminho_ou_padrao]
+    return sorted(caminhos)
+
+
+def _ler_arquivo_subgrupos(caminho: str) -> tuple[list, list]:
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+
+    if caminho.endswith(".jsonl"):
+        registros = [
+            _decodificar_json(linha) for linha in conteudo.splitlines() if linha.strip()
+        ]
+    else:
+        registros = _decodificar_json(conteudo)
+        if isinstance(registros, dict):
+            registros = [registros]
+
+    if not isinstance(registros, list):
+        raise ValueError("o conteúdo não é uma lista de subgrupos")
+    amostras = []
+    dados = []
+    for i, registro in enumerate(registros):
+        if (
+            not isinstance(registro, dict)
+            or "Amostra" not in registro
+            or not isinstance(registro.get("Dados"), list)
+        ):
+            raise ValueError(f"registro {i} sem 'Amostra'/'Dados' válidos")
+        try:
+            # Leituras nulas viram NaN; texto invalida o arquivo, que é listado em falhas.
+            leituras = np.asarray(registro["Dados"], dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"registro {i} com leituras não numéricas ({e})") from None
+        amostras.append(registro["Amostra"])
+        dados.append(leituras)
+    return amostras, dados
+
+
+def _ler_arquivo_seguro(caminho: str) -> tuple[list, list, str | None]:
+    try:
+        amostras, dados = _ler_arquivo_subgrupos(caminho)
+        return amostras, dados, None
+    except Exception as e:
+        return [], [], f"{type(e).__name__}: {e}"
+
+
+def _chaves_ordenacao(amostras: np.ndarray) -> np.ndarray:
+    numericas = pd.to_numeric(pd.Series(amostras, dtype=object), errors="coerce")
+    if not numericas.isna().any():
+        return numericas.to_numpy(dtype=np.float64)
+    return np.array([str(a) for a in amostras], dtype=str)
+
+
+def carregar_subgrupos_multiplos(
+    caminho_ou_padrao: str, max_workers: int | None = None, usar_processos: bool = False
+) -> tuple[np.ndarray, np.ndarray, list[tuple[str, str]]]:
+    caminhos = expandir_caminhos(caminho_ou_padrao)
+    print(f"Lendo {len(caminhos)} arquivo(s) de subgrupos de: {caminho_ou_padrao}")
+    if not caminhos:
+        return np.empty(0, dtype=object), np.empty(0, dtype=object), []
+
+    executor = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+    with executor(max_workers=max_workers) as pool:
+        resultados = list(pool.map(_ler_arquivo_seguro, caminhos, chunksize=16))
+
+    falhas = [(c, erro) for c, (_, _, erro) in zip(caminhos, resultados) if erro]
+    if falhas:
+        print(f"AVISO: {len(falhas)} arquivo(s) malformado(s) ignorado(s):")
+        for caminho, erro in falhas:
+            print(f"  - {caminho}: {erro}")
+
+    total = sum(len(r[0]) for r in resultados)
+    amostras = np.fromiter(chain.from_iterable(r[0] for r in resultados), object, total)
+    dados = np.fromiter(chain.from_iterable(r[1] for r in resultados), object, total)
+    if len(amostras) == 0:
+        return amostras, dados, falhas
+
+    # Ordena por Amostra; em duplicatas prevalece o arquivo lido por último (ordem lexical).
+    chaves = _chaves_ordenacao(amostras)
+    ordem = np.lexsort((np.arange(len(amostras)), chaves))
+    chaves_ordenadas = chaves[ordem]
+    ultima_ocorrencia = np.ones(len(ordem), dtype=bool)
+    ultima_ocorrencia[:-1] = chaves_ordenadas[1:] != chaves_ordenadas[:-1]
+    selecionados = ordem[ultima_ocorrencia]
+
+    num_duplicados = len(amostras) - len(selecionados)
+    if num_duplicados:
+        print(f"*Aviso: {num_duplicados} subgrupo(s) com Amostra duplicada descartado(s).")
+
+    return amostras[selecionados], dados[selecionados], falhas
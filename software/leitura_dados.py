@@ -2,8 +2,11 @@
 import pandas as pd
 import numpy as np
 import json
+from itertools import chain
+from software import ingestao_arquivos
 
 ARQUIVO_LIMITES = "limites_controle.json"
+PREFIXO_LIMITES = "limites_"
 ARQUIVO_CONSTANTES = "constants_cep.json"
 
 
@@ -43,6 +46,113 @@ def carregar_especificacoes(caminho_arquivo: str, nome_processo: str) -> dict |
         return None
 
 
+def montar_subgrupos_csr(lista_dados) -> tuple[np.ndarray, np.ndarray]:
+    tamanhos_brutos = np.fromiter(map(len, lista_dados), dtype=np.int64)
+    try:
+        valores = np.fromiter(
+            chain.from_iterable(lista_dados), np.float64, count=int(tamanhos_brutos.sum())
+        )
+    except TypeError:
+        # Leituras nulas (None) só viram NaN pela conversão de np.array.
+        valores = np.array(list(chain.from_iterable(lista_dados)), dtype=np.float64)
+
+    validos = ~np.isnan(valores)
+    if not validos.all():
+        ids_subgrupo = np.repeat(np.arange(len(tamanhos_brutos)), tamanhos_brutos)
+        valores = valores[validos]
+        tamanhos = np.bincount(
+            ids_subgrupo[validos], minlength=len(tamanhos_brutos)
+        ).astype(np.int64)
+    else:
+        tamanhos = tamanhos_brutos
+
+    offsets = np.zeros(len(tamanhos) + 1, dtype=np.int64)
+    np.cumsum(tamanhos, out=offsets[1:])
+    return valores, offsets
+
+
+def calcular_estatisticas_subgrupos(
+    valores: np.ndarray, offsets: np.ndarray
+) -> dict[str, np.ndarray]:
+    tamanhos = np.diff(offsets)
+    nao_vazios = tamanhos > 0
+    inicios = offsets[:-1][nao_vazios]
+    n_validos = tamanhos[nao_vazios]
+
+    media = np.full(len(tamanhos), np.nan)
+    amplitude = np.full(len(tamanhos), np.nan)
+    desvio = np.full(len(tamanhos), np.nan)
+
+    if len(inicios) > 0:
+        soma = np.add.reduceat(valores, inicios)
+        media_validos = soma / n_validos
+        maximo = np.maximum.reduceat(valores, inicios)
+        minimo = np.minimum.reduceat(valores, inicios)
+
+        desvios = valores - np.repeat(media_validos, n_validos)
+        soma_quadrados = np.add.reduceat(desvios * desvios, inicios)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            desvio_validos = np.sqrt(soma_quadrados / (n_validos - 1))
+
+        media[nao_vazios] = media_validos
+        amplitude[nao_vazios] = maximo - minimo
+        desvio[nao_vazios] = desvio_validos
+
+    return {"n": tamanhos, "X_barra": media, "R": amplitude, "S": desvio}
+
+
+def compactar_amostras(amostras) -> np.ndarray | pd.Categorical:
+    serie = pd.Series(amostras)
+    numericas = pd.to_numeric(serie, errors="coerce")
+    if not numericas.isna().any() and (numericas % 1 == 0).all():
+        return pd.to_numeric(numericas.astype(np.int64), downcast="integer").to_numpy()
+    return pd.Categorical(serie.astype(str))
+
+
+def montar_frame_subgrupos(
+    amostras,
+    estatisticas: dict,
+    compacto: bool = False,
+    precisao_simples: bool = False,
+) -> pd.DataFrame:
+    tipo_estatisticas = np.float32 if precisao_simples else np.float64
+    tamanhos = estatisticas["n"]
+
+    if compacto:
+        amostras = compactar_amostras(amostras)
+        tamanhos = pd.to_numeric(tamanhos, downcast="unsigned")
+
+    df_processado = pd.DataFrame(
+        {
+            "Amostra": amostras,
+            "X_barra": estatisticas["X_barra"].astype(tipo_estatisticas, copy=False),
+            "R": estatisticas["R"].astype(tipo_estatisticas, copy=False),
+            "S": estatisticas["S"].astype(tipo_estatisticas, copy=False),
+            "n": tamanhos,
+        },
+        copy=False,
+    )
+
+    incompletos = df_processado["n"] < 2
+    if incompletos.any():
+        print(
+            f"Aviso: {int(incompletos.sum())} subgrupo(s) com menos de 2 leituras válidas foram descartados."
+        )
+        df_processado = df_processado[~incompletos].reset_index(drop=True)
+
+    return df_processado
+
+
+def _processar_subgrupos_xr(
+    df_bruto: pd.DataFrame, compacto: bool = False, precisao_simples: bool = False
+) -> pd.DataFrame:
+    valores, offsets = montar_subgrupos_csr(df_bruto["Dados"].to_numpy())
+    estatisticas = calcular_estatisticas_subgrupos(valores, offsets)
+    return montar_frame_subgrupos(
+        df_bruto["Amostra"].to_numpy(), estatisticas, compacto, precisao_simples
+    )
+
+
 def carregar_dados_calibracao_xr(
     caminho_arquivo: str,
 ) -> tuple[pd.DataFrame | None, int | None]:
@@ -57,15 +167,22 @@ def carregar_dados_calibracao_xr(
             print("ERRO: O arquivo de dados está vazio.")
             return None, None
 
-        n_amostra = len(df_bruto["Dados"].iloc[0])
-        print(f"Tamanho da amostra (n) detectado: {n_amostra}")
+        df_processado = _processar_subgrupos_xr(df_bruto)
+        del df_bruto
+        if len(df_processado) == 0:
+            print("ERRO: Nenhum subgrupo válido no arquivo de dados.")
+            return None, None
 
-        df_bruto["X_barra"] = df_bruto["Dados"].apply(np.mean)
-        df_bruto["R"] = df_bruto["Dados"].apply(
-            lambda lista: np.max(lista) - np.min(lista)
-        )
+        tamanhos = df_processado["n"]
+        n_amostra = int(tamanhos.mode().iloc[0])
+        if tamanhos.nunique() > 1:
+            print(
+                f"Tamanho de amostra variável detectado (n de {tamanhos.min()} a {tamanhos.max()}); "
+                f"n de referência: {n_amostra}"
+            )
+        else:
+            print(f"Tamanho da amostra (n) detectado: {n_amostra}")
 
-        df_processado = df_bruto[["Amostra", "X_barra", "R"]]
         return df_processado, n_amostra
 
     except FileNotFoundError:
@@ -129,23 +246,103 @@ def carregar_dados_calibracao_u(caminho_arquivo: str) -> pd.DataFrame | None:
 def carregar_dados_monitoramento_xr(caminho_arquivo: str) -> pd.DataFrame | None:
     print(f"Lendo dados de MONITORAMENTO X-R de: {caminho_arquivo}")
     try:
-        df_bruto = pd.read_json(caminho_arquivo)
-
-        if "Dados" not in df_bruto.columns or "Amostra" not in df_bruto.columns:
-            print("ERRO: O JSON não contém as colunas 'Dados'/'Amostra' esperadas.")
+        brutos = _ler_subgrupos_brutos(caminho_arquivo)
+        if brutos is None:
             return None
 
-        df_bruto["X_barra"] = df_bruto["Dados"].apply(np.mean)
-        df_bruto["R"] = df_bruto["Dados"].apply(
-            lambda lista: np.max(lista) - np.min(lista)
-        )
+        amostras, dados = brutos
+        valores, offsets = montar_subgrupos_csr(dados)
+        estatisticas = calcular_estatisticas_subgrupos(valores, offsets)
+        return montar_frame_subgrupos(amostras, estatisticas)
+
+    except Exception as e:
+        print(f"ERRO ao processar novos dados X-R: {e}")
+        return None
 
-        df_processado = df_bruto[["Amostra", "X_barra", "R"]]
-        return df_processado
 
+def _ler_subgrupos_brutos(caminho_arquivo: str) -> tuple[np.ndarray, np.ndarray] | None:
+    if ingestao_arquivos.e_fonte_multipla(caminho_arquivo):
+        amostras, dados, _ = ingestao_arquivos.carregar_subgrupos_multiplos(caminho_arquivo)
+        if len(amostras) == 0:
+            print(f"ERRO: Nenhum subgrupo válido encontrado em {caminho_arquivo}")
+            return None
+        return amostras, dados
+
+    try:
+        df_bruto = pd.read_json(caminho_arquivo)
     except FileNotFoundError:
         print(f"ERRO: Arquivo de dados não encontrado em {caminho_arquivo}")
         return None
-    except Exception as e:
-        print(f"ERRO ao processar novos dados X-R: {e}")
+    except ValueError as e:
+        print(f"ERRO ao ler {caminho_arquivo}: {e}")
+        return None
+
+    if "Dados" not in df_bruto.columns or "Amostra" not in df_bruto.columns:
+        print(f"ERRO: {caminho_arquivo} não contém as colunas 'Dados'/'Amostra' esperadas.")
         return None
+
+    return df_bruto["Amostra"].to_numpy(), df_bruto["Dados"].to_numpy()
+
+
+def carregar_historico_xr(
+    caminho_calibracao: str,
+    caminho_monitoramento: str | None = None,
+    compacto: bool = True,
+    precisao_simples: bool = False,
+    consumidor_valores=None,
+    leitor_calibracao=None,
+) -> tuple[pd.DataFrame | None, int | None, int | None]:
+    print(f"Lendo histórico X-R (calibração + monitoramento) de: {caminho_calibracao}")
+    try:
+        calibracao = (leitor_calibracao or _ler_subgrupos_brutos)(caminho_calibracao)
+        if calibracao is None or len(calibracao[0]) == 0:
+            print("ERRO: Dados de calibração X-R ausentes ou vazios.")
+            return None, None, None
+
+        partes = [calibracao]
+        if caminho_monitoramento is not None:
+            print(f"Lendo dados de MONITORAMENTO X-R de: {caminho_monitoramento}")
+            monitoramento = _ler_subgrupos_brutos(caminho_monitoramento)
+            if monitoramento is None:
+                print("*Aviso: Não foi possível carregar dados de monitoramento X-R.")
+            else:
+                partes.append(monitoramento)
+
+        amostras = np.concatenate([p[0] for p in partes])
+        dados = np.concatenate([p[1] for p in partes])
+        num_calibracao = len(calibracao[0])
+        tem_monitoramento = len(partes) > 1
+        del partes, calibracao
+
+        valores, offsets = montar_subgrupos_csr(dados)
+        del dados
+        estatisticas = calcular_estatisticas_subgrupos(valores, offsets)
+        if consumidor_valores is not None:
+            # As leituras são entregues por fonte: calibração e, se houver, monitoramento.
+            corte = offsets[num_calibracao]
+            consumidor_valores(caminho_calibracao, valores[:corte])
+            if tem_monitoramento:
+                consumidor_valores(caminho_monitoramento, valores[corte:])
+        del valores
+
+        validos_calibracao = int(np.count_nonzero(estatisticas["n"][:num_calibracao] >= 2))
+        df_total = montar_frame_subgrupos(
+            amostras, estatisticas, compacto, precisao_simples
+        )
+
+        if validos_calibracao == 0:
+            print("ERRO: Nenhum subgrupo válido nos dados de calibração.")
+            return None, None, None
+
+        tamanhos = df_total["n"].iloc[:validos_calibracao]
+        n_amostra = int(tamanhos.mode().iloc[0])
+        print(
+            f"Tamanho da amostra (n) detectado: {n_amostra} "
+            f"({validos_calibracao} subgrupos de calibração, "
+            f"{len(df_total) - validos_calibracao} de monitoramento)"
+        )
+        return df_total, n_amostra, validos_calibracao
+
+    except Exception as e:
+        print(f"ERRO ao processar histórico X-R: {e}")
+        return None, None, None
@@ -0,0 +1,365 @@
+import os
+import sys
+import json
+import time
+import select
+import ctypes
+import ctypes.util
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from software import leitura_dados
+from software import graficos_variaveis
+from software import sketch_quantis
+
+EXTENSOES_MONITORADAS = (".json", ".jsonl")
+INTERVALO_POLLING_S = 0.2
+NUM_PONTOS_CONTEXTO_WECO = 7
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_MASCARA_INOTIFY = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+
+class _Inotify:
+    def __init__(self):
+        self.fd = None
+        self.observados = set()
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = self._libc.inotify_init1(os.O_NONBLOCK)
+            if fd >= 0:
+                self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
+
+    @property
+    def disponivel(self) -> bool:
+        return self.fd is not None
+
+    def observar(self, pasta: str) -> None:
+        if self.fd is None or pasta in self.observados:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(pasta), _MASCARA_INOTIFY)
+        if wd >= 0:
+            self.observados.add(pasta)
+
+    def aguardar(self, timeout: float) -> bool:
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def fechar(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class MonitorPasta:
+    def __init__(
+        self,
+        pasta_monitoramento: str,
+        pasta_limites: str,
+        pasta_processados: str,
+        processo_padrao: str,
+        caminho_estado: str,
+        pasta_sketches: str | None = None,
+        estado_painel=None,
+    ):
+        self.pasta_monitoramento = pasta_monitoramento
+        self.pasta_limites = pasta_limites
+        self.pasta_processados = pasta_processados
+        self.processo_padrao = processo_padrao
+        self.caminho_estado = caminho_estado
+        self.pasta_sketches = pasta_sketches
+        self.estado_painel = estado_painel
+
+        self.estado = self._carregar_estado()
+        self._limites = {}
+        self._sem_limites = set()
+        self._contextos = {}
+        self._sketches_pendentes = {}
+
+    def _carregar_estado(self) -> dict:
+        if os.path.exists(self.caminho_estado):
+            try:
+                with open(self.caminho_estado, "r") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"AVISO: Estado do monitoramento ignorado ({e}).")
+        return {}
+
+    def _salvar_estado(self) -> None:
+        caminho_tmp = f"{self.caminho_estado}.tmp"
+        with open(caminho_tmp, "w") as f:
+            json.dump(self.estado, f, indent=4)
+        os.replace(caminho_tmp, self.caminho_estado)
+
+    def _processo_do_arquivo(self, caminho: str) -> str:
+        relativo = os.path.relpath(caminho, self.pasta_monitoramento)
+        partes = relativo.split(os.sep)
+        return partes[0] if len(partes) > 1 else self.processo_padrao
+
+    def _obter_limites(self, processo: str) -> dict | None:
+        caminho = os.path.join(self.pasta_limites, f"limites_{processo}.json")
+        try:
+            mtime = os.path.getmtime(caminho)
+        except OSError:
+            if processo not in self._sem_limites:
+                print(
+                    f"AVISO: Limites de '{processo}' não encontrados em {caminho}; "
+                    "as leituras aguardam a calibração."
+                )
+                self._sem_limites.add(processo)
+            return None
+        self._sem_limites.discard(processo)
+
+        em_cache = self._limites.get(processo)
+        if em_cache is None or em_cache[0] != mtime:
+            with open(caminho, "r") as f:
+                self._limites[processo] = (mtime, json.load(f))
+        return self._limites[processo][1]
+
+    def _obter_contexto(self, processo: str) -> deque:
+        if processo not in self._contextos:
+            contexto = deque(maxlen=NUM_PONTOS_CONTEXTO_WECO)
+            caminho_monit = os.path.join(
+                self.pasta_processados, f"monitoramento_{processo}.csv"
+            )
+            caminho_calib = os.path.join(
+                self.pasta_processados, f"calibracao_{processo}.csv"
+            )
+            for caminho in (caminho_calib, caminho_monit):
+                if os.path.exists(caminho):
+                    try:
+                        ultimos = pd.read_csv(caminho).tail(NUM_PONTOS_CONTEXTO_WECO)
+                        contexto.extend(ultimos.to_dict("records"))
+                    except Exception as e:
+                        print(f"AVISO: Contexto de '{caminho}' indisponível ({e}).")
+            self._contextos[processo] = contexto
+        return self._contextos[processo]
+
+    def varrer_arquivos(self) -> list[str]:
+        arquivos = []
+        for raiz, _, nomes in os.walk(self.pasta_monitoramento):
+            for nome in nomes:
+                if nome.endswith(EXTENSOES_MONITORADAS):
+                    arquivos.append(os.path.join(raiz, nome))
+        return sorted(arquivos)
+
+    def _fim_ultima_linha(self, caminho: str, tamanho: int) -> int:
+        with open(caminho, "rb") as f:
+            fim = tamanho
+            while fim > 0:
+                inicio = max(0, fim - 65536)
+                f.seek(inicio)
+                posicao = f.read(fim - inicio).rfind(b"\n")
+                if posicao >= 0:
+                    return inicio + posicao + 1
+                fim = inicio
+        return 0
+
+    def _registro_existente(self, caminho: str) -> dict:
+        tamanho = os.path.getsize(caminho)
+        if caminho.endswith(".jsonl"):
+            return {"offset": self._fim_ultima_linha(caminho, tamanho), "subgrupos": 0}
+        try:
+            with open(caminho, "r") as f:
+                subgrupos = len(json.load(f))
+        except (json.JSONDecodeError, TypeError):
+            return {"offset": 0, "subgrupos": 0}
+        return {"offset": tamanho, "subgrupos": subgrupos}
+
+    def marcar_existentes(self) -> int:
+        # Arquivos já presentes ao iniciar foram (ou serão) lidos pelo processamento
+        # em lote; o modo contínuo começa do fim deles e processa só o que chegar depois.
+        novos = 0
+        for caminho in self.varrer_arquivos():
+            if caminho in self.estado:
+                continue
+            try:
+                self.estado[caminho] = self._registro_existente(caminho)
+            except OSError as e:
+                print(f"AVISO: Falha ao ler {caminho}: {e}")
+                continue
+            novos += 1
+        if novos:
+            self._salvar_estado()
+        return novos
+
+    def _ler_novos_subgrupos(self, caminho: str) -> tuple[list[dict], dict]:
+        registro = dict(self.estado.get(caminho, {"offset": 0, "subgrupos": 0}))
+        tamanho = os.path.getsize(caminho)
+
+        if caminho.endswith(".jsonl"):
+            if tamanho < registro["offset"]:
+                registro["offset"] = 0
+            if tamanho == registro["offset"]:
+                return [], registro
+            with open(caminho, "rb") as f:
+                f.seek(registro["offset"])
+                bloco = f.read(tamanho - registro["offset"])
+            ultimo_fim_linha = bloco.rfind(b"\n")
+            if ultimo_fim_linha < 0:
+                return [], registro
+            registro["offset"] += ultimo_fim_linha + 1
+            linhas = bloco[: ultimo_fim_linha + 1].splitlines()
+            novos = []
+            for linha in linhas:
+                if linha.strip():
+                    try:
+                        novos.append(json.loads(linha))
+                    except json.JSONDecodeError as e:
+                        print(f"AVISO: Linha inválida em {caminho} ignorada ({e}).")
+            registro["subgrupos"] += len(novos)
+            return novos, registro
+
+        if tamanho == registro["offset"]:
+            return [], registro
+        try:
+            with open(caminho, "r") as f:
+                todos = json.load(f)
+        except json.JSONDecodeError:
+            return [], registro
+        novos = todos[registro["subgrupos"] :]
+        registro["offset"] = tamanho
+        registro["subgrupos"] = len(todos)
+        return novos, registro
+
+    def processar_subgrupos(
+        self, processo: str, subgrupos: list[dict], fonte: str = ""
+    ) -> list[str] | None:
+        limites = self._obter_limites(processo)
+        if limites is None:
+            return None
+
+        valores, offsets = leitura_dados.montar_subgrupos_csr(
+            [s.get("Dados", []) for s in subgrupos]
+        )
+        estatisticas = leitura_dados.calcular_estatisticas_subgrupos(valores, offsets)
+        df_novos = leitura_dados.montar_frame_subgrupos(
+            np.array([s.get("Amostra") for s in subgrupos], dtype=object), estatisticas
+        )
+        if len(df_novos) == 0:
+            return []
+
+        contexto = self._obter_contexto(processo)
+        df_contexto = pd.DataFrame(list(contexto), columns=df_novos.columns)
+        df_total = pd.concat([df_contexto, df_novos], ignore_index=True)
+
+        alertas = graficos_variaveis.analisar_regras_weco(
+            df_total, limites, len(df_contexto)
+        )
+
+        caminho_csv = os.path.join(self.pasta_processados, f"monitoramento_{processo}.csv")
+        df_novos.to_csv(
+            caminho_csv, mode="a", header=not os.path.exists(caminho_csv), index=False
+        )
+
+        if alertas:
+            caminho_alertas = os.path.join(self.pasta_limites, f"alertas_{processo}.json")
+            existentes = []
+            if os.path.exists(caminho_alertas):
+                try:
+                    with open(caminho_alertas, "r") as f:
+                        existentes = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    existentes = []
+            with open(caminho_alertas, "w") as f:
+                json.dump(existentes + alertas, f, indent=4, ensure_ascii=False)
+
+        contexto.extend(df_novos.to_dict("records"))
+        if self.pasta_sketches is not None:
+            pendentes = self._sketches_pendentes.setdefault(processo, {})
+            pendentes.setdefault(os.path.abspath(fonte) if fonte else "", []).append(valores)
+
+        if self.estado_painel is not None:
+            for ponto in df_novos.itertuples(index=False):
+                self.estado_painel.publicar_ponto(
+                    processo,
+                    str(ponto.Amostra),
+                    x_barra=float(ponto.X_barra),
+                    r=float(ponto.R),
+                    n=int(ponto.n),
+                )
+
+        return alertas
+
+    def processar_alteracoes(self) -> int:
+        total_novos = 0
+        alterado = False
+        for caminho in self.varrer_arquivos():
+            try:
+                novos, registro = self._ler_novos_subgrupos(caminho)
+            except OSError as e:
+                print(f"AVISO: Falha ao ler {caminho}: {e}")
+                continue
+            if not novos:
+                if registro != self.estado.get(caminho):
+                    self.estado[caminho] = registro
+                    alterado = True
+                continue
+            processo = self._processo_do_arquivo(caminho)
+            try:
+                alertas = self.processar_subgrupos(processo, novos, fonte=caminho)
+            except Exception as e:
+                print(f"ERRO ao processar {caminho}: {e}")
+                continue
+            # Sem limites (ou com erro) o offset fica onde estava e as leituras
+            # são reprocessadas na próxima varredura.
+            if alertas is None:
+                continue
+            print(f"{len(novos)} novo(s) subgrupo(s) de '{processo}' em {caminho}")
+            self.estado[caminho] = registro
+            alterado = True
+            total_novos += len(novos)
+
+        if alterado:
+            self.gravar_sketches()
+            self._salvar_estado()
+        return total_novos
+
+    def gravar_sketches(self) -> None:
+        # As leituras da varredura são acumuladas por processo e fonte e gravadas
+        # de uma vez, em vez de regravar o sketch a cada arquivo processado.
+        for processo, pendentes in self._sketches_pendentes.items():
+            sketch_quantis.adicionar_fontes(
+                os.path.join(self.pasta_sketches, f"sketch_{processo}.json"),
+                {fonte: np.concatenate(partes) for fonte, partes in pendentes.items()},
+            )
+        self._sketches_pendentes = {}
+
+    def executar(self, intervalo: float = INTERVALO_POLLING_S, duracao: float | None = None):
+        inotify = _Inotify()
+        modo = "inotify" if inotify.disponivel else f"polling a cada {intervalo}s"
+        print(f"Monitorando {self.pasta_monitoramento} ({modo}). Ctrl+C para encerrar.")
+
+        inicio = time.monotonic()
+        try:
+            self.marcar_existentes()
+            self.processar_alteracoes()
+            while duracao is None or time.monotonic() - inicio < duracao:
+                if inotify.disponivel:
+                    for raiz, _, _ in os.walk(self.pasta_monitoramento):
+                        inotify.observar(raiz)
+                    if not inotify.aguardar(1.0):
+                        continue
+                else:
+                    time.sleep(intervalo)
+                self.processar_alteracoes()
+        except KeyboardInterrupt:
+            print("\nMonitoramento contínuo encerrado.")
+        finally:
+            inotify.fechar()
@@ -0,0 +1,275 @@
+import numpy as np
+from itertools import chain
+
+from software import constantes_cep
+from software import leitura_dados
+from software import graficos_variaveis
+
+REGRAS_WECO = ("regra_1", "regra_4", "regra_3", "regra_2")
+
+_MENSAGENS_WECO = {
+    "regra_1": "Regra 1 - Ponto fora do limite ({valor:.5f})",
+    "regra_4": "Regra 4 - 8 pontos no mesmo lado da média.",
+    "regra_3": "Regra 3 - 4 de 5 pontos além de 1-sigma.",
+    "regra_2": "Regra 2 - 2 de 3 pontos além de 2-sigma.",
+}
+
+
+def montar_tensor(dados_por_caracteristica: list) -> tuple[np.ndarray, np.ndarray]:
+    num_subgrupos = np.fromiter(map(len, dados_por_caracteristica), dtype=np.int64)
+    subgrupos = list(chain.from_iterable(dados_por_caracteristica))
+    valores, offsets = leitura_dados.montar_subgrupos_csr(subgrupos)
+
+    tamanhos = np.diff(offsets)
+    C = len(dados_por_caracteristica)
+    K = int(num_subgrupos.max()) if C else 0
+    N = int(tamanhos.max()) if len(tamanhos) else 0
+
+    id_caracteristica = np.repeat(np.arange(C), num_subgrupos)
+    inicio_caracteristica = np.repeat(np.cumsum(num_subgrupos) - num_subgrupos, num_subgrupos)
+    id_subgrupo = np.arange(len(subgrupos)) - inicio_caracteristica
+
+    posicao = np.arange(len(valores)) - np.repeat(offsets[:-1], tamanhos)
+    linha = np.repeat(id_caracteristica, tamanhos)
+    coluna = np.repeat(id_subgrupo, tamanhos)
+
+    tensor = np.full((C, K, N), np.nan)
+    tensor[linha, coluna, posicao] = valores
+    return tensor, ~np.isnan(tensor)
+
+
+def contar_janela_movel(indicador: np.ndarray, largura: int) -> np.ndarray:
+    acumulado = np.cumsum(indicador, axis=1, dtype=np.int64)
+    contagem = acumulado.copy()
+    contagem[:, largura:] -= acumulado[:, :-largura]
+    contagem[:, : largura - 1] = -1
+    return contagem
+
+
+def _constantes_em_lote(tamanhos_ref: np.ndarray, constantes_db: dict) -> dict:
+    n_unicos, inverso = np.unique(tamanhos_ref, return_inverse=True)
+    tabela = {nome: np.empty(len(n_unicos)) for nome in ("A2", "D3", "D4")}
+    for i, n in enumerate(n_unicos):
+        constantes = constantes_cep.obter_constantes(int(n), constantes_db)
+        for nome in tabela:
+            tabela[nome][i] = constantes[nome]
+    return {nome: valores[inverso] for nome, valores in tabela.items()}
+
+
+def _estatisticas_tensor(
+    tensor: np.ndarray, mascara: np.ndarray | None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    tensor = np.asarray(tensor, dtype=np.float64)
+    if mascara is None:
+        mascara = ~np.isnan(tensor)
+    else:
+        mascara = np.asarray(mascara, dtype=bool) & ~np.isnan(tensor)
+
+    tamanhos = mascara.sum(axis=2)
+    soma = np.where(mascara, tensor, 0.0).sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_barra = soma / tamanhos
+    amplitude = np.where(mascara, tensor, -np.inf).max(axis=2) - np.where(
+        mascara, tensor, np.inf
+    ).min(axis=2)
+    return x_barra, amplitude, tamanhos
+
+
+def _compactar_validos(validos: np.ndarray) -> np.ndarray:
+    # Ordem estável que leva os subgrupos válidos de cada linha para o início:
+    # as janelas WECO ignoram subgrupos com n < 2, como analisar_regras_weco.
+    return np.argsort(~validos, axis=1, kind="stable")
+
+
+def processar_lote_xr(
+    tensor: np.ndarray,
+    constantes_db: dict,
+    mascara: np.ndarray | None = None,
+    indice_inicio_novos: int | None = None,
+    nomes: list[str] | None = None,
+    amostras: np.ndarray | None = None,
+) -> dict | None:
+    print(f"Processando lote X-R com tensor de forma {tensor.shape}...")
+    try:
+        x_barra, amplitude, tamanhos = _estatisticas_tensor(tensor, mascara)
+    except Exception as e:
+        print(f"ERRO ao processar lote X-R: {e}")
+        return None
+    return avaliar_lote_xr(
+        x_barra, amplitude, tamanhos, constantes_db, indice_inicio_novos, nomes, amostras
+    )
+
+
+def avaliar_lote_xr(
+    x_barra: np.ndarray,
+    amplitude: np.ndarray,
+    tamanhos: np.ndarray,
+    constantes_db: dict,
+    indice_inicio_novos=None,
+    nomes: list[str] | None = None,
+    amostras: np.ndarray | None = None,
+    limites: list[dict] | None = None,
+) -> dict | None:
+    try:
+        x_barra = np.asarray(x_barra, dtype=np.float64)
+        amplitude = np.asarray(amplitude, dtype=np.float64)
+        tamanhos = np.asarray(tamanhos, dtype=np.int64)
+        C, K = x_barra.shape
+        posicoes = np.arange(K)[None, :]
+        if indice_inicio_novos is None:
+            indice_inicio_novos = K
+        inicio_novos = np.broadcast_to(np.asarray(indice_inicio_novos), (C,))[:, None]
+
+        validos = tamanhos >= 2
+        x_barra = np.where(validos, x_barra, np.nan)
+        amplitude = np.where(validos, amplitude, np.nan)
+
+        if limites is None:
+            resultados_limites = _calibrar_lote(
+                x_barra, amplitude, tamanhos, validos & (posicoes < inicio_novos), constantes_db
+            )
+            if resultados_limites is None:
+                return None
+        else:
+            resultados_limites = limites
+
+        limites_x = {
+            chave: np.array([l["limites_X_barra"][chave] for l in resultados_limites])
+            for chave in ("LM", "LSC", "LIC")
+        }
+        zonas = graficos_variaveis.calcular_zonas_weco(limites_x)
+
+        # Cada subgrupo é avaliado contra os limites do seu próprio n.
+        por_subgrupo = [
+            graficos_variaveis.limites_xr_por_subgrupo(
+                tamanhos[c], resultados_limites[c], constantes_db
+            )
+            for c in range(C)
+        ]
+        zonas_subgrupo = graficos_variaveis.calcular_zonas_weco(
+            {chave: np.stack([l[chave] for l in por_subgrupo]) for chave in ("LM", "LSC", "LIC")}
+        )
+
+        ordem = _compactar_validos(validos)
+        z = {
+            chave: np.take_along_axis(valores, ordem, axis=1)
+            for chave, valores in zonas_subgrupo.items()
+        }
+        serie = np.take_along_axis(x_barra, ordem, axis=1)
+        with np.errstate(invalid="ignore"):
+            regra_1 = (serie > z["LSC"]) | (serie < z["LIC"])
+            regra_4 = (contar_janela_movel(serie > z["LM"], 8) == 8) | (
+                contar_janela_movel(serie < z["LM"], 8) == 8
+            )
+            regra_3 = (contar_janela_movel(serie > z["LSC_1S"], 5) >= 4) | (
+                contar_janela_movel(serie < z["LIC_1S"], 5) >= 4
+            )
+            regra_2 = (contar_janela_movel(serie > z["LSC_2S"], 3) >= 2) | (
+                contar_janela_movel(serie < z["LIC_2S"], 3) >= 2
+            )
+
+        monitoramento = validos & (posicoes >= inicio_novos)
+        flags = {}
+        for regra, compactada in (
+            ("regra_1", regra_1),
+            ("regra_4", regra_4),
+            ("regra_3", regra_3),
+            ("regra_2", regra_2),
+        ):
+            original = np.zeros((C, K), dtype=bool)
+            np.put_along_axis(original, ordem, compactada, axis=1)
+            flags[regra] = original & monitoramento
+
+        if nomes is None:
+            nomes = [f"caracteristica_{i + 1}" for i in range(C)]
+        if amostras is None:
+            amostras = np.arange(1, K + 1)
+        amostras = np.broadcast_to(np.asarray(amostras), (C, K))
+
+        alertas = {nome: [] for nome in nomes}
+        qualquer = np.zeros((C, K), dtype=bool)
+        for regra in REGRAS_WECO:
+            qualquer |= flags[regra]
+        for c, k in zip(*np.nonzero(qualquer)):
+            amostra = amostras[c, k]
+            for regra in REGRAS_WECO:
+                if flags[regra][c, k]:
+                    texto = _MENSAGENS_WECO[regra].format(valor=x_barra[c, k])
+                    alertas[nomes[c]].append(f"ALERTA (Amostra {amostra}): {texto}")
+
+        total_alertas = sum(len(lista) for lista in alertas.values())
+        print(f"Lote processado: {C} característica(s), {total_alertas} alerta(s) WECO.")
+
+        return {
+            "limites": dict(zip(nomes, resultados_limites)),
+            "zonas_weco": {
+                nome: {chave: float(valores[i]) for chave, valores in zonas.items()}
+                for i, nome in enumerate(nomes)
+            },
+            "alertas": alertas,
+            "X_barra": x_barra,
+            "R": amplitude,
+            "n": tamanhos,
+            "flags_weco": flags,
+        }
+
+    except Exception as e:
+        print(f"ERRO ao processar lote X-R: {e}")
+        return None
+
+
+def _calibrar_lote(
+    x_barra: np.ndarray,
+    amplitude: np.ndarray,
+    tamanhos: np.ndarray,
+    calibracao: np.ndarray,
+    constantes_db: dict,
+) -> list[dict] | None:
+    C = x_barra.shape[0]
+    num_calibracao = calibracao.sum(axis=1)
+    if np.any(num_calibracao == 0):
+        print("ERRO: Há características sem subgrupos de calibração válidos.")
+        return None
+
+    tamanhos_calib = np.where(calibracao, tamanhos, 0)
+    largura = int(tamanhos_calib.max()) + 1
+    frequencias = np.bincount(
+        (np.arange(C)[:, None] * largura + tamanhos_calib).ravel(),
+        minlength=C * largura,
+    ).reshape(C, largura)
+    frequencias[:, 0] = 0
+    tamanhos_ref = frequencias.argmax(axis=1)
+    constantes = _constantes_em_lote(tamanhos_ref, constantes_db)
+
+    X_barra_barra = np.where(calibracao, x_barra, 0.0).sum(axis=1) / num_calibracao
+    R_barra = np.where(calibracao, amplitude, 0.0).sum(axis=1) / num_calibracao
+
+    LSC_X = X_barra_barra + constantes["A2"] * R_barra
+    LIC_X = X_barra_barra - constantes["A2"] * R_barra
+    LSC_R = constantes["D4"] * R_barra
+    LIC_R = constantes["D3"] * R_barra
+
+    return [
+        {
+            "tipo_grafico": "X-R",
+            "n_amostra": int(tamanhos_ref[i]),
+            "X_barra_barra": float(X_barra_barra[i]),
+            "R_barra": float(R_barra[i]),
+            "constantes_usadas": {
+                "A2": float(constantes["A2"][i]),
+                "D3": float(constantes["D3"][i]),
+                "D4": float(constantes["D4"][i]),
+            },
+            "limites_X_barra": {
+                "LSC": float(LSC_X[i]),
+                "LM": float(X_barra_barra[i]),
+                "LIC": float(LIC_X[i]),
+            },
+            "limites_R": {
+                "LSC": float(LSC_R[i]),
+                "LM": float(R_barra[i]),
+                "LIC": float(LIC_R[i]),
+            },
+        }
+        for i in range(C)
+    ]
@@ -0,0 +1,380 @@
+import os
+import sys
+import glob
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from software import graficos_variaveis
+from software.leitura_dados import PREFIXO_LIMITES
+
+INTERVALO_KEEPALIVE_S = 15.0
+TAMANHO_HISTORICO_PADRAO = 2000
+JANELA_WECO = 8
+
+
+class EstadoPainel:
+    def __init__(self, pasta_limites: str, tamanho_historico: int = TAMANHO_HISTORICO_PADRAO):
+        self.pasta_limites = pasta_limites
+        self.eventos = deque(maxlen=tamanho_historico)
+        self.condicao = threading.Condition()
+        self.proximo_id = 1
+        self._limites = {}
+        self._mtimes = {}
+        self._janelas = {}
+
+    def obter_limites(self) -> dict:
+        padrao = os.path.join(self.pasta_limites, f"{PREFIXO_LIMITES}*.json")
+        alterados = []
+        with self.condicao:
+            for caminho in glob.glob(padrao):
+                nome = os.path.basename(caminho)[len(PREFIXO_LIMITES) : -len(".json")]
+                try:
+                    mtime = os.path.getmtime(caminho)
+                    if self._mtimes.get(nome) == mtime:
+                        continue
+                    with open(caminho, "r") as f:
+                        self._limites[nome] = json.load(f)
+                    self._mtimes[nome] = mtime
+                    alterados.append(nome)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"AVISO: Limites de '{nome}' não puderam ser lidos: {e}")
+
+            for nome in alterados:
+                self._registrar_evento(nome, "limites", self._limites[nome])
+            return dict(self._limites)
+
+    def _registrar_evento(self, processo: str, tipo: str, dados) -> int:
+        # A condição usa RLock: chamadores que já detêm o lock podem reentrar.
+        with self.condicao:
+            id_evento = self.proximo_id
+            self.proximo_id += 1
+            self.eventos.append((id_evento, processo, tipo, dados))
+            self.condicao.notify_all()
+            return id_evento
+
+    def ultimo_id_evento(self) -> int:
+        with self.condicao:
+            return self.proximo_id - 1
+
+    def obter_limites_e_ultimo_id(self) -> tuple[dict, int]:
+        # Lidos sob o mesmo lock: nenhum evento cai entre o retrato dos limites e o fluxo.
+        with self.condicao:
+            return self.obter_limites(), self.proximo_id - 1
+
+    def publicar_ponto(
+        self,
+        processo: str,
+        amostra,
+        dados: list | None = None,
+        x_barra: float | None = None,
+        r: float | None = None,
+        n: int | None = None,
+    ) -> list[str]:
+        if dados is not None:
+            leituras = np.asarray(dados, dtype=np.float64)
+            leituras = leituras[~np.isnan(leituras)]
+            x_barra = float(leituras.mean())
+            r = float(leituras.max() - leituras.min())
+            n = len(leituras)
+
+        limites = self.obter_limites().get(processo)
+        ponto = {"Amostra": amostra, "X_barra": x_barra, "R": r, "n": n}
+        limites_ponto = None
+        if limites and "limites_X_barra" in limites:
+            # Limites do n deste subgrupo, também enviados para o desenho do painel.
+            limites_ponto = graficos_variaveis.limites_xr_por_subgrupo(
+                [np.nan if n is None else n], limites
+            )
+            ponto["LSC"] = float(limites_ponto["LSC"][0])
+            ponto["LIC"] = float(limites_ponto["LIC"][0])
+
+        with self.condicao:
+            janela = self._janelas.setdefault(processo, deque(maxlen=JANELA_WECO))
+            janela.append({"Amostra": amostra, "X_barra": x_barra, "R": r, "n": n})
+            df_janela = pd.DataFrame(list(janela))
+            self._registrar_evento(processo, "ponto", ponto)
+
+        alertas = []
+        if limites_ponto is not None:
+            alertas = graficos_variaveis.analisar_regras_weco(
+                df_janela, limites, len(df_janela) - 1
+            )
+            if r > limites_ponto["LSC_R"][0] or r < limites_ponto["LIC_R"][0]:
+                alertas.append(
+                    f"ALERTA (Amostra {amostra}): Gráfico R - Amplitude fora do limite ({r:.5f})"
+                )
+
+        if alertas:
+            with self.condicao:
+                for alerta in alertas:
+                    self._registrar_evento(processo, "alerta", alerta)
+
+        return alertas
+
+    def aguardar_eventos(
+        self, ultimo_id: int, processo: str | None, timeout: float
+    ) -> list[tuple]:
+        def _pendentes():
+            return [
+                e
+                for e in self.eventos
+                if e[0] > ultimo_id and (processo is None or e[1] == processo)
+            ]
+
+        with self.condicao:
+            pendentes = _pendentes()
+            if not pendentes:
+                self.condicao.wait(timeout)
+                pendentes = _pendentes()
+            return pendentes
+
+
+_PAGINA_HTML = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="UTF-8">
+<title>Painel CEP ao Vivo</title>
+<style>
+body{background:#0f172a;color:#e2e8f0;font-family:'Segoe UI',Arial,sans-serif;margin:20px;}
+.card{background:#1e293b;padding:16px;border-radius:12px;border:1px solid #334155;margin-bottom:16px;}
+select{background:#020617;color:white;border:1px solid #475569;padding:6px;}
+li{color:#fca5a5;font-family:monospace;}
+canvas{width:100%;height:360px;}
+</style>
+</head>
+<body>
+<div class="card">
+  <h1>Painel CEP ao Vivo</h1>
+  Processo: <select id="processo"></select>
+</div>
+<div class="card"><canvas id="grafico"></canvas></div>
+<div class="card"><h2>Alertas</h2><ul id="alertas"></ul></div>
+<script>
+// Desenho em canvas puro: o painel funciona sem acesso à internet.
+const MAX_PONTOS = 200;
+const CORES = {X_barra: '#38bdf8', LSC: '#ef4444', LM: '#22c55e', LIC: '#ef4444'};
+let fonte = null;
+let pontos = [];
+let limites = null;
+
+function desenhar() {
+  const canvas = document.getElementById('grafico');
+  const escala = window.devicePixelRatio || 1;
+  canvas.width = canvas.clientWidth * escala;
+  canvas.height = canvas.clientHeight * escala;
+  const ctx = canvas.getContext('2d');
+  ctx.scale(escala, escala);
+  const largura = canvas.clientWidth, altura = canvas.clientHeight, margem = 50;
+  ctx.clearRect(0, 0, largura, altura);
+
+  const lx = limites ? limites.limites_X_barra : null;
+  const valores = pontos.map(p => p.X_barra).concat(lx ? [lx.LSC, lx.LM, lx.LIC] : []);
+  if (!valores.length) return;
+  let minimo = Math.min(...valores), maximo = Math.max(...valores);
+  if (minimo === maximo) { minimo -= 1; maximo += 1; }
+  const folga = (maximo - minimo) * 0.1;
+  minimo -= folga; maximo += folga;
+  const y = v => altura - margem / 2 - (v - minimo) / (maximo - minimo) * (altura - margem);
+  const x = i => margem + i * (largura - 2 * margem) / Math.max(MAX_PONTOS - 1, 1);
+
+  ctx.font = '12px monospace';
+  if (lx) {
+    ['LSC', 'LM', 'LIC'].forEach(chave => {
+      ctx.strokeStyle = CORES[chave];
+      ctx.fillStyle = CORES[chave];
+      ctx.setLineDash(chave === 'LM' ? [] : [6, 4]);
+      ctx.beginPath();
+      ctx.moveTo(margem, y(lx[chave]));
+      ctx.lineTo(largura - margem, y(lx[chave]));
+      ctx.stroke();
+      ctx.fillText(chave, 4, y(lx[chave]) + 4);
+    });
+  }
+  ctx.setLineDash([]);
+  ctx.strokeStyle = CORES.X_barra;
+  ctx.beginPath();
+  pontos.forEach((p, i) => i ? ctx.lineTo(x(i), y(p.X_barra)) : ctx.moveTo(x(i), y(p.X_barra)));
+  ctx.stroke();
+  pontos.forEach((p, i) => {
+    const lsc = p.LSC !== undefined ? p.LSC : (lx ? lx.LSC : null);
+    const lic = p.LIC !== undefined ? p.LIC : (lx ? lx.LIC : null);
+    const fora = lsc !== null && (p.X_barra > lsc || p.X_barra < lic);
+    ctx.fillStyle = fora ? CORES.LSC : CORES.X_barra;
+    ctx.beginPath();
+    ctx.arc(x(i), y(p.X_barra), 3, 0, 2 * Math.PI);
+    ctx.fill();
+  });
+}
+
+window.addEventListener('resize', desenhar);
+
+function conectar(processo) {
+  if (fonte) fonte.close();
+  pontos = [];
+  limites = null;
+  document.getElementById('alertas').innerHTML = '';
+  desenhar();
+  fonte = new EventSource('/eventos?processo=' + encodeURIComponent(processo));
+  fonte.addEventListener('limites', e => { limites = JSON.parse(e.data); desenhar(); });
+  fonte.addEventListener('ponto', e => {
+    pontos.push(JSON.parse(e.data));
+    if (pontos.length > MAX_PONTOS) pontos.shift();
+    desenhar();
+  });
+  fonte.addEventListener('alerta', e => {
+    const li = document.createElement('li');
+    li.textContent = JSON.parse(e.data);
+    const lista = document.getElementById('alertas');
+    lista.insertBefore(li, lista.firstChild);
+  });
+}
+
+fetch('/limites').then(r => r.json()).then(todos => {
+  const sel = document.getElementById('processo');
+  Object.keys(todos).sort().forEach(nome => {
+    const opt = document.createElement('option');
+    opt.value = nome; opt.textContent = nome; sel.appendChild(opt);
+  });
+  sel.onchange = () => conectar(sel.value);
+  if (sel.value) conectar(sel.value);
+});
+</script>
+</body>
+</html>
+"""
+
+
+def _criar_handler(estado: EstadoPainel):
+    class HandlerPainel(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, formato, *args):
+            pass
+
+        def _responder_json(self, dados, status: int = 200):
+            corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            partes = [p for p in url.path.split("/") if p]
+
+            if not partes:
+                corpo = _PAGINA_HTML.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+            elif partes[0] == "limites":
+                limites = estado.obter_limites()
+                if len(partes) == 1:
+                    self._responder_json(limites)
+                elif partes[1] in limites:
+                    self._responder_json(limites[partes[1]])
+                else:
+                    self._responder_json({"erro": "processo não encontrado"}, 404)
+            elif partes[0] == "eventos":
+                self._transmitir_eventos(parse_qs(url.query))
+            else:
+                self._responder_json({"erro": "rota não encontrada"}, 404)
+
+        def do_POST(self):
+            partes = [p for p in urlparse(self.path).path.split("/") if p]
+            if len(partes) != 2 or partes[0] != "pontos":
+                self._responder_json({"erro": "rota não encontrada"}, 404)
+                return
+            try:
+                tamanho = int(self.headers.get("Content-Length", 0))
+                ponto = json.loads(self.rfile.read(tamanho) or b"{}")
+                alertas = estado.publicar_ponto(
+                    partes[1],
+                    ponto.get("Amostra"),
+                    dados=ponto.get("Dados"),
+                    x_barra=ponto.get("X_barra"),
+                    r=ponto.get("R"),
+                    n=ponto.get("n"),
+                )
+                self._responder_json({"alertas": alertas})
+            except Exception as e:
+                self._responder_json({"erro": str(e)}, 400)
+
+        def _transmitir_eventos(self, parametros: dict):
+            processo = parametros.get("processo", [None])[0]
+            ultimo_id = int(
+                self.headers.get("Last-Event-ID")
+                or parametros.get("ultimo_id", ["0"])[0]
+            )
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "keep-alive")
+            self.end_headers()
+
+            try:
+                limites, id_retrato = estado.obter_limites_e_ultimo_id()
+                if ultimo_id == 0 and processo in limites:
+                    self._enviar_evento(0, "limites", limites[processo])
+                    ultimo_id = id_retrato
+
+                while True:
+                    eventos = estado.aguardar_eventos(
+                        ultimo_id, processo, INTERVALO_KEEPALIVE_S
+                    )
+                    if not eventos:
+                        estado.obter_limites()
+                        self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                        continue
+                    for id_evento, _, tipo, dados in eventos:
+                        self._enviar_evento(id_evento, tipo, dados)
+                        ultimo_id = id_evento
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _enviar_evento(self, id_evento: int, tipo: str, dados):
+            mensagem = (
+                f"id: {id_evento}\nevent: {tipo}\n"
+                f"data: {json.dumps(dados, ensure_ascii=False)}\n\n"
+            )
+            self.wfile.write(mensagem.encode("utf-8"))
+            self.wfile.flush()
+
+    return HandlerPainel
+
+
+def criar_servidor(
+    pasta_limites: str, host: str = "127.0.0.1", porta: int = 8050
+) -> tuple[ThreadingHTTPServer, EstadoPainel]:
+    estado = EstadoPainel(pasta_limites)
+    estado.obter_limites()
+    servidor = ThreadingHTTPServer((host, porta), _criar_handler(estado))
+    servidor.daemon_threads = True
+    return servidor, estado
+
+
+def iniciar_painel(pasta_limites: str, host: str = "127.0.0.1", porta: int = 8050):
+    servidor, _ = criar_servidor(pasta_limites, host, porta)
+    print(f"Painel CEP ao vivo em http://{host}:{porta}/ (Ctrl+C para encerrar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nPainel encerrado.")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    pasta = sys.argv[1] if len(sys.argv) > 1 else os.path.join("resultados", "limites_calculados")
+    iniciar_painel(pasta)
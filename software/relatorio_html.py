@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import glob
+import html
+import base64
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+NOME_INDICE = "index.html"
+
+_ESTILO = """
+body{font-family:'Segoe UI',Arial,sans-serif;margin:0;background:#f8fafc;color:#0f172a;}
+header{background:#0f172a;color:#e2e8f0;padding:16px 24px;}
+main{padding:16px 24px;max-width:1200px;margin:auto;}
+nav table,section table{border-collapse:collapse;width:100%;margin:8px 0 16px 0;font-size:0.9rem;}
+th,td{border:1px solid #cbd5e1;padding:4px 8px;text-align:left;}
+th{background:#e2e8f0;}
+td.num{text-align:right;font-family:monospace;}
+section{background:white;border:1px solid #cbd5e1;border-radius:8px;padding:12px 20px;margin-bottom:24px;}
+img{max-width:100%;}
+.ok{color:#047857;font-weight:bold;}
+.alerta{color:#b91c1c;font-weight:bold;}
+"""
+
+
+def _id_ancora(nome_processo: str) -> str:
+    return "proc-" + re.sub(r"[^A-Za-z0-9_-]", "_", nome_processo)
+
+
+def _formatar_valor(valor) -> str:
+    if isinstance(valor, float):
+        return f"{valor:.6g}"
+    if isinstance(valor, list):
+        return f"[lista com {len(valor)} valores]"
+    return html.escape(str(valor))
+
+
+def _achatar_dict(dados: dict, prefixo: str = "") -> list[tuple[str, object]]:
+    linhas = []
+    for chave, valor in dados.items():
+        caminho = f"{prefixo}{chave}"
+        if isinstance(valor, dict):
+            linhas.extend(_achatar_dict(valor, f"{caminho}."))
+        else:
+            linhas.append((caminho, valor))
+    return linhas
+
+
+def _tabela_html(linhas: list[tuple[str, object]]) -> str:
+    if not linhas:
+        return "<p>Sem dados.</p>"
+    corpo = "".join(
+        f"<tr><td>{html.escape(chave)}</td><td class='num'>{_formatar_valor(valor)}</td></tr>"
+        for chave, valor in linhas
+    )
+    return f"<table><tr><th>Item</th><th>Valor</th></tr>{corpo}</table>"
+
+
+def _imagem_inline(caminho_grafico: str) -> str:
+    extensao = os.path.splitext(caminho_grafico)[1].lower()
+    if extensao == ".svg":
+        with open(caminho_grafico, "r", encoding="utf-8") as f:
+            return f.read()
+    with open(caminho_grafico, "rb") as f:
+        conteudo = base64.b64encode(f.read()).decode("ascii")
+    nome = html.escape(os.path.basename(caminho_grafico))
+    return f"<img alt='{nome}' src='data:image/png;base64,{conteudo}'>"
+
+
+def renderizar_secao_processo(processo: dict) -> dict:
+    nome = processo["nome"]
+    limites = dict(processo.get("limites") or {})
+    capacidade = limites.pop("analise_capacidade", None) or processo.get("capacidade")
+    alertas = processo.get("alertas") or []
+
+    partes = [f"<section id='{_id_ancora(nome)}'><h2>{html.escape(nome)}</h2>"]
+
+    tipo = limites.get("tipo_grafico", "-")
+    partes.append(f"<p>Tipo de gráfico: <b>{html.escape(str(tipo))}</b></p>")
+
+    partes.append("<h3>Limites de Controle</h3>")
+    partes.append(_tabela_html(_achatar_dict(limites)))
+
+    if capacidade:
+        partes.append("<h3>Capacidade do Processo</h3>")
+        partes.append(_tabela_html(_achatar_dict(capacidade)))
+
+    partes.append("<h3>Alertas</h3>")
+    if alertas:
+        linhas = "".join(f"<tr><td>{html.escape(a)}</td></tr>" for a in alertas)
+        partes.append(f"<table><tr><th>Mensagem</th></tr>{linhas}</table>")
+    else:
+        partes.append("<p class='ok'>Nenhum alerta registrado.</p>")
+
+    for caminho_grafico in processo.get("graficos", []):
+        try:
+            partes.append(f"<h3>{html.escape(os.path.basename(caminho_grafico))}</h3>")
+            partes.append(_imagem_inline(caminho_grafico))
+        except OSError as e:
+            partes.append(
+                f"<p class='alerta'>Gráfico indisponível: {html.escape(str(e))}</p>"
+            )
+
+    partes.append("</section>")
+
+    return {
+        "nome": nome,
+        "tipo": tipo,
+        "cpk": capacidade.get("Cpk") if capacidade else None,
+        "num_alertas": len(alertas),
+        "html": "".join(partes),
+    }
+
+
+def carregar_processo(
+    nome: str, caminho_limites: str, caminho_alertas: str, graficos: list[str]
+) -> dict | None:
+    try:
+        with open(caminho_limites, "r") as f:
+            limites = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"AVISO: Limites de '{nome}' ignorados no relatório: {e}")
+        return None
+
+    alertas = []
+    if os.path.exists(caminho_alertas):
+        try:
+            with open(caminho_alertas, "r") as f:
+                alertas = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"AVISO: Alertas de '{nome}' ignorados no relatório: {e}")
+
+    return {
+        "nome": nome,
+        "limites": limites,
+        "alertas": alertas,
+        "graficos": [g for g in graficos if os.path.exists(g)],
+    }
+
+
+def _atualizar_indice(pasta_saida: str) -> str:
+    relatorios = sorted(
+        glob.glob(os.path.join(pasta_saida, "relatorio_*.html")), reverse=True
+    )
+    linhas = "".join(
+        f"<tr><td><a href='{html.escape(os.path.basename(r))}'>{html.escape(os.path.basename(r))}</a></td></tr>"
+        for r in relatorios
+    )
+    conteudo = (
+        "<!DOCTYPE html><html lang='pt-BR'><head><meta charset='UTF-8'>"
+        f"<title>Relatórios CEP</title><style>{_ESTILO}</style></head><body>"
+        "<header><h1>Relatórios CEP</h1></header><main><nav>"
+        f"<table><tr><th>Execução</th></tr>{linhas}</table></nav></main></body></html>"
+    )
+    caminho_indice = os.path.join(pasta_saida, NOME_INDICE)
+    with open(caminho_indice, "w", encoding="utf-8") as f:
+        f.write(conteudo)
+    return caminho_indice
+
+
+def gerar_relatorio(
+    processos: list[dict], pasta_saida: str, max_workers: int | None = None
+) -> str | None:
+    print(f"Gerando relatório HTML de {len(processos)} processo(s)...")
+    try:
+        os.makedirs(pasta_saida, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            secoes = list(executor.map(renderizar_secao_processo, processos))
+
+        linhas_indice = []
+        for secao in secoes:
+            cpk = "-" if secao["cpk"] is None else f"{secao['cpk']:.3f}"
+            classe = "alerta" if secao["num_alertas"] else "ok"
+            linhas_indice.append(
+                f"<tr><td><a href='#{_id_ancora(secao['nome'])}'>{html.escape(secao['nome'])}</a></td>"
+                f"<td>{html.escape(str(secao['tipo']))}</td><td class='num'>{cpk}</td>"
+                f"<td class='num {classe}'>{secao['num_alertas']}</td></tr>"
+            )
+
+        momento = datetime.now()
+        conteudo = (
+            "<!DOCTYPE html><html lang='pt-BR'><head><meta charset='UTF-8'>"
+            f"<title>Relatório CEP {momento:%Y-%m-%d %H:%M:%S}</title>"
+            f"<style>{_ESTILO}</style></head><body>"
+            f"<header><h1>Relatório CEP</h1><p>Gerado em {momento:%Y-%m-%d %H:%M:%S}</p></header>"
+            "<main><nav><h2>Índice</h2><table>"
+            "<tr><th>Processo</th><th>Tipo</th><th>Cpk</th><th>Alertas</th></tr>"
+            f"{''.join(linhas_indice)}</table></nav>"
+            f"{''.join(secao['html'] for secao in secoes)}</main></body></html>"
+        )
+
+        caminho_relatorio = os.path.join(
+            pasta_saida, f"relatorio_{momento:%Y%m%d_%H%M%S_%f}.html"
+        )
+        with open(caminho_relatorio, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+
+        _atualizar_indice(pasta_saida)
+        print(f"Relatório HTML salvo em: {caminho_relatorio}")
+        return caminho_relatorio
+
+    except Exception as e:
+        print(f"ERRO ao gerar relatório HTML: {e}")
+        return None
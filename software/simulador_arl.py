@@ -0,0 +1,268 @@
+import os
+import sys
+import math
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from software import constantes_cep
+from software.motor_lote import REGRAS_WECO, contar_janela_movel
+
+REGRA_R = "regra_r"
+REGRAS_DISPONIVEIS = REGRAS_WECO + (REGRA_R,)
+NUM_FLUXOS_PADRAO = 100_000
+TAMANHO_LOTE_PADRAO = 50_000
+PASSO_SUBGRUPOS = 32
+MAX_SUBGRUPOS_PADRAO = 5_000
+PERCENTIS_RL = (5, 10, 50, 90, 95)
+CONTEXTO_REGRAS = 7
+
+
+def calcular_limites_padronizados(n: int, constantes_db: dict | None = None) -> dict:
+    constantes = constantes_cep.obter_constantes(n, constantes_db)
+    # Processo padronizado (mu=0, sigma=1): R_barra = d2 * sigma.
+    R_barra = constantes["d2"]
+    return {
+        "n": n,
+        "LSC_R": constantes["D4"] * R_barra,
+        "LIC_R": constantes["D3"] * R_barra,
+    }
+
+
+def _sinais_bloco(
+    z_historico: np.ndarray,
+    z_novos: np.ndarray,
+    amplitudes: np.ndarray | None,
+    limites: dict,
+    regras: tuple,
+) -> np.ndarray:
+    # z = sqrt(n) * X_barra: LSC/LIC em +-3, zonas de 1 e 2 sigma em +-1 e +-2.
+    serie = np.concatenate([z_historico, z_novos], axis=1)
+    inicio = z_historico.shape[1]
+    sinal = np.zeros(z_novos.shape, dtype=bool)
+
+    if "regra_1" in regras:
+        sinal |= np.abs(z_novos) > 3.0
+    if "regra_4" in regras:
+        sinal |= (contar_janela_movel(serie > 0, 8)[:, inicio:] == 8) | (
+            contar_janela_movel(serie < 0, 8)[:, inicio:] == 8
+        )
+    if "regra_3" in regras:
+        sinal |= (contar_janela_movel(serie > 1.0, 5)[:, inicio:] >= 4) | (
+            contar_janela_movel(serie < -1.0, 5)[:, inicio:] >= 4
+        )
+    if "regra_2" in regras:
+        sinal |= (contar_janela_movel(serie > 2.0, 3)[:, inicio:] >= 2) | (
+            contar_janela_movel(serie < -2.0, 3)[:, inicio:] >= 2
+        )
+    if REGRA_R in regras and amplitudes is not None:
+        sinal |= (amplitudes > limites["LSC_R"]) | (amplitudes < limites["LIC_R"])
+    return sinal
+
+
+def _simular_lote(parametros: tuple) -> np.ndarray:
+    semente, num_fluxos, limites, deslocamento, razao_sigma, regras, max_subgrupos = parametros
+    rng = np.random.default_rng(semente)
+    n = limites["n"]
+    raiz_n = math.sqrt(n)
+
+    comprimentos = np.zeros(num_fluxos, dtype=np.int64)
+    ativos = np.arange(num_fluxos)
+    historico = np.empty((num_fluxos, 0))
+    t = 0
+
+    while len(ativos) and t < max_subgrupos:
+        passo = min(PASSO_SUBGRUPOS, max_subgrupos - t)
+        if REGRA_R in regras:
+            leituras = rng.normal(deslocamento, razao_sigma, size=(len(ativos), passo, n))
+            z = leituras.mean(axis=2) * raiz_n
+            amplitudes = np.ptp(leituras, axis=2)
+        else:
+            z = rng.normal(deslocamento * raiz_n, razao_sigma, size=(len(ativos), passo))
+            amplitudes = None
+
+        sinal = _sinais_bloco(historico, z, amplitudes, limites, regras)
+        detectou = sinal.any(axis=1)
+        comprimentos[ativos[detectou]] = t + sinal[detectou].argmax(axis=1) + 1
+
+        historico = np.concatenate([historico, z], axis=1)[~detectou, -CONTEXTO_REGRAS:]
+        ativos = ativos[~detectou]
+        t += passo
+
+    # Fluxos sem sinal até max_subgrupos ficam com 0 (censurados).
+    return comprimentos
+
+
+def simular_comprimentos_corrida(
+    n: int,
+    deslocamento: float = 0.0,
+    regras: tuple = REGRAS_WECO,
+    razao_sigma: float = 1.0,
+    num_fluxos: int = NUM_FLUXOS_PADRAO,
+    semente: int | None = None,
+    max_workers: int | None = None,
+    max_subgrupos: int = MAX_SUBGRUPOS_PADRAO,
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    constantes_db: dict | None = None,
+    executor=None,
+) -> np.ndarray:
+    desconhecidas = set(regras) - set(REGRAS_DISPONIVEIS)
+    if desconhecidas:
+        raise ValueError(f"Regras desconhecidas: {sorted(desconhecidas)}")
+    if not regras:
+        raise ValueError("Informe ao menos uma regra.")
+
+    limites = calcular_limites_padronizados(n, constantes_db)
+    tamanhos_lotes = [tamanho_lote] * (num_fluxos // tamanho_lote)
+    if num_fluxos % tamanho_lote:
+        tamanhos_lotes.append(num_fluxos % tamanho_lote)
+
+    # Sementes derivadas apenas do lote: o resultado não depende do número de workers.
+    if not isinstance(semente, np.random.SeedSequence):
+        semente = np.random.SeedSequence(semente)
+    sementes = semente.spawn(len(tamanhos_lotes))
+    tarefas = [
+        (s, tamanho, limites, deslocamento, razao_sigma, tuple(regras), max_subgrupos)
+        for s, tamanho in zip(sementes, tamanhos_lotes)
+    ]
+
+    if executor is not None:
+        return np.concatenate(list(executor.map(_simular_lote, tarefas)))
+    if max_workers == 1 or len(tarefas) == 1:
+        return np.concatenate([_simular_lote(t) for t in tarefas])
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return np.concatenate(list(pool.map(_simular_lote, tarefas)))
+
+
+def resumir_comprimentos(comprimentos: np.ndarray, max_subgrupos: int) -> dict:
+    censurados = comprimentos == 0
+    rl = np.where(censurados, max_subgrupos, comprimentos).astype(np.float64)
+    resumo = {
+        "ARL": float(rl.mean()),
+        "SDRL": float(rl.std(ddof=1)) if len(rl) > 1 else 0.0,
+        "erro_padrao_ARL": float(rl.std(ddof=1) / math.sqrt(len(rl))) if len(rl) > 1 else 0.0,
+        "fracao_censurada": float(censurados.mean()),
+    }
+    for p, valor in zip(PERCENTIS_RL, np.percentile(rl, PERCENTIS_RL)):
+        resumo[f"RL_p{p}"] = float(valor)
+    return resumo
+
+
+def calcular_tabela_arl(
+    tamanhos: list[int],
+    deslocamentos: list[float],
+    regras: tuple = REGRAS_WECO,
+    razao_sigma: float = 1.0,
+    num_fluxos: int = NUM_FLUXOS_PADRAO,
+    semente: int | None = None,
+    max_workers: int | None = None,
+    max_subgrupos: int = MAX_SUBGRUPOS_PADRAO,
+    constantes_db: dict | None = None,
+) -> pd.DataFrame:
+    print(
+        f"Simulando ARL: n={list(tamanhos)}, regras={list(regras)}, "
+        f"{num_fluxos} fluxos por cenário..."
+    )
+    cenarios = [(n, d) for n in tamanhos for d in deslocamentos]
+    sementes = np.random.SeedSequence(semente).spawn(len(cenarios))
+
+    linhas = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for (n, deslocamento), semente_cenario in zip(cenarios, sementes):
+            comprimentos = simular_comprimentos_corrida(
+                n,
+                deslocamento,
+                regras,
+                razao_sigma=razao_sigma,
+                num_fluxos=num_fluxos,
+                semente=semente_cenario,
+                max_subgrupos=max_subgrupos,
+                constantes_db=constantes_db,
+                executor=pool,
+            )
+            linha = {"n": n, "deslocamento_sigma": deslocamento, "razao_sigma": razao_sigma}
+            linha.update(resumir_comprimentos(comprimentos, max_subgrupos))
+            linhas.append(linha)
+            print(f"  n={n}, deslocamento={deslocamento:.2f}σ: ARL={linha['ARL']:.2f}")
+
+    return pd.DataFrame(linhas)
+
+
+def plotar_curvas_arl(df_arl: pd.DataFrame, caminho_saida_grafico: str) -> bool:
+    print(f"Gerando curvas ARL em: {caminho_saida_grafico}")
+    try:
+        fig, ax = plt.subplots(figsize=(12, 7))
+        for n, grupo in df_arl.groupby("n"):
+            ax.plot(grupo["deslocamento_sigma"], grupo["ARL"], marker="o", label=f"n={n}")
+
+        ax.set_yscale("log")
+        ax.set_title("Curvas ARL vs. Deslocamento da Média")
+        ax.set_xlabel("Deslocamento (em desvios-padrão do processo)")
+        ax.set_ylabel("ARL (escala log)")
+        ax.legend()
+        ax.grid(True, which="both", linestyle=":")
+
+        plt.tight_layout()
+        plt.savefig(caminho_saida_grafico)
+        plt.close(fig)
+        return True
+    except Exception as e:
+        print(f"ERRO ao gerar curvas ARL: {e}")
+        return False
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Simulação Monte Carlo de ARL para regras WECO e tamanhos de subgrupo."
+    )
+    parser.add_argument("--n", type=int, nargs="+", default=[5], help="Tamanhos de subgrupo.")
+    parser.add_argument(
+        "--deslocamentos",
+        type=float,
+        nargs="+",
+        default=[0.0, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0],
+        help="Deslocamentos da média, em sigmas do processo.",
+    )
+    parser.add_argument(
+        "--regras",
+        nargs="+",
+        choices=REGRAS_DISPONIVEIS,
+        default=list(REGRAS_WECO),
+        help="Regras habilitadas (regra_r = limites do gráfico R).",
+    )
+    parser.add_argument("--razao-sigma", type=float, default=1.0, help="Inflação do desvio-padrão.")
+    parser.add_argument("--fluxos", type=int, default=NUM_FLUXOS_PADRAO, help="Fluxos por cenário.")
+    parser.add_argument("--semente", type=int, default=None, help="Semente do gerador.")
+    parser.add_argument("--workers", type=int, default=None, help="Número de processos.")
+    parser.add_argument(
+        "--max-subgrupos", type=int, default=MAX_SUBGRUPOS_PADRAO, help="Censura das corridas."
+    )
+    parser.add_argument(
+        "--saida", default=os.path.join("resultados", "simulacao_arl"), help="Pasta de saída."
+    )
+    args = parser.parse_args(argv)
+
+    df_arl = calcular_tabela_arl(
+        args.n,
+        args.deslocamentos,
+        tuple(args.regras),
+        razao_sigma=args.razao_sigma,
+        num_fluxos=args.fluxos,
+        semente=args.semente,
+        max_workers=args.workers,
+        max_subgrupos=args.max_subgrupos,
+    )
+
+    os.makedirs(args.saida, exist_ok=True)
+    caminho_tabela = os.path.join(args.saida, "tabela_arl.csv")
+    df_arl.to_csv(caminho_tabela, index=False)
+    print(f"Tabela ARL salva em: {caminho_tabela}")
+    plotar_curvas_arl(df_arl, os.path.join(args.saida, "curvas_arl.png"))
+    return df_arl
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,240 @@
+import os
+import json
+import math
+import numpy as np
+
+COMPRESSAO_PADRAO = 500
+FATOR_BUFFER = 100
+
+
+class TDigest:
+    def __init__(self, compressao: int = COMPRESSAO_PADRAO):
+        self.compressao = compressao
+        self.medias = np.empty(0)
+        self.pesos = np.empty(0)
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self._buffer = []
+        self._tamanho_buffer = 0
+
+    @property
+    def total(self) -> float:
+        return float(self.pesos.sum()) + self._tamanho_buffer
+
+    def adicionar(self, valores) -> "TDigest":
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return self
+
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self._buffer.append(valores)
+        self._tamanho_buffer += len(valores)
+
+        if self._tamanho_buffer > FATOR_BUFFER * self.compressao:
+            self._comprimir()
+        return self
+
+    def mesclar(self, outro: "TDigest") -> "TDigest":
+        outro._comprimir()
+        if len(outro.medias) == 0:
+            return self
+        self._comprimir()
+        self.medias = np.concatenate([self.medias, outro.medias])
+        self.pesos = np.concatenate([self.pesos, outro.pesos])
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self._comprimir(forcar=True)
+        return self
+
+    def _comprimir(self, forcar: bool = False) -> None:
+        if not self._buffer and not forcar:
+            return
+
+        if self._buffer:
+            novos = np.concatenate(self._buffer)
+            medias = np.concatenate([self.medias, novos])
+            pesos = np.concatenate([self.pesos, np.ones(len(novos))])
+            self._buffer = []
+            self._tamanho_buffer = 0
+        else:
+            medias, pesos = self.medias, self.pesos
+
+        if len(medias) == 0:
+            return
+
+        ordem = np.argsort(medias, kind="stable")
+        medias = medias[ordem]
+        pesos = pesos[ordem]
+
+        total = pesos.sum()
+        q_centro = (np.cumsum(pesos) - pesos / 2.0) / total
+        # Escala k1 (arco-seno): centróides pequenos nas caudas, grandes no centro.
+        k = self.compressao / (2.0 * math.pi) * np.arcsin(2.0 * q_centro - 1.0)
+        celula = np.floor(k).astype(np.int64)
+
+        inicios = np.concatenate(([0], np.flatnonzero(np.diff(celula)) + 1))
+        pesos_novos = np.add.reduceat(pesos, inicios)
+        self.medias = np.add.reduceat(medias * pesos, inicios) / pesos_novos
+        self.pesos = pesos_novos
+
+    def _pontos_interpolacao(self) -> tuple[np.ndarray, np.ndarray]:
+        self._comprimir()
+        total = self.pesos.sum()
+        posicoes = (np.cumsum(self.pesos) - self.pesos / 2.0) / total
+        q = np.concatenate(([0.0], posicoes, [1.0]))
+        x = np.concatenate(([self.minimo], self.medias, [self.maximo]))
+        return q, x
+
+    def quantil(self, q):
+        if self.total == 0:
+            return np.nan
+        qs, xs = self._pontos_interpolacao()
+        return np.interp(q, qs, xs)
+
+    def cdf(self, x):
+        if self.total == 0:
+            return np.nan
+        qs, xs = self._pontos_interpolacao()
+        return np.interp(x, xs, qs, left=0.0, right=1.0)
+
+    def para_dict(self) -> dict:
+        self._comprimir()
+        return {
+            "tipo": "t-digest",
+            "compressao": self.compressao,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "medias": self.medias.tolist(),
+            "pesos": self.pesos.tolist(),
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> "TDigest":
+        sketch = cls(dados.get("compressao", COMPRESSAO_PADRAO))
+        sketch.medias = np.asarray(dados.get("medias", []), dtype=np.float64)
+        sketch.pesos = np.asarray(dados.get("pesos", []), dtype=np.float64)
+        sketch.minimo = dados.get("minimo", math.inf)
+        sketch.maximo = dados.get("maximo", -math.inf)
+        return sketch
+
+
+def _carregar_dict(caminho_arquivo: str) -> dict | None:
+    if not os.path.exists(caminho_arquivo):
+        return None
+    try:
+        with open(caminho_arquivo, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"AVISO: Sketch em {caminho_arquivo} inválido ({e}); iniciando um novo.")
+        return None
+
+
+def carregar_sketch(caminho_arquivo: str, compressao: int = COMPRESSAO_PADRAO) -> TDigest:
+    dados = _carregar_dict(caminho_arquivo)
+    if dados is None:
+        return TDigest(compressao)
+    return TDigest.de_dict(dados)
+
+
+def carregar_fontes(caminho_arquivo: str) -> dict[str, TDigest]:
+    dados = _carregar_dict(caminho_arquivo)
+    if dados is None:
+        return {}
+    if "fontes" not in dados:
+        # Sketch salvo sem fontes: preservado como uma fonte única.
+        return {"": TDigest.de_dict(dados)}
+    return {fonte: TDigest.de_dict(d) for fonte, d in dados["fontes"].items()}
+
+
+def carregar_assinaturas(caminho_arquivo: str) -> dict[str, list]:
+    dados = _carregar_dict(caminho_arquivo)
+    if dados is None:
+        return {}
+    return dados.get("assinaturas", {})
+
+
+def assinatura_arquivos(caminhos: list[str]) -> list[list]:
+    # Tamanho e mtime de cada arquivo: uma fonte com a mesma assinatura já está no sketch.
+    assinatura = []
+    for caminho in caminhos:
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            continue
+        assinatura.append([caminho, estado.st_size, estado.st_mtime_ns])
+    return assinatura
+
+
+def salvar_sketch(
+    sketch: TDigest,
+    caminho_arquivo: str,
+    fontes: dict[str, TDigest] | None = None,
+    assinaturas: dict[str, list] | None = None,
+) -> bool:
+    try:
+        pasta = os.path.dirname(caminho_arquivo)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        dados = sketch.para_dict()
+        if fontes is not None:
+            dados["fontes"] = {fonte: d.para_dict() for fonte, d in fontes.items()}
+        if assinaturas:
+            dados["assinaturas"] = assinaturas
+        caminho_tmp = f"{caminho_arquivo}.{os.getpid()}.tmp"
+        with open(caminho_tmp, "w") as f:
+            json.dump(dados, f)
+        os.replace(caminho_tmp, caminho_arquivo)
+        return True
+    except OSError as e:
+        print(f"ERRO ao salvar sketch em {caminho_arquivo}: {e}")
+        return False
+
+
+def _combinar_fontes(fontes: dict[str, TDigest]) -> TDigest:
+    resultado = TDigest()
+    for sketch in fontes.values():
+        resultado.mesclar(sketch)
+    return resultado
+
+
+def substituir_fontes(
+    caminho_arquivo: str,
+    novas: dict[str, TDigest],
+    remover=(),
+    assinaturas: dict[str, list] | None = None,
+) -> TDigest:
+    # Cada fonte (arquivo de leituras) tem seu próprio sketch: reler um arquivo
+    # substitui a contribuição anterior dele em vez de somá-la de novo.
+    fontes = carregar_fontes(caminho_arquivo)
+    assinaturas_salvas = carregar_assinaturas(caminho_arquivo)
+    for fonte in remover:
+        fontes.pop(fonte, None)
+        assinaturas_salvas.pop(fonte, None)
+    fontes.update(novas)
+    assinaturas_salvas.update(assinaturas or {})
+    sketch = _combinar_fontes(fontes)
+    salvar_sketch(sketch, caminho_arquivo, fontes, assinaturas_salvas)
+    return sketch
+
+
+def adicionar_fontes(caminho_arquivo: str, valores_por_fonte: dict) -> TDigest:
+    # Um único ciclo de leitura/gravação do arquivo para todas as fontes.
+    fontes = carregar_fontes(caminho_arquivo)
+    for fonte, valores in valores_por_fonte.items():
+        fontes.setdefault(fonte, TDigest()).adicionar(valores)
+    sketch = _combinar_fontes(fontes)
+    salvar_sketch(sketch, caminho_arquivo, fontes, carregar_assinaturas(caminho_arquivo))
+    return sketch
+
+
+def atualizar_sketch_processo(caminho_arquivo: str, valores, fonte: str = "") -> TDigest:
+    return adicionar_fontes(caminho_arquivo, {fonte: valores})
+
+
+def mesclar_sketches(caminhos: list[str]) -> TDigest:
+    resultado = TDigest()
+    for caminho in caminhos:
+        resultado.mesclar(carregar_sketch(caminho))
+    return resultado
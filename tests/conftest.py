@@ -0,0 +1,20 @@
+import os
+import sys
+
+import matplotlib
+import numpy as np
+
+matplotlib.use("Agg")
+
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_REPOSITORIO not in sys.path:
+    sys.path.insert(0, RAIZ_REPOSITORIO)
+
+from software import leitura_dados
+
+
+def frame_subgrupos(dados, amostras=None):
+    valores, offsets = leitura_dados.montar_subgrupos_csr(dados)
+    estatisticas = leitura_dados.calcular_estatisticas_subgrupos(valores, offsets)
+    amostras = np.arange(1, len(dados) + 1) if amostras is None else np.asarray(amostras)
+    return leitura_dados.montar_frame_subgrupos(amostras, estatisticas)
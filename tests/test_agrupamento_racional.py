@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from software import agrupamento_racional
+
+
+def _leituras(tempos, valores):
+    return pd.DataFrame({"timestamp": tempos, "valor": valores})
+
+
+def test_contagem_fixa_ordena_por_tempo():
+    df = _leituras(
+        ["2024-01-01 00:03", "2024-01-01 00:00", "2024-01-01 00:02", "2024-01-01 00:01"],
+        [4.0, 1.0, 3.0, 2.0],
+    )
+    resultado = agrupamento_racional.formar_subgrupos(df, "contagem", tamanho=2)
+    assert resultado["X_barra"].tolist() == [1.5, 3.5]
+    assert resultado["R"].tolist() == [1.0, 1.0]
+
+
+def test_janela_de_tempo_agrupa_por_intervalo():
+    tempos = pd.date_range("2024-01-01", periods=12, freq="5min")
+    df = _leituras(tempos, np.arange(12, dtype=float))
+    resultado = agrupamento_racional.formar_subgrupos(df, "janela", janela="15min")
+    assert resultado["n"].tolist() == [3, 3, 3, 3]
+    assert resultado["X_barra"].tolist() == [1.0, 4.0, 7.0, 10.0]
+
+
+def test_turno_noturno_atravessa_a_meia_noite():
+    df = _leituras(
+        ["2024-01-01 21:00", "2024-01-01 21:30", "2024-01-01 23:00", "2024-01-02 05:00"],
+        [1.0, 2.0, 3.0, 4.0],
+    )
+    resultado = agrupamento_racional.formar_subgrupos(
+        df, "turno", inicios_turno=["06:00", "14:00", "22:00"]
+    )
+    assert resultado["n"].tolist() == [2, 2]
+
+
+def test_turno_usa_horario_local_com_fuso():
+    # 05:30 e 06:10 em -03:00 pertencem a turnos diferentes no horário da planta.
+    df = _leituras(
+        [
+            "2024-01-01T05:20:00-03:00",
+            "2024-01-01T05:30:00-03:00",
+            "2024-01-01T06:10:00-03:00",
+            "2024-01-01T06:20:00-03:00",
+        ],
+        [1.0, 2.0, 3.0, 4.0],
+    )
+    resultado = agrupamento_racional.formar_subgrupos(
+        df, "turno", inicios_turno=["06:00", "14:00", "22:00"]
+    )
+    assert resultado["n"].tolist() == [2, 2]
+    assert resultado["X_barra"].tolist() == [1.5, 3.5]
+
+
+def test_leituras_invalidas_sao_ignoradas():
+    df = _leituras(
+        ["2024-01-01 00:00", "2024-01-01 00:01", None, "2024-01-01 00:03"],
+        [1.0, "x", 3.0, 4.0],
+    )
+    resultado = agrupamento_racional.formar_subgrupos(df, "contagem", tamanho=2)
+    assert resultado["n"].tolist() == [2]
+    assert resultado["X_barra"].tolist() == [2.5]
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from software import analise_capacidade
+from software import constantes_cep
+from conftest import frame_subgrupos
+
+ESPECS = {"LSE": 13.0, "LIE": 7.0}
+
+
+def _frame(semente=5, num_subgrupos=40, n=5):
+    rng = np.random.default_rng(semente)
+    dados = [rng.normal(10.0 + 0.02 * i, 1.0, n).tolist() for i in range(num_subgrupos)]
+    return frame_subgrupos(dados), np.asarray(dados)
+
+
+def test_janela_movel_coincide_com_calculo_direto():
+    df, dados = _frame()
+    janela = 10
+    tendencia = analise_capacidade.calcular_tendencia_capacidade(
+        df, 5, ESPECS, {}, janela=janela
+    )
+    assert len(tendencia) == len(df) - janela + 1
+
+    d2 = constantes_cep.obter_constantes(5, {})["d2"]
+    for linha in (0, 12, len(tendencia) - 1):
+        bloco = dados[linha : linha + janela]
+        mu = bloco.mean()
+        sigma = (np.ptp(bloco, axis=1) / d2).mean()
+        atual = tendencia.iloc[linha]
+        assert atual["Amostra_inicio"] == linha + 1
+        assert atual["Amostra_fim"] == linha + janela
+        assert atual["media"] == pytest.approx(mu)
+        assert atual["sigma_estimado"] == pytest.approx(sigma)
+        assert atual["Cpk"] == pytest.approx(min(13.0 - mu, mu - 7.0) / (3 * sigma))
+        assert atual["sigma_total"] == pytest.approx(bloco.std(ddof=1))
+        assert atual["Ppk"] == pytest.approx(
+            min(13.0 - mu, mu - 7.0) / (3 * bloco.std(ddof=1))
+        )
+
+
+def test_janela_expansiva_acumula_desde_o_inicio():
+    df, dados = _frame()
+    tendencia = analise_capacidade.calcular_tendencia_capacidade(df, 5, ESPECS, {})
+
+    assert len(tendencia) == len(df) - 1
+    assert (tendencia["Amostra_inicio"] == 1).all()
+    assert tendencia["num_subgrupos"].tolist() == list(range(2, len(df) + 1))
+    assert tendencia["media"].iloc[-1] == pytest.approx(dados.mean())
+    assert tendencia["sigma_total"].iloc[-1] == pytest.approx(dados.std(ddof=1))
+
+
+def test_janela_maior_que_historico_retorna_none():
+    df, _ = _frame(num_subgrupos=5)
+    assert analise_capacidade.calcular_tendencia_capacidade(df, 5, ESPECS, {}, janela=10) is None
+
+
+def test_grafico_de_tendencia_e_salvo(tmp_path):
+    df, _ = _frame()
+    tendencia = analise_capacidade.calcular_tendencia_capacidade(df, 5, ESPECS, {}, janela=10)
+    caminho = tmp_path / "tendencia.png"
+    analise_capacidade.plotar_tendencia_capacidade(tendencia, str(caminho))
+    assert caminho.stat().st_size > 0
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from software import constantes_cep
+
+# Valores tabelados (ASTM / Montgomery).
+TABELA_REFERENCIA = {
+    2: {"d2": 1.128, "d3": 0.853, "c4": 0.7979, "A2": 1.880, "D4": 3.267},
+    5: {"d2": 2.326, "d3": 0.864, "c4": 0.9400, "A2": 0.577, "D4": 2.114},
+    10: {"d2": 3.078, "d3": 0.797, "c4": 0.9727, "A2": 0.308, "D3": 0.223},
+    25: {"d2": 3.931, "d3": 0.708, "c4": 0.9896, "A2": 0.153, "D3": 0.459},
+}
+
+
+@pytest.mark.parametrize("n", sorted(TABELA_REFERENCIA))
+def test_constantes_analiticas_conferem_com_tabela(n):
+    constantes = constantes_cep.gerar_constantes(n)
+    for nome, esperado in TABELA_REFERENCIA[n].items():
+        assert constantes[nome] == pytest.approx(esperado, abs=1.5e-3), nome
+
+
+def test_constantes_derivadas_sao_consistentes():
+    constantes = constantes_cep.gerar_constantes(7)
+    assert constantes["A2"] == pytest.approx(3 / (constantes["d2"] * np.sqrt(7)))
+    assert constantes["D4"] == pytest.approx(1 + 3 * constantes["d3"] / constantes["d2"])
+    assert constantes["D3"] >= 0.0 and constantes["B3"] >= 0.0
+
+
+def test_n_menor_que_dois_e_rejeitado():
+    with pytest.raises(ValueError):
+        constantes_cep.gerar_constantes(1)
+    assert constantes_cep.obter_constantes(1) is None
+
+
+def test_override_json_prevalece_sobre_calculo(tmp_path):
+    constantes_cep.configurar_cache_disco(None)
+    constantes = constantes_cep.obter_constantes(5, {"5": {"A2": 0.5, "d2": None}})
+    assert constantes["A2"] == 0.5
+    assert constantes["d2"] == pytest.approx(2.326, abs=1e-3)
+
+
+def test_cache_em_disco_e_gravado_e_reutilizado(tmp_path):
+    caminho = tmp_path / "constantes.json"
+    constantes_cep.configurar_cache_disco(str(caminho))
+    try:
+        calculadas = constantes_cep.obter_constantes(6)
+        tabela = json.loads(caminho.read_text())
+        assert tabela["6"]["d2"] == pytest.approx(calculadas["d2"])
+
+        tabela["6"]["d2"] = 99.0
+        caminho.write_text(json.dumps(tabela))
+        constantes_cep.configurar_cache_disco(str(caminho))
+        assert constantes_cep.obter_constantes(6)["d2"] == 99.0
+    finally:
+        constantes_cep.configurar_cache_disco(None)
+
+
+def test_integracao_funciona_sem_np_trapezoid(monkeypatch):
+    if not hasattr(np, "trapz"):
+        pytest.skip("numpy sem np.trapz")
+    monkeypatch.setattr(constantes_cep, "_integrar_trapezio", np.trapz)
+    d2, _ = constantes_cep._calcular_momentos_amplitude(5)
+    assert d2 == pytest.approx(2.326, abs=1e-3)
@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pytest
+
+from software import deteccao_mudanca
+from conftest import frame_subgrupos
+
+
+def _dados(semente, deslocamentos, n=5, tamanho=40):
+    rng = np.random.default_rng(semente)
+    dados = []
+    for media, desvio in deslocamentos:
+        dados += [rng.normal(media, desvio, n).tolist() for _ in range(tamanho)]
+    return dados
+
+
+def test_serie_estavel_nao_tem_mudancas():
+    df = frame_subgrupos(_dados(1, [(10.0, 1.0)] * 3))
+    assert deteccao_mudanca.detectar_mudancas_xr(df) == []
+
+
+def test_detecta_mudanca_de_media_e_de_dispersao():
+    df = frame_subgrupos(_dados(2, [(10.0, 1.0), (11.5, 1.0), (11.5, 2.5)]))
+    pontos = deteccao_mudanca.detectar_mudancas_xr(df)
+    assert len(pontos) == 2
+    assert abs(pontos[0] - 40) <= 2 and abs(pontos[1] - 80) <= 2
+
+
+def test_segmentos_respeitam_tamanho_minimo():
+    serie = np.r_[np.zeros(10), np.full(50, 5.0)]
+    assert deteccao_mudanca.detectar_pontos_mudanca(serie, tamanho_minimo=15) == [15]
+    assert deteccao_mudanca.detectar_pontos_mudanca(serie[:20], tamanho_minimo=15) == []
+
+
+def test_recalibracao_gera_uma_versao_por_segmento(tmp_path):
+    df = frame_subgrupos(_dados(3, [(10.0, 1.0), (12.0, 1.0)]))
+    versoes = deteccao_mudanca.recalibrar_por_segmento(df, 5, {}, [40])
+
+    assert [v["versao"] for v in versoes] == [1, 2]
+    assert (versoes[1]["indice_inicio"], versoes[1]["Amostra_inicio"]) == (40, "41")
+    assert versoes[0]["limites"]["X_barra_barra"] == pytest.approx(df["X_barra"][:40].mean())
+    assert versoes[1]["limites"]["X_barra_barra"] == pytest.approx(df["X_barra"][40:].mean())
+
+    caminho = tmp_path / "versoes.json"
+    assert deteccao_mudanca.salvar_versoes_limites(versoes, str(caminho))
+    assert len(json.loads(caminho.read_text())) == 2
+
+
+def test_recalibrar_marca_analise_de_capacidade_desatualizada(tmp_path):
+    import main
+
+    entrada = tmp_path / "entrada"
+    (entrada / "calibracao").mkdir(parents=True)
+    registros = [
+        {"Amostra": i + 1, "Dados": d}
+        for i, d in enumerate(_dados(4, [(10.0, 1.0), (12.0, 1.0)]))
+    ]
+    (entrada / "calibracao" / "linha.json").write_text(json.dumps(registros))
+    cfg = main.montar_configuracao(
+        str(entrada), pasta_saida=str(tmp_path / "saida"),
+        caminho_monitoramento=str(entrada / "monitoramento" / "vazio.json"),
+    )
+    main.verificar_pastas_output(cfg)
+    caminhos = main.caminhos_processo(cfg, "linha")
+    with open(caminhos["limites"], "w") as f:
+        json.dump({"tipo_grafico": "X-R", "analise_capacidade": {"Cpk": 1.2}}, f)
+
+    assert main.recalibrar_mudancas_processo(cfg, "xr", "linha", {}, False, None, 15)
+
+    with open(caminhos["limites"]) as f:
+        limites = json.load(f)
+    assert "analise_capacidade" not in limites
+    assert limites["analise_capacidade_desatualizada"] is True
+    assert limites["versao_limites"] == 2
+    assert limites["X_barra_barra"] == pytest.approx(12.0, abs=0.3)
+
+    # Refazer a capacidade com os novos limites remove a marca.
+    especificacoes = tmp_path / "especificacoes.json"
+    especificacoes.write_text(json.dumps({"linha": {"LSE": 15.0, "LIE": 9.0}}))
+    cfg["caminho_especs"] = str(especificacoes)
+    assert main.analisar_capacidade_processo(cfg, "xr", "linha", {}, None)
+    with open(caminhos["limites"]) as f:
+        limites = json.load(f)
+    assert "analise_capacidade_desatualizada" not in limites
+    assert limites["analise_capacidade"]
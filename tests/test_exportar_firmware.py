@@ -0,0 +1,120 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from software import exportar_firmware
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LIMITES = os.path.join(RAIZ, "resultados", "limites_calculados")
+CAMINHO_ESPECS = os.path.join(RAIZ, "configuracao", "especificacoes.json")
+
+INFO_XR = {
+    "tipo_grafico": "X-R",
+    "n_amostra": 5,
+    "limites_X_barra": {"LSC": 13.0, "LM": 10.0, "LIC": 7.0},
+    "limites_R": {"LSC": 8.0, "LM": 4.0, "LIC": 0.0},
+}
+
+
+def _salvar(pasta, nome, info):
+    with open(os.path.join(pasta, f"limites_{nome}.json"), "w") as f:
+        json.dump(info, f)
+
+
+def test_limites_do_firmware_usam_zonas_weco():
+    limites = exportar_firmware.montar_limites_firmware(INFO_XR, {"LSE": 15.0, "LIE": 5.0})
+    assert (limites["LSC_2S"], limites["LSC_1S"], limites["LIC_2S"]) == (12.0, 11.0, 8.0)
+    assert (limites["LSE"], limites["LIE"], limites["LSC_R"], limites["n"]) == (15.0, 5.0, 8.0, 5)
+
+    variavel = dict(INFO_XR, limites_variaveis={"n": [3, 5]})
+    assert exportar_firmware.montar_limites_firmware(variavel, None) is None
+    assert exportar_firmware.montar_limites_firmware({"tipo_grafico": "P"}, None) is None
+
+
+def test_coletar_apenas_os_processos_informados(tmp_path):
+    _salvar(tmp_path, "linha_1", INFO_XR)
+    _salvar(tmp_path, "controle", INFO_XR)
+    _salvar(tmp_path, "grafico_p", {"tipo_grafico": "P", "limites": {}})
+
+    assert list(exportar_firmware.coletar_limites(str(tmp_path), None, ["linha_1"])) == [
+        "linha_1"
+    ]
+    assert list(exportar_firmware.coletar_limites(str(tmp_path))) == ["controle", "linha_1"]
+
+
+def test_blob_ida_e_volta_e_crc(tmp_path):
+    _salvar(tmp_path, "linha_1", INFO_XR)
+    limites = exportar_firmware.coletar_limites(str(tmp_path))
+    blob = exportar_firmware.gerar_blob(limites)
+
+    assert len(blob) == 8 + 80 + 4
+    assert exportar_firmware.verificar_blob(blob, limites)
+    lidos = exportar_firmware.ler_blob(blob)
+    assert lidos["linha_1"]["LSC"] == pytest.approx(13.0)
+    assert np.isnan(lidos["linha_1"]["LSE"])
+
+    corrompido = bytearray(blob)
+    corrompido[20] ^= 0xFF
+    with pytest.raises(ValueError):
+        exportar_firmware.ler_blob(bytes(corrompido))
+
+
+def test_classificacao_por_subgrupo():
+    limites = exportar_firmware.montar_limites_firmware(INFO_XR, {"LSE": 15.0, "LIE": 5.0})
+    # Leituras individuais além de LSC não bastam: vale a média do subgrupo.
+    assert exportar_firmware.classificar_subgrupo(limites, [13.5, 7.0, 10.0, 9.5, 10.0]) == 0
+    assert exportar_firmware.classificar_subgrupo(limites, [12.5, 12.0, 12.5, 12.0, 12.5]) == 1
+    assert exportar_firmware.classificar_subgrupo(limites, [13.5, 13.0, 13.5, 13.0, 13.5]) == 2
+    assert exportar_firmware.classificar_subgrupo(limites, [5.5, 14.0, 10.0, 10.0, 10.0]) == 2
+    assert exportar_firmware.fora_especificacao(limites, 15.5)
+    assert not exportar_firmware.fora_especificacao(limites, 14.5)
+
+
+def test_cabecalho_do_repositorio_esta_atualizado():
+    limites = exportar_firmware.coletar_limites(
+        PASTA_LIMITES, CAMINHO_ESPECS, list(exportar_firmware.PROCESSOS_FIRMWARE)
+    )
+    with open(os.path.join(RAIZ, "cepsom", "include", "cep_limites.h"), encoding="utf-8") as f:
+        assert f.read() == exportar_firmware.gerar_cabecalho_c(limites)
+
+    with open(os.path.join(RAIZ, "cepsom", "src", "main.cpp"), encoding="utf-8") as f:
+        firmware = f.read()
+    processo = re.search(r'PROCESSO_FIRMWARE = "([^"]+)"', firmware).group(1)
+    assert processo in limites
+    assert '#include "cep_limites.h"' in firmware
+    assert "cep_classificar_subgrupo(limitesProcesso, subgrupo)" in firmware
+
+
+@pytest.mark.skipif(shutil.which("cc") is None, reason="compilador C indisponível")
+def test_cabecalho_compila_e_classifica_como_o_host(tmp_path):
+    info = dict(INFO_XR, limites_X_barra={"LSC": 4.9559, "LM": 4.9209, "LIC": 4.8858})
+    limites = {"linha_1": exportar_firmware.montar_limites_firmware(info, {"LSE": 4.94, "LIE": 4.92})}
+    (tmp_path / "cep_limites.h").write_text(exportar_firmware.gerar_cabecalho_c(limites))
+
+    rng = np.random.default_rng(9)
+    subgrupos = rng.normal(4.93, 0.02, size=(300, 5)).astype(np.float32)
+    linhas = ",\n".join("{" + ", ".join(f"{v!r}f" for v in s.tolist()) + "}" for s in subgrupos)
+    (tmp_path / "teste.c").write_text(
+        '#include <stdio.h>\n#include "cep_limites.h"\n'
+        f"static const float S[][5] = {{\n{linhas}\n}};\n"
+        "int main(void) {\n"
+        '    const CepLimites* l = cep_buscar_limites("linha_1");\n'
+        f"    for (int i = 0; i < {len(subgrupos)}; i++) printf(\"%d\", cep_classificar_subgrupo(l, S[i]));\n"
+        "    return 0;\n}\n"
+    )
+    subprocess.run(
+        ["cc", "-std=c11", "-O2", "-o", str(tmp_path / "teste"), str(tmp_path / "teste.c")],
+        check=True,
+    )
+    saida = subprocess.run([str(tmp_path / "teste")], capture_output=True, text=True, check=True)
+
+    esperado = "".join(
+        str(exportar_firmware.classificar_subgrupo(limites["linha_1"], s)) for s in subgrupos
+    )
+    assert saida.stdout == esperado
+    assert set(esperado) == {"0", "1", "2"}
@@ -0,0 +1,167 @@
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+
+from software import fila_trabalho
+
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def fila(tmp_path, monkeypatch):
+    monkeypatch.setattr(fila_trabalho, "ESPERA_RETENTATIVA_S", 0.0)
+    monkeypatch.setattr(fila_trabalho, "INTERVALO_ESPERA_S", 0.01)
+    pasta = tmp_path / "fila"
+    fila_trabalho.preparar_fila(str(pasta))
+    return pasta
+
+
+def _comando_python(monkeypatch, codigo):
+    # Substitui main.py por um script curto; a tarefa é passada em argv[1].
+    monkeypatch.setattr(
+        fila_trabalho,
+        "comando_tarefa",
+        lambda tarefa, pasta_saida: [sys.executable, "-c", codigo, json.dumps(tarefa)],
+    )
+
+
+def _enfileirar(fila, processos=(("xr", "linha"),), max_tentativas=3):
+    tarefas = fila_trabalho.montar_tarefas(list(processos), [], max_tentativas)
+    fila_trabalho.enfileirar_tarefas(str(fila), tarefas)
+    return tarefas
+
+
+def _ids(fila, subpasta):
+    return [n[: -len(".json")] for n in fila_trabalho._listar_tarefas(str(fila / subpasta))]
+
+
+def test_apenas_um_trabalhador_reivindica_a_tarefa(fila):
+    _enfileirar(fila, [("p", "grafico_p")])
+    primeira = fila_trabalho.reivindicar_tarefa(str(fila), "a")
+    segunda = fila_trabalho.reivindicar_tarefa(str(fila), "b")
+
+    assert primeira[0]["id"] == "0000_grafico_p_calibrate"
+    # A etapa plot depende da calibração, que ainda não terminou.
+    assert segunda is None
+    assert os.path.exists(primeira[1] + fila_trabalho.SUFIXO_BATIMENTO)
+    # Reenfileirar não duplica a tarefa em execução.
+    tarefas = fila_trabalho.montar_tarefas([("p", "grafico_p")], [])
+    assert fila_trabalho.enfileirar_tarefas(str(fila), tarefas) == 0
+
+
+def test_falha_repetida_com_sucesso_nao_conta(fila, tmp_path, monkeypatch):
+    marcador = tmp_path / "ja_falhou"
+    _comando_python(
+        monkeypatch,
+        "import os, sys\n"
+        f"m = {str(marcador)!r}\n"
+        "if not os.path.exists(m):\n"
+        "    open(m, 'w').close()\n"
+        "    sys.exit(3)\n",
+    )
+    _enfileirar(fila, [("p", "grafico_p")])
+
+    contagem = fila_trabalho.executar_trabalhador(str(fila), 0.05, 5.0)
+
+    assert contagem == {"concluidas": 2, "falhas": 0, "tentativas": 3}
+    assert _ids(fila, "concluidos") == ["0000_grafico_p_calibrate", "0000_grafico_p_plot"]
+    assert os.listdir(fila / "em_execucao") == []
+
+
+def test_falha_definitiva_cancela_dependentes(fila, monkeypatch):
+    _comando_python(monkeypatch, "import sys; sys.exit(1)")
+    _enfileirar(fila, [("p", "grafico_p")], max_tentativas=2)
+
+    contagem = fila_trabalho.executar_trabalhador(str(fila), 0.05, 5.0)
+
+    assert contagem == {"concluidas": 0, "falhas": 1, "tentativas": 2}
+    assert _ids(fila, "falhos") == ["0000_grafico_p_calibrate", "0000_grafico_p_plot"]
+    (fila / "saida").mkdir()
+    assert not fila_trabalho.coordenar(str(fila), str(fila / "saida"))
+
+
+def test_batimento_expira_pelo_relogio_de_quem_observa(fila, monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(fila_trabalho.time, "monotonic", lambda: agora[0])
+    _enfileirar(fila, [("p", "grafico_p")])
+    _, caminho = fila_trabalho.reivindicar_tarefa(str(fila), "a")
+    # Relógio do nó trabalhador muito adiantado: não afeta a expiração.
+    with open(caminho + fila_trabalho.SUFIXO_BATIMENTO, "w") as f:
+        json.dump({"sequencia": 0, "enviado_em": 9e9}, f)
+
+    assert fila_trabalho.recuperar_expiradas(str(fila), timeout=30) == 0
+    agora[0] += 20
+    fila_trabalho.escrever_batimento(caminho, 1)
+    assert fila_trabalho.recuperar_expiradas(str(fila), timeout=30) == 0
+    agora[0] += 29
+    assert fila_trabalho.recuperar_expiradas(str(fila), timeout=30) == 0
+    agora[0] += 2
+    assert fila_trabalho.recuperar_expiradas(str(fila), timeout=30) == 1
+
+    tarefa = json.loads((fila / "pendentes" / "0000_grafico_p_calibrate.json").read_text())
+    assert tarefa["tentativas"] == 1
+    assert "batimento expirado (trabalhador a)" in tarefa["erros"][0]
+    assert os.listdir(fila / "em_execucao") == []
+
+
+def test_mescla_resultados_dos_processos(fila, tmp_path):
+    for processo, alertas in (("linha_1", ["A1"]), ("linha_2", [])):
+        pasta = fila / "resultados" / processo / "limites_calculados"
+        pasta.mkdir(parents=True)
+        (pasta / f"limites_{processo}.json").write_text("{}")
+        (pasta / f"alertas_{processo}.json").write_text(json.dumps(alertas))
+
+    saida = tmp_path / "saida"
+    resultado = fila_trabalho.mesclar_resultados(str(fila), str(saida))
+
+    assert resultado["processos"] == ["linha_1", "linha_2"] and resultado["arquivos"] == 4
+    assert sorted(os.listdir(saida / "limites_calculados")) == [
+        "alertas_linha_1.json", "alertas_linha_2.json",
+        "limites_linha_1.json", "limites_linha_2.json",
+    ]
+    assert json.loads((saida / "alertas_consolidados.json").read_text()) == {
+        "linha_1": ["A1"], "linha_2": [],
+    }
+
+
+def test_varios_trabalhadores_concluem_cada_tarefa_uma_vez(fila, tmp_path):
+    tarefas = _enfileirar(fila, [("p", f"linha_{i}") for i in range(6)])
+    execucoes = tmp_path / "execucoes.log"
+    # Cada trabalhador é um processo separado; a etapa só registra o id da tarefa.
+    script = tmp_path / "trabalhador.py"
+    script.write_text(
+        "import json, sys\n"
+        "from software import fila_trabalho\n"
+        "fila_trabalho.INTERVALO_ESPERA_S = 0.01\n"
+        "REGISTRAR = 'import sys; open(sys.argv[1], \"a\").write(sys.argv[2] + \" \")'\n"
+        "fila_trabalho.comando_tarefa = lambda tarefa, pasta_saida: [\n"
+        "    sys.executable, '-c', REGISTRAR, sys.argv[2], tarefa['id']\n"
+        "]\n"
+        "print(json.dumps(fila_trabalho.executar_trabalhador(sys.argv[1], 0.05, 30.0)))\n"
+    )
+    trabalhadores = [
+        subprocess.Popen(
+            [sys.executable, str(script), str(fila), str(execucoes)],
+            env=dict(os.environ, PYTHONPATH=RAIZ_REPOSITORIO),
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(4)
+    ]
+    contagens = []
+    for trabalhador in trabalhadores:
+        saida, _ = trabalhador.communicate(timeout=120)
+        assert trabalhador.returncode == 0
+        contagens.append(json.loads(saida.strip().splitlines()[-1]))
+
+    ids = sorted(t["id"] for t in tarefas)
+    assert sorted(_ids(fila, "concluidos")) == ids
+    assert Counter(execucoes.read_text().split()) == Counter(ids)
+    assert sum(c["concluidas"] for c in contagens) == len(ids)
+    assert sum(c["tentativas"] for c in contagens) == len(ids)
+    for subpasta in ("pendentes", "em_execucao", "falhos"):
+        assert _ids(fila, subpasta) == []
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from software import graficos_atributos
+
+
+def _lotes(semente, num_lotes=200, tamanho=5000, sobredispersao=0.0):
+    rng = np.random.default_rng(semente)
+    p = np.clip(0.05 + sobredispersao * rng.standard_normal(num_lotes), 0.001, 1)
+    n = np.full(num_lotes, tamanho)
+    return pd.DataFrame({"n": n, "np": rng.binomial(n, p)})
+
+
+def test_sigma_z_proximo_de_1_sem_sobredispersao():
+    df = _lotes(1)
+    info = graficos_atributos.calibrar_limites_p_laney(df)
+    assert info["tipo_grafico"] == "P'"
+    assert info["sigma_z"] == pytest.approx(1.0, abs=0.15)
+
+
+def test_laney_alarga_limites_com_sobredispersao():
+    df = _lotes(2, sobredispersao=0.01)
+    laney = graficos_atributos.calibrar_limites_p_laney(df)
+    p = graficos_atributos.calibrar_limites_p(df)
+    # Desvio entre lotes de 0.01 contra sigma binomial de sqrt(0.05 * 0.95 / 5000).
+    assert laney["sigma_z"] == pytest.approx(np.sqrt(1 + 0.01**2 / (0.05 * 0.95 / 5000)), rel=0.2)
+
+    limites_laney = graficos_atributos.calcular_limites_atributos(laney, df["np"], df["n"])
+    limites_p = graficos_atributos.calcular_limites_atributos(
+        dict(p, tipo_grafico="P"), df["np"], df["n"]
+    )
+    fora = lambda l: np.sum((l["estatistica"] > l["LSC"]) | (l["estatistica"] < l["LIC"]))
+    assert fora(limites_laney) < 5 < fora(limites_p)
+
+
+def test_limites_np_e_c():
+    df_p = pd.DataFrame({"n": [100] * 4, "np": [4, 6, 5, 5]})
+    info = graficos_atributos.calibrar_limites_np(df_p)
+    limites = graficos_atributos.calcular_limites_atributos(info, df_p["np"], df_p["n"])
+    sigma = np.sqrt(100 * 0.05 * 0.95)
+    np.testing.assert_allclose(limites["LM"], 5.0)
+    np.testing.assert_allclose(limites["LSC"], 5.0 + 3 * sigma)
+    np.testing.assert_allclose(limites["LIC"], 0.0)
+    np.testing.assert_allclose(limites["estatistica"], [4, 6, 5, 5])
+
+    df_u = pd.DataFrame({"n": [2, 2, 2], "c": [8, 10, 12]})
+    info = graficos_atributos.calibrar_limites_c(df_u)
+    assert info["c_barra"] == pytest.approx(10.0)
+    limites = graficos_atributos.calcular_limites_atributos(info, df_u["c"], df_u["n"])
+    np.testing.assert_allclose(limites["LSC"], 10.0 + 3 * np.sqrt(10.0))
+    np.testing.assert_allclose(limites["LIC"], 10.0 - 3 * np.sqrt(10.0))
+    np.testing.assert_allclose(limites["estatistica"], [8, 10, 12])
+
+
+def test_sigma_z_ignora_lotes_sem_inspecao():
+    df = _lotes(3, num_lotes=50)
+    df.loc[[0, 10, 11], ["n", "np"]] = 0
+    info = graficos_atributos.calibrar_limites_p_laney(df)
+    validos = df[df["n"] > 0]
+    assert info["sigma_z"] == graficos_atributos.calcular_sigma_z(
+        validos["np"], validos["n"], info["p_barra"], True
+    )
+    assert np.isfinite(info["sigma_z"])
+
+    assert graficos_atributos.calcular_sigma_z([0, 3], [0, 100], 0.03, True) == 1.0
+
+
+def test_fase_1_atributos_usa_os_limites_de_calcular_limites_atributos(capsys):
+    df = _lotes(4, num_lotes=60, tamanho=500)
+    df.loc[[7, 30], "np"] = [90, 95]
+    df["lote"] = np.arange(1, len(df) + 1)
+
+    info = graficos_atributos.calibrar_limites_p_iterativo(df)
+    assert sorted(info["fase_1"]["amostras_excluidas"])[:2] == [8, 31]
+    incluidos = ~df["lote"].isin(info["fase_1"]["amostras_excluidas"])
+    limites = graficos_atributos.calcular_limites_atributos(
+        info, df.loc[incluidos, "np"], df.loc[incluidos, "n"]
+    )
+    assert np.all(limites["estatistica"] <= limites["LSC"])
+    assert np.all(limites["estatistica"] >= limites["LIC"])
+    assert "AVISO: Fase I atingiu" not in capsys.readouterr().out
+
+    graficos_atributos.calibrar_limites_p_iterativo(df, max_iteracoes=1)
+    assert "AVISO: Fase I atingiu o máximo de 1 iterações" in capsys.readouterr().out
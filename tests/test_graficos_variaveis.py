@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from software import graficos_variaveis
+from conftest import frame_subgrupos
+
+
+def test_limites_xr_com_n_fixo_usam_a2_d3_d4():
+    df = pd.DataFrame(
+        {"Amostra": [1, 2, 3], "X_barra": [9.0, 10.0, 11.0], "R": [1.0, 2.0, 3.0]}
+    )
+    info = graficos_variaveis.calibrar_limites_xr(df, 5, {})
+    A2 = info["constantes_usadas"]["A2"]
+    D4 = info["constantes_usadas"]["D4"]
+    assert info["limites_X_barra"]["LSC"] == pytest.approx(10.0 + A2 * 2.0)
+    assert info["limites_X_barra"]["LIC"] == pytest.approx(10.0 - A2 * 2.0)
+    assert info["limites_R"]["LSC"] == pytest.approx(D4 * 2.0)
+    assert info["limites_R"]["LIC"] == 0.0
+
+
+def test_fase_1_remove_pontos_fora_de_controle():
+    rng = np.random.default_rng(7)
+    dados = [rng.normal(10.0, 1.0, 5).tolist() for _ in range(40)]
+    dados[10] = [v + 8.0 for v in dados[10]]
+    dados[25] = [v - 8.0 for v in dados[25]]
+    df = frame_subgrupos(dados)
+
+    info = graficos_variaveis.calibrar_limites_xr_iterativo(df, 5, {})
+    assert sorted(info["fase_1"]["amostras_excluidas"]) == [11, 26]
+    assert info["fase_1"]["subgrupos_usados"] == 38
+
+    esperado = graficos_variaveis.calibrar_limites_xr(df.drop(index=[10, 25]), 5, {})
+    assert info["limites_X_barra"] == pytest.approx(esperado["limites_X_barra"])
+
+
+def test_fase_1_avisa_quando_atinge_o_maximo_de_iteracoes(capsys):
+    rng = np.random.default_rng(7)
+    dados = [rng.normal(10.0, 1.0, 5).tolist() for _ in range(40)]
+    dados[10] = [v + 8.0 for v in dados[10]]
+    df = frame_subgrupos(dados)
+
+    graficos_variaveis.calibrar_limites_xr_iterativo(df, 5, {}, max_iteracoes=1)
+    assert "AVISO: Fase I atingiu o máximo de 1 iterações" in capsys.readouterr().out
+    graficos_variaveis.calibrar_limites_xr_iterativo(df, 5, {})
+    assert "AVISO: Fase I atingiu" not in capsys.readouterr().out
+
+
+def test_fase_1_mantem_limites_variaveis_quando_sobra_um_unico_n():
+    # Os únicos subgrupos com n=3 estão fora de controle; após a Fase I resta apenas n=5.
+    rng = np.random.default_rng(11)
+    dados = [rng.normal(10.0, 1.0, 5).tolist() for _ in range(30)]
+    dados[5] = (rng.normal(10.0, 1.0, 3) + 15.0).tolist()
+    dados[20] = (rng.normal(10.0, 1.0, 3) - 15.0).tolist()
+    df = frame_subgrupos(dados)
+
+    info = graficos_variaveis.calibrar_limites_xr_iterativo(df, 5, {})
+    assert sorted(info["fase_1"]["amostras_excluidas"]) == [6, 21]
+    variaveis = info["limites_variaveis"]
+    assert len(variaveis["LSC_X"]) == 30
+    assert variaveis["n"][5] == 3 and variaveis["n"][0] == 5
+    assert variaveis["LSC_X"][5] > variaveis["LSC_X"][0]
+
+
+def test_limites_por_subgrupo_coincidem_com_n_fixo():
+    df = frame_subgrupos([[1.0, 2.0, 4.0, 3.0, 2.5]] * 10)
+    info = graficos_variaveis.calibrar_limites_xr(df, 5, {})
+    info["sigma_R"] = info["R_barra"] / 2.3259
+    limites = graficos_variaveis.calcular_limites_por_subgrupo(
+        np.array([5]), info, {}
+    )
+    assert limites["LSC_X"][0] == pytest.approx(info["limites_X_barra"]["LSC"], rel=1e-4)
+    assert limites["LSC_R"][0] == pytest.approx(info["limites_R"]["LSC"], rel=1e-4)
+
+
+def test_monitoramento_usa_limites_do_n_de_cada_subgrupo():
+    rng = np.random.default_rng(5)
+    df = frame_subgrupos([rng.normal(10.0, 1.0, 5).tolist() for _ in range(20)])
+    info = graficos_variaveis.calibrar_limites_xr(df, 5, {})
+
+    limites = graficos_variaveis.limites_xr_por_subgrupo([5, 3, np.nan], info, {})
+    assert limites["LSC"][0] == limites["LSC"][2] == info["limites_X_barra"]["LSC"]
+    assert limites["LSC_R"][0] == info["limites_R"]["LSC"]
+    # Com n=3 a média varia mais e a amplitude esperada é menor.
+    assert limites["LSC"][1] > limites["LSC"][0]
+    assert limites["LSC_R"][1] < limites["LSC_R"][0]
+    assert limites["LM"][1] == info["limites_X_barra"]["LM"]
+
+    # Ponto entre o LSC de n=5 e o de n=3: só é alerta se o subgrupo tiver n=5.
+    ponto = (limites["LSC"][0] + limites["LSC"][1]) / 2
+    for n, esperado in ((5, 1), (3, 0)):
+        df_total = pd.concat(
+            [df, pd.DataFrame({"Amostra": [21], "X_barra": [ponto], "R": [1.0], "n": [n]})],
+            ignore_index=True,
+        )
+        alertas = graficos_variaveis.analisar_regras_weco(df_total, info, 20)
+        assert sum("Regra 1" in a for a in alertas) == esperado
@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+
+from software import ingestao_arquivos
+from software import leitura_dados
+
+
+def _escrever(caminho, registros, jsonl=False):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    if jsonl:
+        caminho.write_text("".join(json.dumps(r) + "\n" for r in registros))
+    else:
+        caminho.write_text(json.dumps(registros))
+
+
+def _registros(amostras, valor=1.0):
+    return [{"Amostra": a, "Dados": [valor, valor + 1.0, valor + 2.0]} for a in amostras]
+
+
+def test_pasta_e_glob_listam_apenas_subgrupos(tmp_path):
+    _escrever(tmp_path / "a.json", _registros([1]))
+    _escrever(tmp_path / "sub" / "b.jsonl", _registros([2]), jsonl=True)
+    (tmp_path / "notas.txt").write_text("ignorar")
+
+    assert ingestao_arquivos.e_fonte_multipla(str(tmp_path))
+    assert ingestao_arquivos.expandir_caminhos(str(tmp_path)) == [
+        str(tmp_path / "a.json"),
+        str(tmp_path / "sub" / "b.jsonl"),
+    ]
+    assert ingestao_arquivos.expandir_caminhos(str(tmp_path / "**" / "*.jsonl")) == [
+        str(tmp_path / "sub" / "b.jsonl")
+    ]
+    assert not ingestao_arquivos.e_fonte_multipla(str(tmp_path / "a.json"))
+
+
+def test_subgrupos_ordenados_e_duplicatas_do_ultimo_arquivo(tmp_path):
+    _escrever(tmp_path / "lote_1.json", _registros([3, 1, 2], valor=1.0))
+    _escrever(tmp_path / "lote_2.jsonl", _registros([10, 2], valor=5.0), jsonl=True)
+
+    amostras, dados, falhas = ingestao_arquivos.carregar_subgrupos_multiplos(str(tmp_path))
+
+    assert falhas == []
+    assert amostras.tolist() == [1, 2, 3, 10]
+    # A Amostra 2 duplicada prevalece do arquivo lido por último.
+    assert dados[1].tolist() == [5.0, 6.0, 7.0]
+
+
+def test_arquivos_malformados_sao_ignorados(tmp_path):
+    _escrever(tmp_path / "bom.json", _registros([1, 2]))
+    (tmp_path / "quebrado.json").write_text("[{")
+    _escrever(tmp_path / "sem_dados.json", [{"Amostra": 3}])
+
+    amostras, _, falhas = ingestao_arquivos.carregar_subgrupos_multiplos(str(tmp_path))
+
+    assert amostras.tolist() == [1, 2]
+    assert sorted(c for c, _ in falhas) == [
+        str(tmp_path / "quebrado.json"),
+        str(tmp_path / "sem_dados.json"),
+    ]
+
+
+def test_leituras_nao_numericas_invalidam_apenas_o_arquivo(tmp_path):
+    _escrever(tmp_path / "a.json", _registros([1, 2]))
+    _escrever(tmp_path / "b.json", [{"Amostra": 3, "Dados": ["x", None, 3]}])
+    _escrever(tmp_path / "c.json", [{"Amostra": 4, "Dados": [1.0, None, 3.0]}])
+
+    amostras, dados, falhas = ingestao_arquivos.carregar_subgrupos_multiplos(str(tmp_path))
+    assert amostras.tolist() == [1, 2, 4]
+    assert [c for c, _ in falhas] == [str(tmp_path / "b.json")]
+    assert np.isnan(dados[2][1])
+
+    df, _, _ = leitura_dados.carregar_historico_xr(str(tmp_path))
+    assert df["Amostra"].tolist() == [1, 2, 4]
+    assert df["n"].tolist() == [3, 3, 2]
+
+
+def test_processos_e_threads_dao_o_mesmo_resultado(tmp_path):
+    for i in range(6):
+        _escrever(tmp_path / f"lote_{i}.json", _registros([f"L{i}-{j}" for j in range(3)], i))
+
+    por_threads = ingestao_arquivos.carregar_subgrupos_multiplos(str(tmp_path), max_workers=3)
+    por_processos = ingestao_arquivos.carregar_subgrupos_multiplos(
+        str(tmp_path), max_workers=2, usar_processos=True
+    )
+    assert por_threads[0].tolist() == por_processos[0].tolist()
+    assert [d.tolist() for d in por_threads[1]] == [d.tolist() for d in por_processos[1]]
+    assert por_threads[0][0] == "L0-0"
+
+
+def test_monitoramento_aceita_pasta(tmp_path):
+    _escrever(tmp_path / "a.json", _registros([1, 2], valor=2.0))
+    _escrever(tmp_path / "b.jsonl", _registros([3], valor=4.0), jsonl=True)
+
+    df = leitura_dados.carregar_dados_monitoramento_xr(str(tmp_path))
+    assert df["X_barra"].tolist() == [3.0, 3.0, 5.0]
+    np.testing.assert_allclose(df["R"], 2.0)
+    assert leitura_dados.carregar_dados_monitoramento_xr(str(tmp_path / "vazia" / "*.json")) is None
@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from software import leitura_dados
+from software import graficos_variaveis
+
+
+def test_csr_descarta_leituras_ausentes():
+    valores, offsets = leitura_dados.montar_subgrupos_csr(
+        [[1.0, 2.0, 3.0], [4.0, np.nan], [5.0, 6.0, np.nan, 8.0]]
+    )
+    np.testing.assert_array_equal(valores, [1, 2, 3, 4, 5, 6, 8])
+    np.testing.assert_array_equal(offsets, [0, 3, 4, 7])
+
+
+def test_estatisticas_de_subgrupos_irregulares():
+    dados = [[1.0, 2.0, 3.0], [10.0, 14.0], [7.0], []]
+    valores, offsets = leitura_dados.montar_subgrupos_csr(dados)
+    estatisticas = leitura_dados.calcular_estatisticas_subgrupos(valores, offsets)
+
+    np.testing.assert_array_equal(estatisticas["n"], [3, 2, 1, 0])
+    np.testing.assert_allclose(estatisticas["X_barra"][:3], [2.0, 12.0, 7.0])
+    np.testing.assert_allclose(estatisticas["R"][:3], [2.0, 4.0, 0.0])
+    np.testing.assert_allclose(
+        estatisticas["S"][:2], [np.std(dados[0], ddof=1), np.std(dados[1], ddof=1)]
+    )
+    assert np.isnan(estatisticas["X_barra"][3])
+
+
+def test_frame_descarta_subgrupos_com_menos_de_duas_leituras():
+    dados = [[1.0, 2.0], [3.0], [4.0, 5.0, 6.0]]
+    valores, offsets = leitura_dados.montar_subgrupos_csr(dados)
+    df = leitura_dados.montar_frame_subgrupos(
+        np.array([1, 2, 3]), leitura_dados.calcular_estatisticas_subgrupos(valores, offsets)
+    )
+    assert df["Amostra"].tolist() == [1, 3]
+    assert df["n"].tolist() == [2, 3]
+
+
+def test_calibracao_com_n_variavel_gera_limites_por_subgrupo():
+    rng = np.random.default_rng(3)
+    tamanhos = rng.choice([3, 5, 8], size=60)
+    dados = [rng.normal(10.0, 1.0, n).tolist() for n in tamanhos]
+    valores, offsets = leitura_dados.montar_subgrupos_csr(dados)
+    df = leitura_dados.montar_frame_subgrupos(
+        np.arange(60), leitura_dados.calcular_estatisticas_subgrupos(valores, offsets)
+    )
+
+    info = graficos_variaveis.calibrar_limites_xr(df, 5, {})
+    variaveis = info["limites_variaveis"]
+    assert len(variaveis["LSC_X"]) == 60
+    largura = np.asarray(variaveis["LSC_X"]) - np.asarray(variaveis["LIC_X"])
+    # Limites de X-barra se estreitam com sqrt(n).
+    assert largura[tamanhos == 8].max() < largura[tamanhos == 3].min()
+    assert info["sigma_R"] == pytest.approx(1.0, abs=0.2)
+
+
+def test_historico_separa_calibracao_e_monitoramento(tmp_path):
+    calibracao = tmp_path / "calibracao.json"
+    monitoramento = tmp_path / "monitoramento.json"
+    calibracao.write_text(
+        json.dumps([{"Amostra": i, "Dados": [1.0 + i, 2.0, 3.0]} for i in range(1, 6)])
+    )
+    monitoramento.write_text(json.dumps([{"Amostra": 6, "Dados": [4.0, 5.0, 6.0]}]))
+
+    recebidos = {}
+    df_total, n_amostra, inicio_novos = leitura_dados.carregar_historico_xr(
+        str(calibracao), str(monitoramento), consumidor_valores=recebidos.__setitem__
+    )
+    assert (n_amostra, inicio_novos, len(df_total)) == (3, 5, 6)
+    assert df_total["X_barra"].iloc[-1] == pytest.approx(5.0)
+    assert len(recebidos[str(calibracao)]) + len(recebidos[str(monitoramento)]) == 18
+    assert recebidos[str(monitoramento)].tolist() == [4.0, 5.0, 6.0]
+
+
+def test_modo_compacto_reduz_tipos():
+    dados = [[1.0, 2.0, 3.0]] * 4
+    valores, offsets = leitura_dados.montar_subgrupos_csr(dados)
+    estatisticas = leitura_dados.calcular_estatisticas_subgrupos(valores, offsets)
+
+    df = leitura_dados.montar_frame_subgrupos(
+        np.array([1, 2, 3, 4]), estatisticas, compacto=True, precisao_simples=True
+    )
+    assert df["Amostra"].dtype == np.int8
+    assert df["n"].dtype == np.uint8
+    assert df["X_barra"].dtype == np.float32
+
+    df_texto = leitura_dados.montar_frame_subgrupos(
+        np.array(["a", "b", "a", "c"], dtype=object), estatisticas, compacto=True
+    )
+    assert isinstance(df_texto["Amostra"].dtype, pd.CategoricalDtype)
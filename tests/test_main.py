@@ -0,0 +1,159 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+from software import leitura_dados
+
+
+@pytest.fixture
+def entrada(tmp_path):
+    shutil.copytree(main.PASTA_DADOS_ENTRADA, tmp_path / "entrada")
+    return tmp_path / "entrada"
+
+
+def _executar(comando, entrada, saida, *extras):
+    args = main.criar_parser().parse_args(
+        [comando, "--entrada", str(entrada), "--saida", str(saida), *extras]
+    )
+    return main.executar(args)
+
+
+def test_selecionar_processos_por_nome_e_tipo():
+    assert main.selecionar_processos(None, None) == main.PROCESSOS_PADRAO
+    assert main.selecionar_processos(["p", "u"], None) == [
+        ("p", main.NOME_PROCESSO_P),
+        ("u", main.NOME_PROCESSO_U),
+    ]
+    assert main.selecionar_processos(None, ["grafico_p", "np:grafico_p", "linha_3"]) == [
+        ("p", "grafico_p"),
+        ("np", "grafico_p"),
+        ("xr", "linha_3"),
+    ]
+    assert main.selecionar_processos(["c"], ["grafico_p"]) == []
+
+
+def test_sem_subcomando_executa_tudo(monkeypatch):
+    recebidos = []
+    monkeypatch.setattr(main, "executar", lambda args: recebidos.append(args) or 0)
+
+    with pytest.raises(SystemExit) as saida:
+        main.main(["--tipo", "p"])
+    assert saida.value.code == 0
+    assert recebidos[0].comando == "all" and recebidos[0].tipo == ["p"]
+
+
+def test_monitor_nao_le_calibracao(entrada, tmp_path, monkeypatch):
+    saida = tmp_path / "saida"
+    assert _executar("calibrate", entrada, saida, "--tipo", "xr") == 0
+
+    def proibido(*args, **kwargs):
+        raise AssertionError("monitor não deve reler a calibração")
+
+    monkeypatch.setattr(leitura_dados, "carregar_historico_xr", proibido)
+    monkeypatch.setattr(leitura_dados, "carregar_dados_calibracao_p", proibido)
+    assert _executar("monitor", entrada, saida) == 0
+
+    caminhos = main.caminhos_processo(
+        main.montar_configuracao(str(entrada), pasta_saida=str(saida)), main.NOME_PROCESSO_XR
+    )
+    assert os.path.exists(caminhos["alertas"])
+    assert not os.path.exists(caminhos["grafico_calibracao"])
+
+
+def test_falha_de_um_processo_nao_interrompe_os_demais(entrada, tmp_path):
+    os.remove(entrada / "calibracao" / f"{main.NOME_PROCESSO_P}.json")
+    saida = tmp_path / "saida"
+
+    assert _executar("calibrate", entrada, saida) == 1
+
+    cfg = main.montar_configuracao(str(entrada), pasta_saida=str(saida))
+    assert os.path.exists(main.caminhos_processo(cfg, main.NOME_PROCESSO_XR)["limites"])
+    assert os.path.exists(main.caminhos_processo(cfg, main.NOME_PROCESSO_U)["limites"])
+    assert not os.path.exists(main.caminhos_processo(cfg, main.NOME_PROCESSO_P)["limites"])
+
+
+def test_tipos_derivados_nao_sobrescrevem_o_grafico_p(entrada, tmp_path):
+    saida = tmp_path / "saida"
+    tipos = ["p:grafico_p", "p_laney:grafico_p", "np:grafico_p"]
+    assert _executar("calibrate", entrada, saida, "--processo", *tipos) == 0
+    assert _executar("plot", entrada, saida, "--processo", *tipos) == 0
+
+    cfg = main.montar_configuracao(str(entrada), pasta_saida=str(saida))
+    esperados = {"p": "P", "p_laney": "P'", "np": "NP"}
+    for tipo, tipo_grafico in esperados.items():
+        caminhos = main.caminhos_processo(cfg, "grafico_p", tipo)
+        assert main._carregar_limites(caminhos["limites"])["tipo_grafico"] == tipo_grafico
+        assert os.path.exists(caminhos["grafico_calibracao"])
+    assert main.caminhos_processo(cfg, "grafico_p", "np")["limites"].endswith(
+        "limites_grafico_p_np.json"
+    )
+
+
+@pytest.mark.parametrize(
+    "opcoes",
+    [
+        ["contagem", "--tamanho-subgrupo", "5"],
+        ["janela", "--janela-subgrupo", "1h"],
+        ["turno", "--inicios-turno", *[f"{hora:02d}:00" for hora in range(24)]],
+    ],
+)
+def test_agrupamento_de_leituras_antes_da_calibracao(entrada, tmp_path, opcoes):
+    referencia = tmp_path / "referencia"
+    assert _executar("calibrate", entrada, referencia, "--tipo", "xr") == 0
+
+    # Cinco leituras por hora, na ordem dos subgrupos do JSON de calibração.
+    subgrupos = pd.read_json(entrada / "calibracao" / f"{main.NOME_PROCESSO_XR}.json")
+    valores = [v for dados in subgrupos["Dados"] for v in dados]
+    tempos = pd.date_range("2024-01-01 06:00", periods=len(valores), freq="12min")
+    pd.DataFrame({"timestamp": tempos, "valor": valores}).sample(frac=1, random_state=0).to_csv(
+        entrada / "calibracao" / f"{main.NOME_PROCESSO_XR}.csv", index=False
+    )
+
+    saida = tmp_path / "saida"
+    assert _executar("calibrate", entrada, saida, "--tipo", "xr", "--agrupamento", *opcoes) == 0
+
+    limites = []
+    for pasta in (referencia, saida):
+        cfg = main.montar_configuracao(str(entrada), pasta_saida=str(pasta))
+        limites.append(
+            main._carregar_limites(main.caminhos_processo(cfg, main.NOME_PROCESSO_XR)["limites"])
+        )
+    assert limites[1]["n_amostra"] == 5
+    assert limites[1]["limites_X_barra"] == pytest.approx(limites[0]["limites_X_barra"])
+    assert limites[1]["limites_R"] == pytest.approx(limites[0]["limites_R"])
+
+
+def test_watch_usa_o_processo_xr_selecionado(entrada, tmp_path, monkeypatch):
+    recebidos = []
+
+    class MonitorFalso:
+        def __init__(self, pasta, limites, processados, processo_padrao, *args, **kwargs):
+            recebidos.append(processo_padrao)
+
+        def executar(self, intervalo, duracao):
+            pass
+
+    monkeypatch.setattr(main.monitoramento_continuo, "MonitorPasta", MonitorFalso)
+    saida = tmp_path / "saida"
+    assert _executar("watch", entrada, saida, "--processo", "linha_3", "grafico_p") == 0
+    assert _executar("watch", entrada, saida, "--tipo", "p") == 1
+    assert recebidos == ["linha_3"]
+
+
+def test_cache_do_historico_distingue_o_monitoramento(entrada, tmp_path):
+    cfg = main.montar_configuracao(str(entrada), pasta_saida=str(tmp_path), precisao_simples=True)
+    cache = {}
+
+    so_calibracao = main._obter_historico_xr(cfg, main.NOME_PROCESSO_XR, cache, False)
+    completo = main._obter_historico_xr(cfg, main.NOME_PROCESSO_XR, cache, True)
+    assert len(so_calibracao[0]) == so_calibracao[2] < len(completo[0])
+    assert completo[0]["X_barra"].dtype == np.float32
+
+    cache = {("historico_xr", main.NOME_PROCESSO_XR, True): completo}
+    assert main._obter_historico_xr(cfg, main.NOME_PROCESSO_XR, cache, False) is completo
+    assert main._montar_serie_monitoramento(cfg, main.NOME_PROCESSO_XR, cache)[1] == completo[2]
+    assert _executar("all", entrada, tmp_path / "saida", "--tipo", "xr", "--precisao-simples") == 0
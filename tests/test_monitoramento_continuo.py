@@ -0,0 +1,144 @@
+import json
+import os
+
+import pytest
+
+from software import monitoramento_continuo
+from software import sketch_quantis
+
+LIMITES = {
+    "tipo_grafico": "X-R",
+    "n_amostra": 3,
+    "limites_X_barra": {"LSC": 13.0, "LM": 10.0, "LIC": 7.0},
+    "limites_R": {"LSC": 5.0, "LM": 2.0, "LIC": 0.0},
+}
+
+
+@pytest.fixture
+def pastas(tmp_path):
+    caminhos = {
+        nome: tmp_path / nome for nome in ("monitoramento", "limites", "processados", "sketches")
+    }
+    for caminho in caminhos.values():
+        caminho.mkdir()
+    return caminhos
+
+
+def _monitor(pastas, tmp_path):
+    return monitoramento_continuo.MonitorPasta(
+        str(pastas["monitoramento"]),
+        str(pastas["limites"]),
+        str(pastas["processados"]),
+        "linha",
+        str(tmp_path / "estado.json"),
+        pasta_sketches=str(pastas["sketches"]),
+    )
+
+
+def _linhas(inicio, fim, valor=10.0):
+    return "".join(
+        json.dumps({"Amostra": i, "Dados": [valor - 1, valor, valor + 1]}) + "\n"
+        for i in range(inicio, fim)
+    )
+
+
+def _salvar_limites(pastas):
+    (pastas["limites"] / "limites_linha.json").write_text(json.dumps(LIMITES))
+
+
+def _alertas(pastas):
+    caminho = pastas["limites"] / "alertas_linha.json"
+    return json.loads(caminho.read_text()) if caminho.exists() else []
+
+
+def test_arquivos_existentes_nao_sao_reprocessados(pastas, tmp_path):
+    _salvar_limites(pastas)
+    arquivo = pastas["monitoramento"] / "leituras.jsonl"
+    arquivo.write_text(_linhas(1, 4, valor=20.0) + '{"Amostra": 4, "Da')
+    (pastas["monitoramento"] / "lote.json").write_text(
+        json.dumps([{"Amostra": 1, "Dados": [20.0, 20.0, 21.0]}])
+    )
+
+    monitor = _monitor(pastas, tmp_path)
+    assert monitor.marcar_existentes() == 2
+    assert monitor.processar_alteracoes() == 0
+    assert _alertas(pastas) == []
+
+    # A linha parcial existente é completada e lida junto com as novas.
+    with open(arquivo, "a") as f:
+        f.write('dos": [20.0, 20.0, 20.0]}\n' + _linhas(5, 6))
+    assert monitor.processar_alteracoes() == 2
+    assert _alertas(pastas) == ["ALERTA (Amostra 4): Regra 1 - Ponto fora do limite (20.00000)"]
+
+    # O estado persistido evita reprocessar ao reiniciar.
+    reiniciado = _monitor(pastas, tmp_path)
+    reiniciado.marcar_existentes()
+    assert reiniciado.processar_alteracoes() == 0
+    assert sketch_quantis.carregar_sketch(
+        str(pastas["sketches"] / "sketch_linha.json")
+    ).total == 6
+
+
+def test_arquivo_novo_e_lido_desde_o_inicio(pastas, tmp_path):
+    _salvar_limites(pastas)
+    monitor = _monitor(pastas, tmp_path)
+    monitor.marcar_existentes()
+
+    (pastas["monitoramento"] / "novo.jsonl").write_text(_linhas(1, 4))
+    assert monitor.processar_alteracoes() == 3
+    assert monitor.processar_alteracoes() == 0
+
+
+def test_leituras_aguardam_limites(pastas, tmp_path, capsys):
+    monitor = _monitor(pastas, tmp_path)
+    monitor.marcar_existentes()
+    (pastas["monitoramento"] / "novo.jsonl").write_text(_linhas(1, 3, valor=20.0))
+
+    assert monitor.processar_alteracoes() == 0
+    assert monitor.processar_alteracoes() == 0
+    assert capsys.readouterr().out.count("AVISO: Limites de 'linha'") == 1
+    assert not os.path.exists(tmp_path / "estado.json")
+
+    _salvar_limites(pastas)
+    assert monitor.processar_alteracoes() == 2
+    assert len(_alertas(pastas)) == 2
+
+
+def test_offset_nao_avanca_quando_o_processamento_falha(pastas, tmp_path, monkeypatch):
+    _salvar_limites(pastas)
+    monitor = _monitor(pastas, tmp_path)
+    monitor.marcar_existentes()
+    (pastas["monitoramento"] / "novo.jsonl").write_text(_linhas(1, 3))
+
+    original = monitor.processar_subgrupos
+
+    def falha(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(monitor, "processar_subgrupos", falha)
+    assert monitor.processar_alteracoes() == 0
+
+    monkeypatch.setattr(monitor, "processar_subgrupos", original)
+    assert monitor.processar_alteracoes() == 2
+    assert monitor.processar_alteracoes() == 0
+
+
+def test_sketch_gravado_uma_vez_por_varredura(pastas, tmp_path, monkeypatch):
+    _salvar_limites(pastas)
+    monitor = _monitor(pastas, tmp_path)
+    monitor.marcar_existentes()
+    for nome in ("a.jsonl", "b.jsonl"):
+        (pastas["monitoramento"] / nome).write_text(_linhas(1, 4))
+
+    gravacoes = []
+    salvar = sketch_quantis.salvar_sketch
+    monkeypatch.setattr(
+        sketch_quantis, "salvar_sketch", lambda *args: gravacoes.append(args[1]) or salvar(*args)
+    )
+    assert monitor.processar_alteracoes() == 6
+
+    assert gravacoes == [str(pastas["sketches"] / "sketch_linha.json")]
+    fontes = sketch_quantis.carregar_fontes(gravacoes[0])
+    assert {os.path.basename(f): d.total for f, d in fontes.items()} == {
+        "a.jsonl": 9, "b.jsonl": 9,
+    }
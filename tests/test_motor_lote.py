@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from software import graficos_variaveis
+from software import motor_lote
+from conftest import frame_subgrupos
+
+
+def _dados(semente, num_subgrupos=30, n=5, desvio=0.0):
+    rng = np.random.default_rng(semente)
+    dados = [rng.normal(10.0, 1.0, n).tolist() for _ in range(num_subgrupos)]
+    for i in range(20, num_subgrupos):
+        dados[i] = [v + desvio for v in dados[i]]
+    return dados
+
+
+def test_contar_janela_movel():
+    indicador = np.array([[1, 1, 0, 1, 1, 1]], dtype=bool)
+    np.testing.assert_array_equal(
+        motor_lote.contar_janela_movel(indicador, 3), [[-1, -1, 2, 2, 2, 3]]
+    )
+
+
+def test_lote_coincide_com_pipeline_por_processo():
+    caracteristicas = [_dados(1, desvio=2.5), _dados(2, num_subgrupos=26, desvio=-1.5)]
+    tensor, mascara = motor_lote.montar_tensor(caracteristicas)
+
+    resultado = motor_lote.processar_lote_xr(
+        tensor, {}, mascara, indice_inicio_novos=20, nomes=["a", "b"]
+    )
+
+    for nome, dados in zip(["a", "b"], caracteristicas):
+        df = frame_subgrupos(dados)
+        esperado = graficos_variaveis.calibrar_limites_xr(df.iloc[:20], 5, {})
+        limites = resultado["limites"][nome]
+        assert limites["limites_X_barra"] == pytest.approx(esperado["limites_X_barra"])
+        assert limites["limites_R"] == pytest.approx(esperado["limites_R"])
+        assert resultado["zonas_weco"][nome] == pytest.approx(
+            graficos_variaveis.calcular_zonas_weco(esperado["limites_X_barra"])
+        )
+
+        alertas = graficos_variaveis.analisar_regras_weco(df, esperado, 20)
+        assert sorted(resultado["alertas"][nome]) == sorted(
+            a.replace(".0)", ")") for a in alertas
+        )
+    assert resultado["alertas"]["a"]
+
+
+def test_janelas_weco_ignoram_subgrupos_incompletos():
+    dados = _dados(3, desvio=0.0)
+    limites = graficos_variaveis.calibrar_limites_xr(frame_subgrupos(dados), 5, {})
+    zonas = graficos_variaveis.calcular_zonas_weco(limites["limites_X_barra"])
+    acima_2s = (zonas["LSC_2S"] + zonas["LSC"]) / 2
+
+    # Dois pontos além de 2-sigma separados por subgrupos com n=1 formam a Regra 2.
+    x_barra = np.full((1, 7), zonas["LM"])
+    x_barra[0, 3] = x_barra[0, 6] = acima_2s
+    amplitude = np.ones((1, 7))
+    tamanhos = np.array([[5, 5, 5, 5, 1, 1, 5]])
+
+    resultado = motor_lote.avaliar_lote_xr(
+        x_barra, amplitude, tamanhos, {}, 3, ["a"], limites=[limites]
+    )
+    assert resultado["flags_weco"]["regra_2"][0].tolist() == [
+        False, False, False, False, False, False, True
+    ]
+
+    df = pd.DataFrame(
+        {"Amostra": [1, 2, 3, 4, 7], "X_barra": np.delete(x_barra[0], [4, 5]), "R": 1.0}
+    )
+    esperado = graficos_variaveis.analisar_regras_weco(df, limites, 3)
+    assert len(resultado["alertas"]["a"]) == len(esperado) == 1
+
+
+def test_lote_usa_limites_do_n_de_cada_subgrupo():
+    dados = _dados(6)
+    limites = graficos_variaveis.calibrar_limites_xr(frame_subgrupos(dados), 5, {})
+    rng = np.random.default_rng(6)
+    monitoramento = [rng.normal(11.0, 1.0, n).tolist() for n in (3, 5, 2, 4, 3, 5, 3, 2, 4, 3)]
+    df = frame_subgrupos(dados + monitoramento)
+
+    resultado = motor_lote.avaliar_lote_xr(
+        df["X_barra"].to_numpy()[None, :],
+        df["R"].to_numpy()[None, :],
+        df["n"].to_numpy()[None, :],
+        {},
+        30,
+        ["a"],
+        df["Amostra"].to_numpy()[None, :],
+        limites=[limites],
+    )
+    esperado = graficos_variaveis.analisar_regras_weco(df, limites, 30)
+    assert sorted(resultado["alertas"]["a"]) == sorted(a.replace(".0)", ")") for a in esperado)
+
+    fixo = graficos_variaveis.analisar_regras_weco(df.drop(columns="n"), limites, 30)
+    assert len(esperado) != len(fixo)
+
+
+def test_inicio_de_monitoramento_por_caracteristica():
+    caracteristicas = [_dados(4, desvio=3.0), _dados(4, desvio=3.0)]
+    tensor, mascara = motor_lote.montar_tensor(caracteristicas)
+
+    resultado = motor_lote.processar_lote_xr(
+        tensor, {}, mascara, indice_inicio_novos=np.array([20, 30]), nomes=["a", "b"]
+    )
+    assert resultado["alertas"]["a"]
+    assert resultado["alertas"]["b"] == []
+    assert resultado["limites"]["b"]["X_barra_barra"] > resultado["limites"]["a"][
+        "X_barra_barra"
+    ]
+
+
+def test_calibracao_do_main_passa_pelo_motor_em_lote(tmp_path, monkeypatch):
+    import main
+
+    chamadas = []
+    avaliar = motor_lote.avaliar_lote_xr
+
+    def espiao(*args, **kwargs):
+        resultado = avaliar(*args, **kwargs)
+        chamadas.append(resultado)
+        return resultado
+
+    monkeypatch.setattr(motor_lote, "avaliar_lote_xr", espiao)
+    args = main.criar_parser().parse_args(
+        ["calibrate", "--tipo", "xr", "--saida", str(tmp_path)]
+    )
+    assert main.executar(args) == 0
+
+    assert len(chamadas) == 1
+    cfg = main.montar_configuracao(pasta_saida=str(tmp_path))
+    limites = main._carregar_limites(
+        main.caminhos_processo(cfg, main.NOME_PROCESSO_XR)["limites"]
+    )
+    esperado = chamadas[0]["limites"][main.NOME_PROCESSO_XR]
+    assert limites["limites_X_barra"] == pytest.approx(esperado["limites_X_barra"])
+    assert limites["limites_R"] == pytest.approx(esperado["limites_R"])
@@ -0,0 +1,113 @@
+import json
+import re
+import threading
+import urllib.request
+
+import pytest
+
+from software import painel_ao_vivo
+
+LIMITES = {
+    "tipo_grafico": "X-R",
+    "n_amostra": 5,
+    "limites_X_barra": {"LSC": 13.0, "LM": 10.0, "LIC": 7.0},
+    "limites_R": {"LSC": 10.0, "LM": 5.0, "LIC": 0.0},
+}
+
+
+@pytest.fixture
+def pasta_limites(tmp_path):
+    (tmp_path / "limites_linha.json").write_text(json.dumps(LIMITES))
+    return tmp_path
+
+
+def test_ponto_fora_do_limite_gera_alerta_e_eventos(pasta_limites):
+    estado = painel_ao_vivo.EstadoPainel(str(pasta_limites))
+    assert estado.publicar_ponto("linha", 1, x_barra=10.0, r=3.0) == []
+    alertas = estado.publicar_ponto("linha", 2, dados=[14.0, 14.5, 15.0])
+    assert any("Regra 1" in a for a in alertas)
+
+    tipos = [tipo for _, _, tipo, _ in estado.aguardar_eventos(0, "linha", 0)]
+    assert tipos == ["limites", "ponto", "ponto", "alerta"]
+
+
+def test_ids_de_eventos_sao_unicos_sob_concorrencia(pasta_limites):
+    estado = painel_ao_vivo.EstadoPainel(str(pasta_limites))
+    estado.obter_limites()
+
+    def publicar(inicio):
+        for i in range(200):
+            estado.publicar_ponto("linha", inicio + i, x_barra=10.0, r=3.0)
+
+    threads = [threading.Thread(target=publicar, args=(k * 1000,)) for k in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [e[0] for e in estado.eventos]
+    assert len(ids) == len(set(ids)) == 1601
+    assert estado.ultimo_id_evento() == 1601
+
+
+def test_pagina_nao_depende_de_recursos_externos():
+    assert not re.search(r"(src|href)=[\"']?https?://", painel_ao_vivo._PAGINA_HTML)
+
+
+def test_servidor_aceita_pontos_e_serve_limites(pasta_limites):
+    servidor, _ = painel_ao_vivo.criar_servidor(str(pasta_limites), porta=0)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/limites/linha") as resposta:
+            assert json.load(resposta)["limites_X_barra"]["LSC"] == 13.0
+
+        requisicao = urllib.request.Request(
+            f"{base}/pontos/linha",
+            data=json.dumps({"Amostra": 1, "X_barra": 20.0, "R": 1.0}).encode(),
+            method="POST",
+        )
+        with urllib.request.urlopen(requisicao) as resposta:
+            assert json.load(resposta)["alertas"]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_ponto_usa_limites_do_seu_n(pasta_limites):
+    estado = painel_ao_vivo.EstadoPainel(str(pasta_limites))
+    # Fora dos limites de n=5, mas dentro dos de n=2 (sigma_R = R_barra / d2(5)).
+    assert estado.publicar_ponto("linha", 1, dados=[13.5, 13.5, 13.5, 13.5, 13.5]) != []
+    assert estado.publicar_ponto("linha", 2, dados=[13.0, 14.0]) == []
+
+    pontos = [d for _, _, tipo, d in estado.aguardar_eventos(0, "linha", 0) if tipo == "ponto"]
+    assert pontos[0]["LSC"] == 13.0 and pontos[1]["n"] == 2
+    assert pontos[1]["LSC"] > 13.5
+
+
+def test_fluxo_nao_perde_ponto_publicado_apos_o_retrato_inicial(pasta_limites):
+    servidor, estado = painel_ao_vivo.criar_servidor(str(pasta_limites), porta=0)
+    retrato = estado.obter_limites_e_ultimo_id
+
+    def retrato_seguido_de_ponto():
+        resultado = retrato()
+        # Ponto publicado entre o retrato dos limites e o início do fluxo.
+        estado.publicar_ponto("linha", 1, x_barra=10.0, r=3.0)
+        return resultado
+
+    estado.obter_limites_e_ultimo_id = retrato_seguido_de_ponto
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/eventos?processo=linha", timeout=5) as resposta:
+            tipos = []
+            while len(tipos) < 2:
+                linha = resposta.readline().decode()
+                if linha.startswith("event: "):
+                    tipos.append(linha[len("event: ") :].strip())
+        assert tipos == ["limites", "ponto"]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
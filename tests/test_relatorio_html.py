@@ -0,0 +1,73 @@
+import json
+import os
+
+import matplotlib.pyplot as plt
+
+import main
+from software import relatorio_html
+
+
+def _salvar_png(caminho):
+    fig, ax = plt.subplots(figsize=(1, 1))
+    ax.plot([0, 1])
+    fig.savefig(caminho)
+    plt.close(fig)
+
+
+def _preparar_resultados(tmp_path):
+    cfg = main.montar_configuracao(
+        str(tmp_path / "entrada"), str(tmp_path / "config"), str(tmp_path / "saida")
+    )
+    main.verificar_pastas_output(cfg)
+    caminhos = main.caminhos_processo(cfg, "grafico_p")
+    with open(caminhos["limites"], "w") as f:
+        json.dump({"tipo_grafico": "P", "p_barra": 0.1}, f)
+    with open(caminhos["alertas"], "w") as f:
+        json.dump(["ALERTA (Amostra 3): teste"], f)
+    _salvar_png(caminhos["grafico_calibracao"])
+    _salvar_png(caminhos["grafico_tendencia"])
+
+    # Artefatos que não pertencem ao processo configurado.
+    with open(os.path.join(cfg["pasta_limites"], "limites_controle.json"), "w") as f:
+        json.dump({"tipo_grafico": "X-R"}, f)
+    _salvar_png(os.path.join(cfg["pasta_graficos"], "calibracao_np_grafico_p.png"))
+    return cfg, caminhos
+
+
+def test_relatorio_usa_processos_configurados_e_nomes_exatos(tmp_path):
+    cfg, caminhos = _preparar_resultados(tmp_path)
+    assert main.gerar_relatorio(cfg, [("p", "grafico_p")])
+
+    (relatorio,) = [
+        nome for nome in os.listdir(cfg["pasta_relatorios"]) if nome.startswith("relatorio_")
+    ]
+    conteudo = open(os.path.join(cfg["pasta_relatorios"], relatorio), encoding="utf-8").read()
+    assert conteudo.count("<section") == 1
+    assert "controle" not in conteudo
+    assert "calibracao_np_grafico_p.png" not in conteudo
+    assert os.path.basename(caminhos["grafico_calibracao"]) in conteudo
+    assert os.path.basename(caminhos["grafico_tendencia"]) in conteudo
+    assert "ALERTA (Amostra 3): teste" in conteudo
+
+
+def test_processo_sem_limites_e_ignorado(tmp_path):
+    assert (
+        relatorio_html.carregar_processo(
+            "ausente", str(tmp_path / "limites.json"), str(tmp_path / "alertas.json"), []
+        )
+        is None
+    )
+
+
+def test_secao_resume_capacidade_e_alertas():
+    secao = relatorio_html.renderizar_secao_processo(
+        {
+            "nome": "linha <1>",
+            "limites": {"tipo_grafico": "X-R", "analise_capacidade": {"Cpk": 1.25}},
+            "alertas": ["a", "b"],
+            "graficos": [],
+        }
+    )
+    assert secao["cpk"] == 1.25
+    assert secao["num_alertas"] == 2
+    assert "linha &lt;1&gt;" in secao["html"]
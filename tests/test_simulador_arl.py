@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from software import simulador_arl
+
+
+def test_arl_sob_controle_da_regra_1():
+    comprimentos = simulador_arl.simular_comprimentos_corrida(
+        5, regras=("regra_1",), num_fluxos=40_000, semente=1, max_workers=1
+    )
+    resumo = simulador_arl.resumir_comprimentos(comprimentos, simulador_arl.MAX_SUBGRUPOS_PADRAO)
+    # ARL0 = 1 / P(|Z| > 3) = 370.4
+    assert resumo["ARL"] == pytest.approx(370.4, abs=4 * resumo["erro_padrao_ARL"])
+
+
+def test_arl_com_todas_as_regras_weco():
+    comprimentos = simulador_arl.simular_comprimentos_corrida(
+        5, num_fluxos=20_000, semente=2, max_workers=1
+    )
+    resumo = simulador_arl.resumir_comprimentos(comprimentos, simulador_arl.MAX_SUBGRUPOS_PADRAO)
+    # Valor de referência de Champ e Woodall (1987) para as quatro regras WECO.
+    assert resumo["ARL"] == pytest.approx(91.75, abs=4 * resumo["erro_padrao_ARL"])
+
+
+def test_arl_com_deslocamento_da_media():
+    comprimentos = simulador_arl.simular_comprimentos_corrida(
+        4, deslocamento=1.0, regras=("regra_1",), num_fluxos=20_000, semente=3, max_workers=1
+    )
+    # Com n=4, um deslocamento de 1 sigma leva a média padronizada a 2: p = P(Z > 1).
+    assert comprimentos.mean() == pytest.approx(1 / 0.15866, rel=0.03)
+
+
+def test_resultado_independe_do_numero_de_workers():
+    parametros = dict(num_fluxos=3_000, semente=42, tamanho_lote=500, max_subgrupos=400)
+    sequencial = simulador_arl.simular_comprimentos_corrida(5, max_workers=1, **parametros)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paralelo = simulador_arl.simular_comprimentos_corrida(5, executor=pool, **parametros)
+    np.testing.assert_array_equal(sequencial, paralelo)
+
+
+def test_fluxos_censurados_contam_como_maximo():
+    resumo = simulador_arl.resumir_comprimentos(np.array([0, 10, 20, 0]), 100)
+    assert resumo["ARL"] == pytest.approx(57.5)
+    assert resumo["fracao_censurada"] == 0.5
+
+
+def test_regra_desconhecida_e_rejeitada():
+    with pytest.raises(ValueError):
+        simulador_arl.simular_comprimentos_corrida(5, regras=("regra_9",), num_fluxos=10)
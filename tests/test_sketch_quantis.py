@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from software import sketch_quantis
+
+
+def test_quantis_e_cdf_aproximam_os_exatos():
+    rng = np.random.default_rng(1)
+    valores = rng.lognormal(0.0, 0.6, 200_000)
+    sketch = sketch_quantis.TDigest().adicionar(valores)
+
+    assert sketch.total == len(valores)
+    for q in (0.00135, 0.5, 0.99865):
+        assert sketch.quantil(q) == pytest.approx(np.quantile(valores, q), rel=0.01)
+    limite = np.quantile(valores, 0.999)
+    assert 1.0 - sketch.cdf(limite) == pytest.approx(0.001, abs=2e-4)
+
+
+def test_mesclar_equivale_a_um_unico_sketch():
+    rng = np.random.default_rng(2)
+    partes = [rng.normal(10.0, 1.0, 50_000) for _ in range(4)]
+
+    mesclado = sketch_quantis.TDigest()
+    for parte in partes:
+        mesclado.mesclar(sketch_quantis.TDigest().adicionar(parte))
+    unico = sketch_quantis.TDigest().adicionar(np.concatenate(partes))
+
+    assert mesclado.total == unico.total == 200_000
+    assert mesclado.minimo == unico.minimo and mesclado.maximo == unico.maximo
+    assert mesclado.quantil([0.01, 0.5, 0.99]) == pytest.approx(
+        unico.quantil([0.01, 0.5, 0.99]), abs=0.02
+    )
+
+
+def test_salvar_e_carregar_preservam_o_sketch(tmp_path):
+    caminho = str(tmp_path / "sketch.json")
+    sketch = sketch_quantis.TDigest().adicionar(np.arange(1000.0))
+    assert sketch_quantis.salvar_sketch(sketch, caminho)
+
+    carregado = sketch_quantis.carregar_sketch(caminho)
+    assert carregado.total == 1000
+    assert carregado.quantil(0.5) == pytest.approx(sketch.quantil(0.5))
+
+
+def test_substituir_fontes_nao_duplica_releituras(tmp_path):
+    caminho = str(tmp_path / "sketch.json")
+    sketch_quantis.atualizar_sketch_processo(caminho, np.ones(30), fonte="/watch/a.jsonl")
+    historico = {"/calibracao.json": sketch_quantis.TDigest().adicionar(np.zeros(100))}
+
+    for _ in range(3):
+        sketch = sketch_quantis.substituir_fontes(caminho, historico)
+    assert sketch.total == 130
+
+    # Reler o arquivo do watch no histórico troca a contribuição incremental dele.
+    historico["/watch/a.jsonl"] = sketch_quantis.TDigest().adicionar(np.ones(40))
+    sketch = sketch_quantis.substituir_fontes(caminho, historico, remover=["/watch/a.jsonl"])
+    assert sketch.total == 140
+    assert sketch_quantis.carregar_sketch(caminho).total == 140
+
+
+def test_sketch_sem_fontes_e_preservado(tmp_path):
+    caminho = str(tmp_path / "sketch.json")
+    with open(caminho, "w") as f:
+        json.dump(sketch_quantis.TDigest().adicionar(np.arange(10.0)).para_dict(), f)
+
+    sketch = sketch_quantis.atualizar_sketch_processo(caminho, np.arange(5.0), fonte="x")
+    assert sketch.total == 15
+
+
+def test_capacidade_preserva_leituras_do_watch(tmp_path):
+    import main
+
+    shutil.copytree(main.PASTA_DADOS_ENTRADA, tmp_path / "entrada")
+    cfg = main.montar_configuracao(str(tmp_path / "entrada"), pasta_saida=str(tmp_path / "saida"))
+    caminho_sketch = main.caminhos_processo(cfg, main.NOME_PROCESSO_XR)["sketch"]
+    sketch_quantis.atualizar_sketch_processo(
+        caminho_sketch, np.full(25, 4.9), fonte=str(tmp_path / "entrada" / "extra.jsonl")
+    )
+
+    args = main.criar_parser().parse_args(
+        [
+            "all",
+            "--tipo", "xr",
+            "--entrada", str(tmp_path / "entrada"),
+            "--saida", str(tmp_path / "saida"),
+        ]
+    )
+    main.executar(args)
+    total = sketch_quantis.carregar_sketch(caminho_sketch).total
+    main.executar(args)
+
+    assert sketch_quantis.carregar_sketch(caminho_sketch).total == total == 145 + 25
+
+
+def test_capacidade_mescla_apenas_fontes_novas(tmp_path, monkeypatch):
+    import main
+
+    shutil.copytree(main.PASTA_DADOS_ENTRADA, tmp_path / "entrada")
+    base = [
+        "--tipo", "xr",
+        "--entrada", str(tmp_path / "entrada"),
+        "--saida", str(tmp_path / "saida"),
+    ]
+    cfg = main.montar_configuracao(str(tmp_path / "entrada"), pasta_saida=str(tmp_path / "saida"))
+    caminhos = main.caminhos_processo(cfg, main.NOME_PROCESSO_XR)
+    executar = lambda *extras: main.executar(main.criar_parser().parse_args([*extras, *base]))
+    assert executar("calibrate") == 0
+
+    substituicoes = []
+    substituir = sketch_quantis.substituir_fontes
+
+    def registrar(caminho, novas, **kwargs):
+        substituicoes.append(sorted(novas))
+        return substituir(caminho, novas, **kwargs)
+
+    monkeypatch.setattr(sketch_quantis, "substituir_fontes", registrar)
+    assert executar("capacity") == 0
+    assert executar("capacity") == 0
+    assert len(substituicoes) == 1 and len(substituicoes[0]) == 2
+
+    # Só o monitoramento mudou: a calibração continua a do sketch persistido.
+    monitoramento = cfg["caminho_monitoramento"]
+    with open(monitoramento) as f:
+        subgrupos = json.load(f)
+    subgrupos.append({"Amostra": 999, "Dados": [4.9] * 5})
+    with open(monitoramento, "w") as f:
+        json.dump(subgrupos, f)
+    assert executar("capacity") == 0
+    assert substituicoes[-1] == [os.path.abspath(monitoramento)]
+
+    assert executar("capacity", "--reconstruir-sketch") == 0
+    assert len(substituicoes[-1]) == 2
+
+    capacidade = main._carregar_limites(caminhos["limites"])["analise_capacidade"]
+    num_medicoes = capacidade["capacidade_percentil_lt"]["num_medicoes"]
+    assert isinstance(num_medicoes, int)
+    assert num_medicoes == sketch_quantis.carregar_sketch(caminhos["sketch"]).total == 145 + 5